@@ -0,0 +1,200 @@
+"""
+Admission control for expensive endpoints.
+
+Each limited route gets, per worker process:
+
+  * a per-user token bucket (`user_rate` requests/second, `user_burst` deep):
+    a user over quota is rejected at once, it never waits
+  * a global token bucket (`rate`, `burst`) shared by all users
+  * a concurrency cap (`max_concurrent` requests in flight) with a bounded
+    wait queue: up to `max_queue` requests wait at most `queue_timeout`
+    seconds for a slot, anything beyond that is rejected
+
+Rejections are cheap (no DB access, no rendering) and carry a Retry-After
+hint, so a generation burst cannot tie up every worker thread and cheap
+routes such as quiz-taking stay responsive. Queued requests hold a worker
+thread too, so given a `thread_budget` (threads this controller may use in a
+worker) the routes' `max_concurrent + max_queue`, summed over all routes, is
+cut down to leave at least one of those threads free.
+Limits are per process; with N workers the effective global limit is N times
+the configured one.
+"""
+import math
+import threading
+import time
+
+DEFAULT_LIMIT = {
+    'methods': ('POST',),
+    'rate': 1.0,
+    'burst': 5,
+    'user_rate': 0.1,
+    'user_burst': 3,
+    'max_concurrent': 2,
+    'max_queue': 1,
+    'queue_timeout': 10.0,
+}
+COUNTERS = ('admitted', 'queued', 'rejected_user', 'rejected_rate', 'rejected_queue_full', 'rejected_timeout')
+
+
+class AdmissionRejected(Exception):
+    """Raised by `admit()`; `reason` is one of the rejected_* counters."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`. Not locked; callers hold the route lock."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now=None):
+        """0 if a token was taken, otherwise the seconds until one is available."""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _RouteLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Condition()
+        self.bucket = TokenBucket(limit['rate'], limit['burst'])
+        self.user_buckets = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def _user_bucket(self, user_key, now):
+        bucket = self.user_buckets.get(user_key)
+        if bucket is None:
+            if len(self.user_buckets) > 10000:
+                # Full buckets carry no state worth keeping
+                self.user_buckets = {k: b for k, b in self.user_buckets.items() if not b.is_full(now)}
+            bucket = self.user_buckets[user_key] = TokenBucket(self.limit['user_rate'], self.limit['user_burst'])
+        return bucket
+
+    def _reject(self, reason, retry_after):
+        self.counters[reason] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def acquire(self, user_key):
+        limit = self.limit
+        with self.lock:
+            now = time.monotonic()
+            if self.in_flight >= limit['max_concurrent'] and self.waiting >= limit['max_queue']:
+                self._reject('rejected_queue_full', limit['queue_timeout'])
+
+            wait = self._user_bucket(user_key, now).try_take(now)
+            if wait:
+                self._reject('rejected_user', wait)
+            wait = self.bucket.try_take(now)
+            if wait:
+                # Give the user's token back: the request was not served
+                self.user_buckets[user_key].tokens += 1
+                self._reject('rejected_rate', wait)
+
+            if self.in_flight >= limit['max_concurrent']:
+                self.counters['queued'] += 1
+                self.waiting += 1
+                deadline = now + limit['queue_timeout']
+                try:
+                    while self.in_flight >= limit['max_concurrent']:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject('rejected_timeout', limit['queue_timeout'])
+                        self.lock.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            self.in_flight += 1
+            self.counters['admitted'] += 1
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.lock.notify()
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.counters, 'in_flight': self.in_flight, 'waiting': self.waiting,
+                    'tokens': round(self.bucket.tokens, 2), 'tracked_users': len(self.user_buckets)}
+
+
+def fit_thread_budget(limits, thread_budget):
+    """
+    Copies of `limits` (endpoint -> full limit) whose max_concurrent +
+    max_queue, summed over every route, is at most thread_budget - 1. Each
+    route keeps one concurrent slot; the rest is handed out round-robin,
+    concurrency before queue depth. Raises ValueError if the budget cannot
+    give every route its slot and still leave a thread free.
+    """
+    if not thread_budget:
+        return limits
+    spare = thread_budget - 1 - len(limits)
+    if spare < 0:
+        raise ValueError(f"{thread_budget} threads cannot serve {len(limits)} rate-limited routes and keep one "
+                         f"free; at least {len(limits) + 1} are needed")
+    fitted = {endpoint: {**limit, 'max_concurrent': 1, 'max_queue': 0} for endpoint, limit in limits.items()}
+    for field in ('max_concurrent', 'max_queue'):
+        wanting = [endpoint for endpoint in limits if limits[endpoint][field] > fitted[endpoint][field]]
+        while spare and wanting:
+            for endpoint in list(wanting):
+                if not spare:
+                    break
+                fitted[endpoint][field] += 1
+                spare -= 1
+                if fitted[endpoint][field] >= limits[endpoint][field]:
+                    wanting.remove(endpoint)
+    return fitted
+
+
+class AdmissionController:
+    """
+    Per-route limiters, keyed by Flask endpoint name.
+
+    `limits` maps an endpoint to overrides of DEFAULT_LIMIT; endpoints not
+    listed (and methods not in a route's `methods`) are never limited.
+    `thread_budget` is the number of this process's threads the limited
+    routes may hold (admitted or queued), or None if unbounded.
+    """
+
+    def __init__(self, limits, thread_budget=None):
+        limits = {endpoint: {**DEFAULT_LIMIT, **(limit or {})} for endpoint, limit in (limits or {}).items()}
+        self.limiters = {endpoint: _RouteLimiter(limit)
+                         for endpoint, limit in fit_thread_budget(limits, thread_budget).items()}
+
+    def limiter_for(self, endpoint, method):
+        limiter = self.limiters.get(endpoint)
+        if limiter is None or method not in limiter.limit['methods']:
+            return None
+        return limiter
+
+    def admit(self, endpoint, method, user_key):
+        """
+        Blocks while queued. Returns the limiter to release when the request
+        is done (None if the route is not limited); raises AdmissionRejected.
+        """
+        limiter = self.limiter_for(endpoint, method)
+        if limiter is not None:
+            limiter.acquire(user_key)
+        return limiter
+
+    def counters(self):
+        return {endpoint: limiter.snapshot() for endpoint, limiter in self.limiters.items()}
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class AnalyticsReplica:
+    """Read-only snapshot of the primary database used by admin and reporting queries.
+
+    The snapshot is taken with the sqlite3 online backup API, so learners keep
+    writing to the primary file while the copy is being made. Aggregate queries
+    then run against the copy and never compete for the primary's write lock.
+    """
+
+    def __init__(self, source_path, replica_path, refresh_interval=60, backup_pages=1024):
+        self.source_path = source_path
+        self.replica_path = replica_path
+        self.refresh_interval = refresh_interval
+        self.backup_pages = backup_pages
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._thread = None
+
+    def refresh(self):
+        """Copy the primary database into the replica file."""
+        with self._lock:
+            # Per-process temp file: several workers may refresh the same replica
+            tmp_path = f'{self.replica_path}.{os.getpid()}.tmp'
+            source = sqlite3.connect(self.source_path)
+            target = sqlite3.connect(tmp_path)
+            try:
+                # Copy in steps so writers on the primary can interleave between them
+                source.backup(target, pages=self.backup_pages, sleep=0.005)
+            finally:
+                target.close()
+                source.close()
+
+            try:
+                os.replace(tmp_path, self.replica_path)
+            except PermissionError:
+                # Windows refuses to replace a file that readers still have open;
+                # back up straight into the replica instead.
+                source = sqlite3.connect(tmp_path)
+                target = sqlite3.connect(self.replica_path, timeout=30)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+                os.remove(tmp_path)
+
+            self._dirty = False
+
+    def snapshot_age(self):
+        """Seconds since the replica was last refreshed, or None if it does not exist yet.
+
+        Uses the file's mtime so every worker process reports the same age.
+        """
+        try:
+            return max(0.0, time.time() - os.path.getmtime(self.replica_path))
+        except OSError:
+            return None
+
+    def is_stale(self):
+        age = self.snapshot_age()
+        return self._dirty or age is None or age >= self.refresh_interval
+
+    def invalidate(self):
+        """Force the next read to take a fresh snapshot (e.g. after an admin edit)."""
+        self._dirty = True
+
+    def connect(self, dict_cursor=True):
+        """Open a read-only connection to the replica, refreshing it first if stale."""
+        if self.is_stale():
+            try:
+                self.refresh()
+            except sqlite3.Error as e:
+                print(f"⚠️ Analytics snapshot refresh failed: {e}")
+                if self.snapshot_age() is None:
+                    raise
+
+        uri = Path(self.replica_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True)
+        if dict_cursor:
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def start_background_refresh(self):
+        """
+        Start a daemon thread that keeps the snapshot under refresh_interval
+        seconds old. Staleness is judged by the replica's mtime, so when every
+        worker runs this thread only one of them refreshes per interval.
+        """
+        if self._thread and self._thread.is_alive():
+            return self._thread
+
+        def run():
+            while True:
+                try:
+                    if self.is_stale():
+                        self.refresh()
+                except Exception as e:
+                    print(f"⚠️ Analytics snapshot refresh failed: {e}")
+                time.sleep(max(1, self.refresh_interval / 4))
+
+        self._thread = threading.Thread(target=run, name='analytics-snapshot', daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Refresh the read-only analytics snapshot.')
+    parser.add_argument('--source', default='quizzes.db')
+    parser.add_argument('--replica', default='quizzes_analytics.db')
+    parser.add_argument('--interval', type=int, default=60, help='Refresh interval in seconds')
+    parser.add_argument('--once', action='store_true', help='Take a single snapshot and exit')
+    args = parser.parse_args()
+
+    replica = AnalyticsReplica(args.source, args.replica, refresh_interval=args.interval)
+    if args.once:
+        replica.refresh()
+        print(f"✅ Snapshot written to {args.replica}")
+    else:
+        print(f"🔄 Refreshing {args.replica} every {args.interval}s (Ctrl+C to stop)")
+        while True:
+            replica.refresh()
+            time.sleep(args.interval)
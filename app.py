@@ -7,17 +7,33 @@ import random
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 from functools import wraps
-import requests
-from bs4 import BeautifulSoup
-import PyPDF2
-from pptx import Presentation
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, make_response, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 
 from simple_adaptive_engine import SimpleAdaptiveEngine 
 from gemini_engine import GeminiQuizEngine
+from analytics_replica import AnalyticsReplica
+from learner_cache import LearnerStateCache
+from rating_engine import RatingEngine
+from question_selector import SelectionIndexStore
+from quiz_session_store import create_quiz_session_store
+from ttl_cache import TTLCache
+from review_scheduler import ReviewScheduler, REVIEW_QUIZ_TYPE
+from topic_rollups import record_completed_quiz, load_user_topic_stats
+from leaderboard_index import LeaderboardStore, backfill_quiz_totals, decode_cursor
+from stats_service import StatsService
+from stats_stream import StatsBroadcaster, TooManySubscribers
+from response_export import EXPORT_KINDS, EXPORT_FORMATS, export_stream, parse_date
+from item_analysis import difficulty_overrides, LOW_DISCRIMINATION
+from http_cache import templates_version, strong_etag, has_pending_flashes, is_not_modified, with_etag
+from activity_rollups import record_activity, daily_active_series
+from render_cache import init_template_caching, compress_response
+from weakness_profile import record_quiz_weakness, load_weakness_profile, weak_values, MIN_ATTEMPTS
+from admission_control import AdmissionController, AdmissionRejected
+from metrics import (MetricsRegistry, TimedConnection, QUERY_COUNT_BUCKETS, DB_TIME_BUCKETS,
+                     begin_request, end_request)
 
 # --- Configuration & Initialization ---
 app = Flask(__name__)
@@ -25,10 +41,147 @@ app.config['SECRET_KEY'] = 'smart-quizzer-final-key-45678'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['DATABASE'] = 'quizzes.db'
+app.config['ANALYTICS_DATABASE'] = 'quizzes_analytics.db'
+app.config['ANALYTICS_REFRESH_SECONDS'] = 60  # Max age of the admin reporting snapshot
+app.config['LEARNER_CACHE_TTL'] = 300  # Seconds a cached learner state stays valid
+app.config['LEARNER_CACHE_SIZE'] = 10000  # Max learners held in memory
+app.config['QUIZ_SESSION_BACKEND'] = 'sqlite'  # 'sqlite' (shared by all workers) or 'memory' (single worker)
+app.config['QUIZ_SESSION_TTL'] = 6 * 60 * 60  # Seconds an abandoned adaptive quiz is kept
+app.config['NEXT_QUESTION_CACHE_TTL'] = 15 * 60  # Seconds a precomputed next question is kept
+app.config['REVIEW_QUIZ_SIZE'] = 10  # Max due items served in one review quiz
+app.config['LEADERBOARD_TTL'] = 60  # Seconds before a cached leaderboard is reloaded from the DB
+app.config['LEADERBOARD_PAGE_SIZE'] = 50
+app.config['ADMIN_STATS_TTL'] = 30  # Max seconds between full recomputes of admin aggregate stats
+app.config['STATS_STREAM_INTERVAL'] = 5  # Seconds between checks for changed stats on the SSE stream
+app.config['STATS_STREAM_HEARTBEAT'] = 15  # Seconds of silence before an SSE keep-alive comment
+app.config['WORKER_THREADS'] = int(os.environ.get('QUIZ_THREADS', 4))  # Threads per gunicorn worker (see serve.py)
+# Each open SSE stream pins one worker thread; past this many per worker the dashboard polls instead
+app.config['STATS_STREAM_MAX_CLIENTS'] = max(1, app.config['WORKER_THREADS'] // 4)
+app.config['ITEM_STATS_MIN_RESPONSES'] = 20  # Responses needed before item statistics override a difficulty label
+app.config['ANALYSIS_CACHE_TTL'] = 60 * 60  # Seconds a computed completed-quiz analysis is kept
+app.config['ANALYSIS_CACHE_SIZE'] = 2000
+app.config['TEMPLATE_BYTECODE_DIR'] = os.path.join(app.instance_path, 'jinja_cache')  # Compiled templates shared by workers
+app.config['FRAGMENT_CACHE_TTL'] = 5 * 60  # Seconds a {% cache %} fragment is kept
+app.config['COMPRESS_MIN_SIZE'] = 1024  # Responses smaller than this (bytes) are sent uncompressed
+app.config['COMPRESS_LEVEL'] = 6
+# Per-worker admission limits for expensive routes (see admission_control.DEFAULT_LIMIT for the keys).
+# Admitted and waiting requests hold a thread, so their total over all routes is cut down to leave one
+# of the threads not reserved for SSE streams free; QUIZ_THREADS must cover one per route plus that one
+app.config['ADMISSION_LIMITS'] = {
+    'create_quiz': {'rate': 0.5, 'burst': 4, 'user_rate': 1 / 20, 'user_burst': 3,
+                    'max_concurrent': 2, 'max_queue': 1, 'queue_timeout': 15},
+    'admin_export': {'methods': ('GET',), 'rate': 0.2, 'burst': 2, 'user_rate': 0.2, 'user_burst': 2,
+                     'max_concurrent': 1, 'max_queue': 1, 'queue_timeout': 5},
+}
+app.config['METRICS_TOKEN'] = os.environ.get('QUIZ_METRICS_TOKEN')  # Bearer token for scrapers; admins can always read /metrics
+app.config['METRICS_DIR'] = None  # Shared snapshot directory for multi-worker totals (set by serve.py)
+app.config['METRICS_FLUSH_SECONDS'] = 5  # Seconds between a worker's snapshot writes
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-adaptive_engine = SimpleAdaptiveEngine()
-quiz_engine = GeminiQuizEngine()
+metrics = MetricsRegistry('smartquizzer')
+metrics.histogram('http_request_duration_seconds', 'Time to produce a response, by route and method.', ('route', 'method'))
+metrics.counter('http_responses_total', 'Responses by route, method and status code.', ('route', 'method', 'status'))
+metrics.histogram('db_statements_per_request', 'SQLite statements run through get_db_connection per request.',
+                  ('route',), buckets=QUERY_COUNT_BUCKETS)
+metrics.histogram('db_seconds_per_request', 'Time spent in SQLite statements and commits per request.',
+                  ('route',), buckets=DB_TIME_BUCKETS)
+metrics.histogram('generation_duration_seconds', 'Question generation calls by outcome (success, partial, error, demo).',
+                  ('outcome',))
+# Only URL scraping runs today: no route uploads files yet, so the pdf/pptx/txt series stay empty until one calls extract_text_from_file
+metrics.histogram('extraction_duration_seconds',
+                  'Content extraction time by source (url; pdf, pptx, txt once file uploads call extract_text_from_file).',
+                  ('source',))
+metrics.counter('cache_hits_total', 'In-process cache hits.', ('cache',))
+metrics.counter('cache_misses_total', 'In-process cache misses.', ('cache',))
+metrics.hit_ratio('cache_hit_ratio', 'Cache hits / lookups since the worker started.', 'cache_hits_total', 'cache_misses_total')
+
+def cache_counters():
+    caches = {
+        'learner_state': learner_cache,
+        'selection_index': selection_indexes,
+        'next_question': next_question_cache,
+        'analysis': analysis_cache,
+        'template_fragment': app.jinja_env.fragment_cache,
+    }
+    return {
+        'cache_hits_total': {(name,): cache.hits for name, cache in caches.items()},
+        'cache_misses_total': {(name,): cache.misses for name, cache in caches.items()},
+    }
+
+metrics.add_collector(cache_counters)
+
+TEMPLATES_VERSION = templates_version(os.path.join(app.root_path, app.template_folder))
+init_template_caching(app)
+
+def init_worker_resources():
+    """
+    (Re)builds this process's engines, caches and stores from app.config.
+
+    Runs once at import for the development server, and again in every
+    worker right after fork (see serve.py) so no worker shares in-memory
+    caches, background threads or generation-client connections with the
+    process it was forked from. Everything here is per process; shared state
+    lives in the database.
+    """
+    global learner_cache, adaptive_engine, rating_engine, selection_indexes, quiz_sessions
+    global next_question_cache, review_scheduler, analysis_cache, leaderboards, quiz_engine
+    global analytics_replica, stats_service, stats_broadcaster, admission
+
+    app.jinja_env.fragment_cache.clear()
+    learner_cache = LearnerStateCache(
+        max_users=app.config['LEARNER_CACHE_SIZE'],
+        ttl=app.config['LEARNER_CACHE_TTL']
+    )
+    adaptive_engine = SimpleAdaptiveEngine(db_path=app.config['DATABASE'], cache=learner_cache)
+    rating_engine = RatingEngine(db_path=app.config['DATABASE'])
+    selection_indexes = SelectionIndexStore(db_path=app.config['DATABASE'])
+    quiz_sessions = create_quiz_session_store(
+        app.config['QUIZ_SESSION_BACKEND'],
+        app.config['DATABASE'],
+        app.config['QUIZ_SESSION_TTL']
+    )
+    next_question_cache = TTLCache(ttl=app.config['NEXT_QUESTION_CACHE_TTL'])
+    review_scheduler = ReviewScheduler(db_path=app.config['DATABASE'])
+    analysis_cache = TTLCache(max_entries=app.config['ANALYSIS_CACHE_SIZE'], ttl=app.config['ANALYSIS_CACHE_TTL'])
+    leaderboards = LeaderboardStore(db_path=app.config['DATABASE'], ttl=app.config['LEADERBOARD_TTL'])
+    quiz_engine = GeminiQuizEngine()
+    analytics_replica = AnalyticsReplica(
+        app.config['DATABASE'],
+        app.config['ANALYTICS_DATABASE'],
+        refresh_interval=app.config['ANALYTICS_REFRESH_SECONDS']
+    )
+
+    # Recomputes read the analytics snapshot like the other admin aggregates (up to ANALYTICS_REFRESH_SECONDS old)
+    stats_service = StatsService(
+        lambda: analytics_replica.connect(dict_cursor=False),
+        ttl=app.config['ADMIN_STATS_TTL']
+    )
+    stats_broadcaster = StatsBroadcaster(
+        lambda: live_stats(),
+        interval=app.config['STATS_STREAM_INTERVAL'],
+        heartbeat=app.config['STATS_STREAM_HEARTBEAT'],
+        max_subscribers=app.config['STATS_STREAM_MAX_CLIENTS']
+    )
+    admission = AdmissionController(
+        app.config['ADMISSION_LIMITS'],
+        thread_budget=app.config['WORKER_THREADS'] - app.config['STATS_STREAM_MAX_CLIENTS']
+    )
+    quiz_engine.on_generation = lambda outcome, seconds: metrics.observe(
+        'generation_duration_seconds', seconds, (outcome,))
+
+def create_app(config=None):
+    """
+    Application factory for WSGI servers: applies config overrides and builds
+    the calling process's resources. Routes are registered on the module-level
+    `app`, so there is one application per process.
+    """
+    if config:
+        app.config.update(config)
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    init_worker_resources()
+    return app
+
+init_worker_resources()
 
 # Motivational quotes for enhanced user experience
 MOTIVATIONAL_QUOTES = [
@@ -59,6 +212,24 @@ def is_url(content):
     except ValueError:
         return False
 
+def timed_extraction(source_of):
+    """Records the decorated extractor's run time, labelled by source_of(its argument)."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(arg):
+            started = time.perf_counter()
+            try:
+                return f(arg)
+            finally:
+                metrics.observe('extraction_duration_seconds', time.perf_counter() - started, (source_of(arg),))
+        return wrapper
+    return decorator
+
+def file_source(filepath):
+    ext = filepath.rsplit('.', 1)[-1].lower()
+    return ext if ext in ('pdf', 'pptx', 'txt') else 'other'
+
+@timed_extraction(file_source)
 def extract_text_from_file(filepath):
     """
     Extracts real text content from PDF, PPTX, and TXT files.
@@ -71,6 +242,7 @@ def extract_text_from_file(filepath):
         # 1. Handle PDF Files
         if ext == 'pdf':
             print(f"DEBUG: Processing PDF - {filename}")
+            import PyPDF2  # heavy; only needed for uploads
             with open(filepath, 'rb') as f:
                 reader = PyPDF2.PdfReader(f)
                 # Limit to first 20 pages to avoid overloading Gemini
@@ -82,6 +254,7 @@ def extract_text_from_file(filepath):
         # 2. Handle PowerPoint (PPTX) Files
         elif ext == 'pptx':
             print(f"DEBUG: Processing PPTX - {filename}")
+            from pptx import Presentation  # heavy; only needed for uploads
             prs = Presentation(filepath)
             # Limit to first 30 slides
             for slide in prs.slides[:30]:
@@ -112,11 +285,15 @@ def extract_text_from_file(filepath):
 
 def get_db_connection(dict_cursor=True):
     """Get database connection with optional dictionary cursor."""
-    conn = sqlite3.connect(app.config['DATABASE'])
+    conn = sqlite3.connect(app.config['DATABASE'], factory=TimedConnection)
     if dict_cursor:
         conn.row_factory = sqlite3.Row
     return conn
 
+def get_analytics_connection(dict_cursor=True):
+    """Get a read-only connection to the analytics snapshot (admin/reporting queries)."""
+    return analytics_replica.connect(dict_cursor=dict_cursor)
+
 def init_db():
     """Initialize database with all required tables and migrations."""
     # 1. Open Connection
@@ -165,6 +342,14 @@ def init_db():
                 average_response_time REAL DEFAULT 0.0,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
+            CREATE INDEX IF NOT EXISTS idx_performances_learner ON performances (user_id, topic, difficulty);
+            
+            -- Learners whose cached state every worker must drop (see SimpleAdaptiveEngine)
+            CREATE TABLE IF NOT EXISTS learner_invalidations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
             
             CREATE TABLE IF NOT EXISTS admins (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -187,6 +372,127 @@ def init_db():
                 FOREIGN KEY (quiz_id) REFERENCES quizzes (id),
                 FOREIGN KEY (user_id) REFERENCES users (id)
             );
+            
+            CREATE TABLE IF NOT EXISTS learner_ratings (
+                user_id INTEGER PRIMARY KEY,
+                ability REAL DEFAULT 0.0,
+                responses INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            );
+            
+            CREATE TABLE IF NOT EXISTS item_ratings (
+                quiz_id INTEGER NOT NULL,
+                question_id INTEGER NOT NULL,
+                label TEXT,
+                difficulty REAL DEFAULT 0.0,
+                responses INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (quiz_id, question_id),
+                FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+            );
+            
+            CREATE TABLE IF NOT EXISTS quiz_selection_index (
+                quiz_id INTEGER PRIMARY KEY,
+                state TEXT NOT NULL,
+                version INTEGER,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+            );
+            
+            CREATE TABLE IF NOT EXISTS quiz_sessions (
+                sid TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                quiz_id INTEGER NOT NULL,
+                current_question_index INTEGER DEFAULT 0,
+                score INTEGER DEFAULT 0,
+                current_difficulty_index INTEGER DEFAULT 1,
+                quiz_length INTEGER DEFAULT 10,
+                served_seq INTEGER,
+                served_q_id INTEGER,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_quiz_sessions_expires ON quiz_sessions (expires_at);
+            
+            CREATE TABLE IF NOT EXISTS quiz_session_answers (
+                sid TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                q_id INTEGER,
+                user_answer TEXT,
+                difficulty TEXT,
+                is_correct INTEGER,
+                response_time INTEGER,
+                question_type TEXT,
+                PRIMARY KEY (sid, seq)
+            );
+            
+            CREATE TABLE IF NOT EXISTS review_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                source_quiz_id INTEGER NOT NULL,
+                question_id INTEGER NOT NULL,
+                topic TEXT,
+                question TEXT NOT NULL,
+                easiness REAL DEFAULT 2.5,
+                interval_days REAL DEFAULT 1.0,
+                repetitions INTEGER DEFAULT 0,
+                due_at TIMESTAMP NOT NULL,
+                last_reviewed_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (user_id, source_quiz_id, question_id),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_review_items_due ON review_items (user_id, due_at);
+            
+            CREATE TABLE IF NOT EXISTS user_topic_stats (
+                user_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                quiz_count INTEGER DEFAULT 0,
+                total_score REAL DEFAULT 0,
+                total_questions INTEGER DEFAULT 0,
+                correct_answers INTEGER DEFAULT 0,
+                total_response_time INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, topic),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            );
+            
+            CREATE TABLE IF NOT EXISTS user_weakness (
+                user_id INTEGER NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                correct INTEGER DEFAULT 0,
+                recent_accuracy REAL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (user_id, dimension, value),
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            );
+            
+            CREATE TABLE IF NOT EXISTS daily_activity (
+                day TEXT PRIMARY KEY,
+                completions INTEGER DEFAULT 0
+            );
+            
+            CREATE TABLE IF NOT EXISTS daily_activity_registers (
+                day TEXT NOT NULL,
+                register INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                PRIMARY KEY (day, register)
+            );
+            
+            CREATE TABLE IF NOT EXISTS item_statistics (
+                item_key TEXT PRIMARY KEY,
+                question_text TEXT,
+                topic TEXT,
+                labeled_difficulty TEXT,
+                empirical_difficulty TEXT,
+                responses INTEGER DEFAULT 0,
+                p_value REAL,
+                discrimination REAL,
+                median_time REAL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
         ''')
         
         # 3. Helper to safely add columns (Migrations)
@@ -203,6 +509,35 @@ def init_db():
         add_column_if_not_exists('users', 'security_a', 'TEXT')
         add_column_if_not_exists('users', 'skill_level', 'TEXT DEFAULT "Medium"')
         add_column_if_not_exists('users', 'status', 'TEXT DEFAULT "active"')
+        add_column_if_not_exists('quizzes', 'total_time', 'INTEGER')
+        add_column_if_not_exists('quizzes', 'completed_at', 'TIMESTAMP')
+        add_column_if_not_exists('quiz_selection_index', 'version', 'INTEGER')
+        add_column_if_not_exists('quiz_sessions', 'served_seq', 'INTEGER')
+        add_column_if_not_exists('quiz_sessions', 'served_q_id', 'INTEGER')
+        # Review quizzes used to be stored as simple quizzes on a 'Review' topic
+        c.execute('''
+            UPDATE quizzes SET quiz_type = ?
+            WHERE quiz_type = 'simple' AND topic = 'Review' AND title LIKE 'Spaced Review (%'
+        ''', (REVIEW_QUIZ_TYPE,))
+
+        backfilled = backfill_quiz_totals(conn)
+        if backfilled:
+            print(f"🔄 Migrating DB: Stored total_time for {backfilled} completed quizzes...")
+        c.execute('''
+            CREATE INDEX IF NOT EXISTS idx_quizzes_leaderboard
+            ON quizzes (topic, difficulty, status, score DESC, total_time, id)
+        ''')
+
+        # Rollups start empty on existing databases until backfilled
+        if not c.execute('SELECT 1 FROM user_topic_stats LIMIT 1').fetchone() and \
+                c.execute("SELECT 1 FROM quizzes WHERE status = 'completed' LIMIT 1").fetchone():
+            print("⚠️ user_topic_stats is empty; run `python topic_rollups.py` to backfill profile statistics.")
+        if not c.execute('SELECT 1 FROM user_weakness LIMIT 1').fetchone() and \
+                c.execute("SELECT 1 FROM quizzes WHERE status = 'completed' LIMIT 1").fetchone():
+            print("⚠️ user_weakness is empty; run `python weakness_profile.py` to backfill learner weakness profiles.")
+        if not c.execute('SELECT 1 FROM daily_activity LIMIT 1').fetchone() and \
+                c.execute("SELECT 1 FROM quizzes WHERE status = 'completed' LIMIT 1").fetchone():
+            print("⚠️ daily_activity is empty; run `python activity_rollups.py` to backfill active-user metrics.")
         
         # 4. Create Default Admin (ONLY if not exists)
         default_admin_username = 'admin'
@@ -240,10 +575,243 @@ def is_admin_logged_in():
     return session.get('is_admin')
 
 def get_current_user_data(user_id):
-    """Get current user data from database."""
-    with get_db_connection() as conn:
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    return user
+    """Get current user data (served from the learner cache after the first read)."""
+    return adaptive_engine.get_user(user_id)
+
+def get_quiz_state(quiz_id):
+    """Get the logged-in user's in-progress adaptive quiz state for quiz_id, or None."""
+    sid = session.get('quiz_sid')
+    if not sid:
+        return None
+    state = quiz_sessions.load(sid)
+    if not state or state['quiz_id'] != quiz_id or state['user_id'] != session.get('user_id'):
+        return None
+    return state
+
+def live_stats():
+    """Live platform statistics shared by the polling API and the SSE stream."""
+    try:
+        stats = stats_service.snapshot()
+    except Exception as e:
+        print(f"Error getting live stats: {e}")
+        stats = {'total_users': 0, 'total_quizzes': 0, 'completed_quizzes': 0, 'flagged_open': 0,
+                 'active_users': 0, 'cache_age': None}
+    
+    return {
+        'total_users': stats['total_users'],
+        'total_quizzes': stats['total_quizzes'],
+        'completed_quizzes': stats['completed_quizzes'],
+        'flagged_open': stats['flagged_open'],
+        'active_users': stats['active_users'],
+        'active_users_7d': stats.get('active_users_7d', 0),
+        'active_users_90d': stats.get('active_users_90d', 0),
+        'cache_age': stats['cache_age'],
+        'snapshot_age': round(analytics_replica.snapshot_age() or 0, 1),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def closest_to_ability(quiz_id, user_id):
+    """
+    Chooser for SelectionIndex.select: among a bucket's candidates, the question
+    whose rated difficulty is closest to the learner's ability, i.e. the one
+    whose outcome is least predictable and so tells us the most.
+    """
+    ability = rating_engine.get_ability(user_id)
+
+    def choose(candidates):
+        difficulties = rating_engine.get_item_difficulties(quiz_id, candidates)
+        return min(candidates, key=lambda q: abs(difficulties[q['id']] - ability))
+    return choose
+
+def select_adaptive_question(quiz_id, state):
+    """
+    Pick the next adaptive question for the state's difficulty index with throttling.
+    Returns (question, notice) where notice explains a fallback, or (None, None) when exhausted.
+    """
+    if hasattr(adaptive_engine, 'get_difficulty_by_index'):
+        required_difficulty = adaptive_engine.get_difficulty_by_index(state['current_difficulty_index']).lower()
+    else:
+        required_difficulty = 'medium'
+
+    selection_index = selection_indexes.get(quiz_id)
+    
+    # MODIFIED LOGIC: Implement difficulty fall-back (Throttling)
+    # 1. Try required difficulty
+    required_order = [required_difficulty]
+    
+    # 2. Add adjacent difficulties as fallback
+    if required_difficulty == 'hard':
+        required_order.extend(['medium', 'easy'])
+    elif required_difficulty == 'easy':
+        required_order.extend(['medium', 'hard'])
+    else: # medium
+        if random.choice([True, False]):
+            required_order.extend(['hard', 'easy'])
+        else:
+            required_order.extend(['easy', 'hard'])
+
+    # Search through the prioritized order of difficulties; the index falls back to
+    # any remaining bucket (e.g. non-standard difficulty labels) once these are exhausted
+    chooser = closest_to_ability(quiz_id, state['user_id'])
+    next_question, difficulty = selection_index.select(required_order, chooser) if selection_index else (None, None)
+    
+    notice = None
+    if next_question and difficulty not in required_order:
+        notice = "⚠️ Question pool exhausted for the adaptive path. Using the next available question."
+    elif next_question and difficulty != required_difficulty:
+        # Notify the user that throttling occurred
+        notice = f"⚠️ Could not find a **{required_difficulty.capitalize()}** question. Using a **{difficulty.capitalize()}** question instead to keep the quiz flowing."
+    return next_question, notice
+
+def apply_adaptive_answer(quiz_id, state, question, user_answer, time_taken, conn=None):
+    """
+    Scores one adaptive answer and advances `state` (score, difficulty index,
+    position) in memory. Returns the answer log entry; the caller persists it
+    with quiz_sessions.record_answer(s). Rating and served-question writes go
+    through `conn` when given (the caller commits).
+    """
+    is_correct = evaluate_answer(question, user_answer)
+    if is_correct:
+        state['score'] += 1
+
+    selection_indexes.mark_served(quiz_id, question['id'], conn=conn)
+
+    # Update continuous ability / item difficulty ratings
+    rating_engine.record_response(state['user_id'], quiz_id, question['id'],
+                                  question.get('difficulty', 'medium'), is_correct, conn=conn)
+
+    # Adaptive difficulty adjustment
+    if is_correct:
+        state['current_difficulty_index'] = min(state['current_difficulty_index'] + 1, 2)
+    else:
+        state['current_difficulty_index'] = max(state['current_difficulty_index'] - 1, 0)
+    state['current_question_index'] += 1
+
+    return {
+        'q_id': question['id'],
+        'user_answer': user_answer,
+        'difficulty': question['difficulty'],
+        'is_correct': is_correct,
+        'response_time': time_taken,
+        'question_type': question.get('question_type', 'mcq')
+    }
+
+def record_adaptive_answer(quiz_id, state, question, user_answer, time_taken, feedback_type=None,
+                           feedback_comment=None, flag_question=None):
+    """
+    Applies one adaptive answer and its optional feedback and persists them in a
+    single transaction. Returns the answer log entry, or None, with nothing
+    written, if the stored session is no longer at this position (a resubmitted
+    or concurrent answer already landed).
+    """
+    conn = get_db_connection(dict_cursor=False)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        answer_log = apply_adaptive_answer(quiz_id, state, question, user_answer, time_taken, conn=conn)
+        if not quiz_sessions.record_answers(state, [answer_log], conn=conn):
+            conn.rollback()
+            return None
+        save_question_feedback(quiz_id, question, feedback_type, feedback_comment, flag_question, conn=conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        stats_service.invalidate()
+        raise
+    finally:
+        conn.close()
+    return answer_log
+
+def save_question_feedback(quiz_id, question, feedback_type, feedback_comment, flag_question, conn=None):
+    """
+    Stores optional learner feedback on a question and counts it in the live
+    stats; ignores empty submissions. A caller that passes `conn` and then
+    rolls back must call stats_service.invalidate().
+    """
+    feedback_type = (feedback_type or '').strip().lower()
+    feedback_comment = (feedback_comment or '').strip()
+    flag_question = 1 if flag_question else 0
+
+    if feedback_type not in {'positive', 'negative', 'neutral'}:
+        feedback_type = None
+
+    if not (feedback_type or feedback_comment or flag_question):
+        return
+    feedback_conn = conn or get_db_connection(dict_cursor=False)
+    feedback_conn.execute(
+        '''
+        INSERT INTO question_feedback (quiz_id, question_id, user_id, feedback_type, comment, flagged, question_text)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''',
+        (
+            quiz_id,
+            str(question['id']),
+            session['user_id'],
+            feedback_type,
+            feedback_comment,
+            flag_question,
+            question.get('question_text', '')
+        )
+    )
+    if conn is None:
+        feedback_conn.commit()
+        feedback_conn.close()
+    stats_service.adjust(total_feedback=1, flagged_open=flag_question,
+                         **({f'feedback_{feedback_type}': 1} if feedback_type else {}))
+
+def prepare_next_question(quiz, state):
+    """
+    Picks the question for the state's position, records it as served in the
+    quiz session and caches it, so whichever worker or route asks for it next
+    (next_question_adaptive, the JSON API, answer validation) gets the same one.
+    Returns (question, notice), or (None, None) when the quiz is over.
+    """
+    if state['current_question_index'] >= state['quiz_length']:
+        return None, None
+    key = (state['sid'], state['current_question_index'])
+    prefetched = next_question_cache.get(key)
+    if prefetched:
+        return prefetched['question'], prefetched['notice']
+
+    next_question, notice = None, None
+    if state.get('served_seq') != state['current_question_index']:
+        next_question, notice = select_adaptive_question(quiz['id'], state)
+        if not next_question:
+            return None, None
+        if quiz_sessions.serve(state, next_question['id']) is None:
+            return None, None  # the session moved on meanwhile
+    if next_question is None or next_question['id'] != state['served_q_id']:
+        # Already served at this position (by another worker or a concurrent request): keep that question
+        with get_db_connection() as conn:
+            pool = json.loads(conn.execute('SELECT questions FROM quizzes WHERE id = ?', (quiz['id'],)).fetchone()[0])
+        next_question = next((q for q in pool if q.get('id') == state['served_q_id']), None)
+        notice = None
+    if next_question:
+        next_question_cache.set(key, {
+            'quiz': {'id': quiz['id'], 'title': quiz['title'], 'topic': quiz['topic']},
+            'question': next_question,
+            'notice': notice
+        })
+    return next_question, notice
+
+def answer_evaluation(question, answer_log):
+    """What the learner sees after answering: their answer, the correct one and the explanation."""
+    return {
+        'question_id': answer_log['q_id'],
+        'is_correct': answer_log['is_correct'],
+        'user_answer': answer_log['user_answer'],
+        'correct_answer': question.get('correct_answer', ''),
+        'explanation': question.get('explanation', 'No explanation available.')
+    }
+
+def public_question(question):
+    """The fields a learner may see before answering (no answer or explanation)."""
+    return {
+        'id': question['id'],
+        'question_text': question.get('question_text', ''),
+        'question_type': question.get('question_type', 'mcq'),
+        'difficulty': question.get('difficulty', 'medium'),
+        'options': question.get('options', [])
+    }
 
 def get_user_skill_level(user_id):
     """Get user's current skill level."""
@@ -284,7 +852,7 @@ def evaluate_answer(question, user_answer):
     
     return False
 
-def generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz_topic):
+def generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz_topic, type_performance=None):
     """Generate AI-powered learning suggestions."""
     suggestions = []
     
@@ -327,7 +895,7 @@ def generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz_top
     
     # Difficulty-based suggestions
     for difficulty, stats in difficulty_performance.items():
-        accuracy = (stats['correct'] / stats['total']) * 100 if stats['total'] > 0 else 0
+        accuracy = stats.get('accuracy', (stats['correct'] / stats['total']) * 100 if stats['total'] > 0 else 0)
         if accuracy < 70:
             suggestions.append({
                 'type': 'difficulty',
@@ -337,6 +905,18 @@ def generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz_top
                 'priority': 2
             })
     
+    # Question-type suggestions
+    for q_type, stats in (type_performance or {}).items():
+        if stats['accuracy'] < 70:
+            label = 'MCQ' if q_type == 'mcq' else q_type.replace('_', ' ').title()
+            suggestions.append({
+                'type': 'difficulty',
+                'title': f'Practice {label} Questions',
+                'description': f'Your recent accuracy on {label} questions is {stats["accuracy"]:.1f}%. Include more of them in your next quizzes.',
+                'icon': '🧩',
+                'priority': 2
+            })
+    
     # General learning strategies
     learning_strategies = [
         {
@@ -384,6 +964,53 @@ def generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz_top
     
     return suggestions
 
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    """Registered before compress() so it runs after it: latency includes compression."""
+    route = request.endpoint or 'unmatched'
+    statements, db_seconds = end_request()
+    metrics.observe('http_request_duration_seconds', time.perf_counter() - g.request_started, (route, request.method))
+    metrics.inc('http_responses_total', (route, request.method, str(response.status_code)))
+    metrics.observe('db_statements_per_request', statements, (route,))
+    metrics.observe('db_seconds_per_request', db_seconds, (route,))
+    return response
+
+@app.before_request
+def admit_request():
+    """Queues or rejects requests to rate-limited routes before any work is done."""
+    if 'user_id' in session:
+        user_key = f"user:{session['user_id']}"
+    elif session.get('is_admin'):
+        user_key = 'admin'
+    else:
+        user_key = f'ip:{request.remote_addr}'
+    try:
+        g.admission_slot = admission.admit(request.endpoint, request.method, user_key)
+    except AdmissionRejected as rejected:
+        message = 'Too many requests right now. Please try again shortly.'
+        if request.accept_mimetypes.best == 'application/json' or request.path.startswith('/api/'):
+            response = jsonify({'success': False, 'error': message, 'reason': rejected.reason})
+        else:
+            response = make_response(f'⏳ {message}')
+        response.status_code = 429
+        response.headers['Retry-After'] = str(rejected.retry_after)
+        return response
+
+@app.teardown_request
+def release_admission_slot(exc=None):
+    slot = g.pop('admission_slot', None)
+    if slot is not None:
+        slot.release()
+
+@app.after_request
+def compress(response):
+    return compress_response(response, app.config['COMPRESS_MIN_SIZE'], app.config['COMPRESS_LEVEL'])
+
 # --- Admin Authentication Middleware ---
 def admin_required(f):
     @wraps(f)
@@ -393,8 +1020,13 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@timed_extraction(lambda url: 'url')
 def scrape_url_content(url):
     """Fetches text content from a URL."""
+    # Imported on first scrape so workers do not pay for them at startup
+    import requests
+    from bs4 import BeautifulSoup
+
     try:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
         response = requests.get(url, headers=headers, timeout=10)
@@ -471,32 +1103,10 @@ def admin_dashboard():
     if not is_admin_logged_in():
         return redirect(url_for('admin_login'))
 
-    with get_db_connection() as conn:
-        # Platform statistics
-        total_users = conn.execute('SELECT COUNT(*) FROM users WHERE username != ?', ('admin',)).fetchone()[0]
-        
-        # Get active users (last 30 days) - users who completed quizzes
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
-        active_users = conn.execute(
-            "SELECT COUNT(DISTINCT user_id) FROM quizzes WHERE created_at >= ? AND status = 'completed'",
-            (thirty_days_ago,)
-        ).fetchone()[0]
-        
-        total_quizzes = conn.execute('SELECT COUNT(*) FROM quizzes').fetchone()[0]
-        completed_quizzes = conn.execute(
-            "SELECT COUNT(*) FROM quizzes WHERE status = 'completed'"
-        ).fetchone()[0]
-        
-        total_feedback = conn.execute('SELECT COUNT(*) FROM question_feedback').fetchone()[0]
-        flagged_open = conn.execute(
-            'SELECT COUNT(*) FROM question_feedback WHERE flagged = 1 AND resolved = 0'
-        ).fetchone()[0]
-
-        # Feedback analysis
-        feedback_breakdown = conn.execute(
-            'SELECT feedback_type, COUNT(*) as count FROM question_feedback GROUP BY feedback_type'
-        ).fetchall()
+    # Platform statistics (cached aggregates, see stats_service.py)
+    stats = stats_service.snapshot()
 
+    with get_analytics_connection() as conn:
         # User management data (excluding admin)
         user_rows = conn.execute(
             'SELECT id, username, email, skill_level, status, created_at FROM users WHERE username != ? ORDER BY created_at DESC LIMIT 10',
@@ -520,6 +1130,23 @@ def admin_dashboard():
             '''
         ).fetchall()
 
+        # Daily active learners / completions for the trend chart (see activity_rollups.py)
+        activity_series = daily_active_series(conn, days=30)
+
+        # Questions whose statistics suggest a problem (see item_analysis.py)
+        problem_item_rows = conn.execute(
+            '''
+            SELECT question_text, topic, labeled_difficulty, empirical_difficulty,
+                   responses, p_value, discrimination, median_time
+            FROM item_statistics
+            WHERE responses >= ?
+              AND (labeled_difficulty != empirical_difficulty OR discrimination < ?)
+            ORDER BY responses DESC
+            LIMIT 10
+            ''',
+            (app.config['ITEM_STATS_MIN_RESPONSES'], LOW_DISCRIMINATION)
+        ).fetchall()
+
         # Leaderboard
         leaderboard_rows = conn.execute(
             '''
@@ -537,32 +1164,11 @@ def admin_dashboard():
             '''
         ).fetchall()
 
-    # Process feedback sentiment
-    feedback_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-    for row in feedback_breakdown:
-        f_type = (row['feedback_type'] or '').lower()
-        if f_type in feedback_counts:
-            feedback_counts[f_type] += row['count']
-
-    sentiment_total = feedback_counts['positive'] + feedback_counts['negative']
-    positive_pct = (feedback_counts['positive'] / sentiment_total * 100) if sentiment_total else 0
-    negative_pct = (feedback_counts['negative'] / sentiment_total * 100) if sentiment_total else 0
-
-    stats = {
-        'total_users': total_users,
-        'active_users': active_users,
-        'total_quizzes': total_quizzes,
-        'completed_quizzes': completed_quizzes,
-        'total_feedback': total_feedback,
-        'flagged_open': flagged_open,
-        'positive_pct': round(positive_pct, 1),
-        'negative_pct': round(negative_pct, 1)
-    }
-
     # Convert to dictionaries for template
     users = [dict(row) for row in user_rows]
     content_items = [dict(row) for row in content_rows]
     flagged_items = [dict(row) for row in flagged_rows]
+    problem_items = [dict(row) for row in problem_item_rows]
     leaderboard = [
         {
             'username': row['username'],
@@ -578,54 +1184,101 @@ def admin_dashboard():
         users=users,
         content_items=content_items,
         flagged_items=flagged_items,
-        leaderboard=leaderboard
+        problem_items=problem_items,
+        activity_series=activity_series,
+        leaderboard=leaderboard,
+        snapshot_age=analytics_replica.snapshot_age() or 0,
+        stats_age=stats['cache_age']
     )
 
 @app.route('/admin/api/stats')
 @admin_required
 def get_live_stats():
     """API endpoint for live statistics"""
-    conn = get_db_connection()
-    
+    return jsonify(live_stats())
+
+@app.route('/admin/api/admission')
+@admin_required
+def admission_counters():
+    """Admit/queue/reject counters for this worker's rate-limited routes."""
+    return jsonify({'pid': os.getpid(), 'routes': admission.counters()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition; for an admin session or `Authorization: Bearer <METRICS_TOKEN>`."""
+    token = app.config['METRICS_TOKEN']
+    authorized = is_admin_logged_in() or (token and request.headers.get('Authorization') == f'Bearer {token}')
+    if not authorized:
+        if request.headers.get('Authorization'):
+            return Response('Invalid metrics token\n', 401, {'WWW-Authenticate': 'Bearer'}, mimetype='text/plain')
+        return redirect(url_for('admin_login'))
+    return Response(
+        metrics.render(metrics.collect(app.config['METRICS_DIR'])),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+        headers={'Cache-Control': 'no-store'}
+    )
+
+@app.route('/admin/api/stats/stream')
+@admin_required
+def stream_live_stats():
+    """
+    Server-Sent Events stream of live statistics (changed fields only). Returns
+    503 once this worker has STATS_STREAM_MAX_CLIENTS streams open; the
+    dashboard then falls back to polling /admin/api/stats.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
     try:
-        # Get real-time stats
-        total_users = conn.execute('SELECT COUNT(*) FROM users WHERE username != ?', ('admin',)).fetchone()[0]
-        total_quizzes = conn.execute('SELECT COUNT(*) FROM quizzes').fetchone()[0]
-        completed_quizzes = conn.execute(
-            "SELECT COUNT(*) FROM quizzes WHERE status = 'completed'"
-        ).fetchone()[0]
-        flagged_open = conn.execute(
-            'SELECT COUNT(*) FROM question_feedback WHERE flagged = 1 AND resolved = 0'
-        ).fetchone()[0]
-        
-        # Get active users (last 30 days)
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
-        active_users = conn.execute(
-            "SELECT COUNT(DISTINCT user_id) FROM quizzes WHERE created_at >= ? AND status = 'completed'",
-            (thirty_days_ago,)
-        ).fetchone()[0]
-        
-    except Exception as e:
-        print(f"Error getting live stats: {e}")
-        total_users = total_quizzes = completed_quizzes = flagged_open = active_users = 0
-    
-    finally:
-        conn.close()
-    
-    return jsonify({
-        'total_users': total_users,
-        'total_quizzes': total_quizzes,
-        'completed_quizzes': completed_quizzes,
-        'flagged_open': flagged_open,
-        'active_users': active_users,
-        'timestamp': datetime.now().isoformat()
-    })
+        last_event_id = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        last_event_id = None
+
+    try:
+        subscriber, events = stats_broadcaster.open_stream(last_event_id)
+    except TooManySubscribers:
+        return Response('Too many live-stats streams; poll /admin/api/stats instead\n', 503,
+                        {'Retry-After': str(app.config['STATS_STREAM_INTERVAL'])}, mimetype='text/plain')
+
+    response = Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(lambda: stats_broadcaster.unsubscribe(subscriber))
+    return response
+
+@app.route('/admin/export/<kind>')
+@admin_required
+def admin_export(kind):
+    """Stream answered questions or quiz results as NDJSON/CSV, optionally gzipped."""
+    fmt = request.args.get('format', 'ndjson')
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Unknown export kind or format'}), 400
+    try:
+        since = parse_date(request.args.get('since'))
+        until = parse_date(request.args.get('until'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be ISO formatted (YYYY-MM-DD)'}), 400
+    topic = request.args.get('topic') or None
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+
+    def generate():
+        # Read from the analytics snapshot; the connection lives as long as the stream
+        conn = get_analytics_connection(dict_cursor=False)
+        try:
+            yield from export_stream(conn, kind, fmt, since, until, topic, compress=compress)
+        finally:
+            conn.close()
+
+    filename = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}" + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    return Response(generate(), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 @app.route('/admin/user/<int:user_id>')
 @admin_required
 def get_user_details(user_id):
     """Get detailed user information"""
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     
     try:
         # Get user basic info
@@ -683,8 +1336,12 @@ def admin_resolve_feedback(feedback_id):
         return redirect(url_for('admin_login'))
 
     with get_db_connection(dict_cursor=False) as conn:
-        conn.execute('UPDATE question_feedback SET resolved = 1 WHERE id = ?', (feedback_id,))
+        cursor = conn.execute('UPDATE question_feedback SET resolved = 1 WHERE id = ? AND resolved = 0', (feedback_id,))
+        flagged = conn.execute('SELECT flagged FROM question_feedback WHERE id = ?', (feedback_id,)).fetchone()
         conn.commit()
+    if cursor.rowcount and flagged and flagged[0]:
+        stats_service.adjust(flagged_open=-1)
+    analytics_replica.invalidate()
 
     flash('Feedback marked as resolved.', 'success')
     return redirect(url_for('admin_dashboard'))
@@ -704,6 +1361,8 @@ def update_user(user_id):
         ''', (data.get('username'), data.get('email'), data.get('skill_level'), data.get('status'), user_id))
         
         conn.commit()
+        adaptive_engine.invalidate_user(user_id)
+        analytics_replica.invalidate()
         return jsonify({'success': True, 'message': 'User updated successfully'})
         
     except Exception as e:
@@ -730,9 +1389,20 @@ def admin_delete_user(user_id):
         # Delete user's data
         conn.execute('DELETE FROM question_feedback WHERE user_id = ?', (user_id,))
         conn.execute('DELETE FROM performances WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM learner_ratings WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM quiz_selection_index WHERE quiz_id IN (SELECT id FROM quizzes WHERE user_id = ?)', (user_id,))
+        conn.execute('DELETE FROM quiz_session_answers WHERE sid IN (SELECT sid FROM quiz_sessions WHERE user_id = ?)', (user_id,))
+        conn.execute('DELETE FROM quiz_sessions WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM review_items WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM user_topic_stats WHERE user_id = ?', (user_id,))
+        conn.execute('DELETE FROM user_weakness WHERE user_id = ?', (user_id,))
         conn.execute('DELETE FROM quizzes WHERE user_id = ?', (user_id,))
         conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
         conn.commit()
+    adaptive_engine.invalidate_user(user_id)
+    leaderboards.clear()
+    stats_service.invalidate()
+    analytics_replica.invalidate()
 
     return jsonify({'success': True, 'message': 'User deleted successfully'})
 
@@ -755,6 +1425,7 @@ def register():
                 ''', (username, email, phone, generate_password_hash(password), security_q, security_a))
                 
                 conn.commit()
+                stats_service.adjust(total_users=1)
                 flash('Account created! Please login.', 'success')
                 return redirect('/login')
             except sqlite3.IntegrityError:
@@ -836,6 +1507,7 @@ def forgot_password():
                 hashed_password = generate_password_hash(new_password)
                 conn.execute('UPDATE users SET password = ? WHERE id = ?', (hashed_password, user['id']))
                 conn.commit()
+                adaptive_engine.invalidate_user(user['id'])
                 
                 flash('Password successfully reset! Please login.', 'success')
                 return redirect(url_for('login'))
@@ -863,6 +1535,7 @@ def dashboard():
                                     (user_id,)).fetchall()
     
     recent_quizzes_list = [dict(q) for q in recent_quizzes]
+    due_reviews = review_scheduler.due_count(user_id)
     
     # Add motivational quote to dashboard
     motivational_quote = random.choice(MOTIVATIONAL_QUOTES)
@@ -872,8 +1545,55 @@ def dashboard():
                          total_quizzes=total_quizzes,
                          completed_quizzes=completed_quizzes,
                          recent_quizzes=recent_quizzes_list,
+                         due_reviews=due_reviews,
                          motivational_quote=motivational_quote)
 
+@app.route('/reviews')
+def start_review_quiz():
+    """
+    Build a simple quiz from the user's due spaced-repetition items, or resume
+    the user's unfinished review quiz so reloading the link creates nothing new.
+    """
+    if not is_logged_in():
+        return redirect('/login')
+
+    user_id = session['user_id']
+    unfinished = '''
+        SELECT id FROM quizzes WHERE user_id = ? AND quiz_type = ? AND status != 'completed'
+        ORDER BY id DESC LIMIT 1
+    '''
+    with get_db_connection(dict_cursor=False) as conn:
+        row = conn.execute(unfinished, (user_id, REVIEW_QUIZ_TYPE)).fetchone()
+    if row:
+        return redirect(url_for('take_simple_quiz', quiz_id=row[0]))
+
+    questions = review_scheduler.build_review_quiz(user_id, limit=app.config['REVIEW_QUIZ_SIZE'])
+    if not questions:
+        flash('No reviews due right now. Nice work!', 'info')
+        return redirect('/dashboard')
+
+    skill_level = get_user_skill_level(user_id)
+    conn = get_db_connection(dict_cursor=False)
+    try:
+        # Re-check under the write lock: two clicks must not create two quizzes
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(unfinished, (user_id, REVIEW_QUIZ_TYPE)).fetchone()
+        if row:
+            conn.rollback()
+            return redirect(url_for('take_simple_quiz', quiz_id=row[0]))
+        cursor = conn.execute('''
+            INSERT INTO quizzes (user_id, title, topic, content, questions, difficulty, quiz_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, f"Spaced Review ({len(questions)} questions)", 'Review',
+              'Questions due for spaced-repetition review', json.dumps(questions), skill_level, REVIEW_QUIZ_TYPE))
+        quiz_id = cursor.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    stats_service.adjust(total_quizzes=1)
+
+    return redirect(url_for('take_simple_quiz', quiz_id=quiz_id))
+
 @app.route('/profile')
 def profile():
     """User profile route."""
@@ -889,59 +1609,25 @@ def profile():
         except ValueError:
             pass
     
-    # Fetch performance analytics
-    with get_db_connection() as conn:
-        quizzes = conn.execute('SELECT id, topic, score, questions FROM quizzes WHERE user_id = ? AND status = ?', 
-                               (user['id'], 'completed')).fetchall()
+    # Per-topic totals are rolled up at quiz completion (see topic_rollups.py)
+    conn = get_db_connection(dict_cursor=False)
+    topic_stats = load_user_topic_stats(conn, user['id'])
+    conn.close()
 
-    topic_summary = {}
-    total_completed = 0
-    total_average_score = 0
-    
-    for q in quizzes:
-        total_completed += 1
-        total_average_score += q['score']
-        
-        topic = q['topic']
-        try:
-            questions = json.loads(q['questions'])
-        except json.JSONDecodeError:
-            continue
-        
-        answered_questions_in_quiz = [qn for qn in questions if 'user_answer' in qn]
-        
-        total_time_in_quiz = sum(qn.get('response_time', 0) for qn in answered_questions_in_quiz)
-        total_q_in_quiz = len(answered_questions_in_quiz)
-        correct_q_in_quiz = sum(1 for qn in answered_questions_in_quiz if qn.get('is_correct', False))
-        
-        if topic not in topic_summary:
-            topic_summary[topic] = {
-                'total_score': 0, 
-                'quiz_count': 0,
-                'total_response_time': 0,
-                'total_questions': 0,
-                'total_correct_answers': 0 
-            }
-        
-        summary = topic_summary[topic]
-        summary['total_score'] += q['score']
-        summary['quiz_count'] += 1
-        summary['total_response_time'] += total_time_in_quiz
-        summary['total_questions'] += total_q_in_quiz
-        summary['total_correct_answers'] += correct_q_in_quiz
+    total_completed = sum(t['quiz_count'] for t in topic_stats)
+    total_average_score = sum(t['total_score'] for t in topic_stats)
 
     performances_list = []
-    for topic, summary in topic_summary.items():
-        avg_score = summary['total_score'] / summary['quiz_count'] if summary['quiz_count'] > 0 else 0
-        avg_accuracy = (summary['total_correct_answers'] / summary['total_questions']) if summary['total_questions'] > 0 else 0
+    for summary in topic_stats:
+        avg_accuracy = (summary['correct_answers'] / summary['total_questions']) if summary['total_questions'] > 0 else 0
         avg_time = summary['total_response_time'] / summary['total_questions'] if summary['total_questions'] > 0 else 0
         
         performances_list.append({
-            'topic': topic,
+            'topic': summary['topic'],
             'difficulty': user['skill_level'],
             'accuracy': avg_accuracy,      
             'total_questions': summary['total_questions'],
-            'correct_answers': summary['total_correct_answers'], 
+            'correct_answers': summary['correct_answers'], 
             'average_response_time': avg_time
         })
     
@@ -984,6 +1670,7 @@ def update_profile():
         ''', (username_new, skill_level_new, user_id))
         
         conn.commit()
+        adaptive_engine.invalidate_user(user_id)
         
         session['username'] = username_new
         session['skill_level'] = skill_level_new
@@ -1010,7 +1697,7 @@ def create_quiz():
         topic = request.form.get('topic', 'General').strip()
         user_difficulty = request.form.get('difficulty', current_difficulty).capitalize()
         num_questions = int(request.form.get('num_questions', 5))
-        quiz_type = request.form.get('quiz_type', 'adaptive')
+        quiz_type = 'simple' if request.form.get('quiz_type') == 'simple' else 'adaptive'
         
         # 1. Get input
         raw_input = request.form.get('content', '').strip()
@@ -1055,7 +1742,14 @@ def create_quiz():
             ''', (user_id, quiz_title, topic, final_content, json.dumps(question_pool), user_difficulty, quiz_type))
             
             quiz_id = cursor.lastrowid
+            
+            # Bucket the pool by difficulty once so adaptive selection never rescans it,
+            # trusting observed difficulty over the generated label where we have enough data
+            if quiz_type == 'adaptive':
+                overrides = difficulty_overrides(conn, question_pool, app.config['ITEM_STATS_MIN_RESPONSES'])
+                selection_indexes.create(quiz_id, question_pool, conn=conn, difficulty_overrides=overrides)
             conn.commit()
+        stats_service.adjust(total_quizzes=1)
             
         flash(f'Quiz "{quiz_title}" created successfully!', 'success')
         
@@ -1090,41 +1784,32 @@ def take_quiz(quiz_id):
         flash('Quiz question pool is empty. Please try recreating the quiz with different content.', 'danger')
         return redirect('/dashboard')
     
-    # Initialize session tracking for the quiz
-    if session.get('current_quiz_id') != quiz_id:
-        session['current_quiz_id'] = quiz_id
-        session['current_question_index'] = 0
-        session['score'] = 0
-        session['answered_questions'] = []
+    # Initialize server-side tracking for the quiz; the cookie only keeps its id
+    if get_quiz_state(quiz_id) is None:
+        if session.get('quiz_sid'):
+            quiz_sessions.delete(session['quiz_sid'])
         
         start_difficulty = quiz['difficulty'].lower()
         if hasattr(adaptive_engine, 'get_difficulty_index'):
-             session['current_difficulty_index'] = adaptive_engine.get_difficulty_index(start_difficulty)
+             start_difficulty_index = adaptive_engine.get_difficulty_index(start_difficulty)
         else:
-             session['current_difficulty_index'] = 1 # Default to medium index
+             start_difficulty_index = 1 # Default to medium index
         
-        initial_q = None
+        state = quiz_sessions.start(session['user_id'], quiz_id, start_difficulty_index,
+                                    session.get('user_quiz_length', 10))
+        session['quiz_sid'] = state['sid']
         
-        # 1. Try to find question matching starting difficulty
-        initial_q = next((q for q in questions_pool if q.get('difficulty', 'medium').lower() == start_difficulty), None)
-        
-        # 2. Fallback using difficulty throttling logic
-        if not initial_q:
-            fallback_order = ['medium', 'easy', 'hard']
-            
-            for fallback_diff in fallback_order:
-                # Find an unanswered question matching the fallback difficulty
-                initial_q = next((q for q in questions_pool if q.get('difficulty', 'medium').lower() == fallback_diff and q['id'] not in {q['q_id'] for q in session.get('answered_questions', [])}), None)
-                if initial_q:
-                    break
+        # Start from the quiz's difficulty, falling back with the usual throttling
+        # order; the pick is recorded as served like every later question
+        selection_indexes.reset(quiz_id)
+        initial_q, _ = prepare_next_question(quiz, state)
 
         if initial_q:
-            quiz_length = session.get('user_quiz_length', 10) 
             return render_template('single_question_quiz.html', 
                                  quiz=dict(quiz), 
                                  questions=[initial_q],
-                                 quiz_length=quiz_length,
-                                 current_index=session['current_question_index'], 
+                                 quiz_length=state['quiz_length'],
+                                 current_index=state['current_question_index'], 
                                  show_evaluation=False)
         else:
             flash('No starting question could be found. Question pool is invalid.', 'danger')
@@ -1135,11 +1820,10 @@ def take_quiz(quiz_id):
 @app.route('/submit_answer/<int:quiz_id>', methods=['POST'])
 def submit_answer(quiz_id):
     """Enhanced answer submission with multiple question type support."""
-    if not is_logged_in() or session.get('current_quiz_id') != quiz_id:
+    state = get_quiz_state(quiz_id) if is_logged_in() else None
+    if not state:
         return redirect('/dashboard')
     
-    current_difficulty_index = session.get('current_difficulty_index', 1)
-    
     with get_db_connection() as conn:
         quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ?', 
                            (quiz_id, session['user_id'])).fetchone()
@@ -1165,74 +1849,42 @@ def submit_answer(quiz_id):
         flash("Could not locate the current question in the pool. Quitting.", 'danger')
         return redirect(url_for('finalize_quiz', quiz_id=quiz_id))
 
-    # Evaluate answer using enhanced evaluation function
-    is_correct = evaluate_answer(current_question, user_answer)
-    
-    # Handle feedback
-    feedback_type = request.form.get('feedback_type', '').strip().lower()
-    feedback_comment = request.form.get('feedback_comment', '').strip()
-    flag_question = 1 if request.form.get('flag_question') else 0
-
-    if feedback_type not in {'positive', 'negative', 'neutral'}:
-        feedback_type = None
-
-    if feedback_type or feedback_comment or flag_question:
-        with get_db_connection(dict_cursor=False) as feedback_conn:
-            feedback_conn.execute(
-                '''
-                INSERT INTO question_feedback (quiz_id, question_id, user_id, feedback_type, comment, flagged, question_text)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''',
-                (
-                    quiz_id,
-                    str(question_id),
-                    session['user_id'],
-                    feedback_type,
-                    feedback_comment,
-                    flag_question,
-                    current_question.get('question_text', '')
-                )
-            )
-            feedback_conn.commit()
-
-    # Update session data
+    served, _ = prepare_next_question(quiz, state)
+    if not served or served['id'] != question_id:
+        # A resubmitted form for a question that was already answered
+        flash('That answer was already recorded.', 'info')
+        return redirect(url_for('next_question_adaptive', quiz_id=quiz_id))
+
+    answer_log = record_adaptive_answer(quiz_id, state, current_question, user_answer, time_taken,
+                                        request.form.get('feedback_type'), request.form.get('feedback_comment'),
+                                        request.form.get('flag_question'))
+    if not answer_log:
+        flash('That answer was already recorded.', 'info')
+        return redirect(url_for('next_question_adaptive', quiz_id=quiz_id))
+    is_correct = answer_log['is_correct']
     if is_correct:
-        session['score'] = session.get('score', 0) + 1
-        
-    session['answered_questions'].append({
-        'q_id': question_id,
-        'user_answer': user_answer, 
-        'difficulty': current_question['difficulty'],
-        'is_correct': is_correct,
-        'response_time': time_taken,
-        'question_type': current_question.get('question_type', 'mcq')
-    })
-    
-    # Adaptive difficulty adjustment
-    if is_correct:
-        current_difficulty_index = min(current_difficulty_index + 1, 2)
         flash('✅ Correct! Increasing difficulty for the next question.', 'success')
     else:
-        current_difficulty_index = max(current_difficulty_index - 1, 0)
         flash('❌ Incorrect. Decreasing difficulty for the next question.', 'warning')
     
-    session['current_difficulty_index'] = current_difficulty_index
-    session['current_question_index'] = session.get('current_question_index', 0) + 1
+    # Speculatively pick the next question while the learner reads the explanation, so
+    # next_question_adaptive becomes a cache lookup (and the browser can prefetch it)
+    next_question, _ = prepare_next_question(quiz, state)
+    prefetch_next = next_question is not None
     
     # Update question with response details
     current_question['user_answer'] = user_answer
     current_question['is_correct'] = is_correct
     current_question['response_time'] = time_taken
     
-    quiz_length = session.get('user_quiz_length', 10)
-
     # Show evaluation
     return render_template('single_question_quiz.html',
                          quiz=dict(quiz),
                          questions=[current_question], 
-                         quiz_length=quiz_length,
-                         current_index=session['current_question_index'],
+                         quiz_length=state['quiz_length'],
+                         current_index=state['current_question_index'],
                          show_evaluation=True,
+                         prefetch_next=prefetch_next,
                          user_answer=user_answer,
                          is_correct=is_correct,
                          correct_answer=current_question['correct_answer'],
@@ -1241,101 +1893,80 @@ def submit_answer(quiz_id):
 @app.route('/next_question_adaptive/<int:quiz_id>')
 def next_question_adaptive(quiz_id):
     """Find and display next adaptive question with difficulty throttling."""
-    if not is_logged_in() or session.get('current_quiz_id') != quiz_id:
+    state = get_quiz_state(quiz_id) if is_logged_in() else None
+    if not state:
         return redirect('/dashboard')
     
-    answered_count = session['current_question_index']
-    quiz_length = session.get('user_quiz_length', 10)
+    answered_count = state['current_question_index']
+    quiz_length = state['quiz_length']
     
     # Stop after requested number of questions
     if answered_count >= quiz_length: 
         return redirect(url_for('finalize_quiz', quiz_id=quiz_id))
     
-    # Determine required difficulty
-    required_difficulty_index = session.get('current_difficulty_index', 1)
-    
-    if hasattr(adaptive_engine, 'get_difficulty_by_index'):
-        required_difficulty = adaptive_engine.get_difficulty_by_index(required_difficulty_index).lower()
+    # Use the question submit_answer precomputed, if this worker has it
+    prefetched = next_question_cache.get((state['sid'], answered_count))
+    if prefetched:
+        quiz, next_question, notice = prefetched['quiz'], prefetched['question'], prefetched['notice']
     else:
-        required_difficulty = 'medium'
-
-
-    # Find next question
-    with get_db_connection() as conn:
-        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ?', (quiz_id,)).fetchone()
-        questions_pool = json.loads(quiz['questions'])
-    
-    answered_q_ids = {q['q_id'] for q in session.get('answered_questions', [])}
-    
-    next_question = None
-    
-    # MODIFIED LOGIC: Implement difficulty fall-back (Throttling)
-    # 1. Try required difficulty
-    required_order = [required_difficulty]
+        with get_db_connection() as conn:
+            quiz = dict(conn.execute('SELECT id, title, topic FROM quizzes WHERE id = ?', (quiz_id,)).fetchone())
+        next_question, notice = prepare_next_question(quiz, state)
     
-    # 2. Add adjacent difficulties as fallback
-    if required_difficulty == 'hard':
-        required_order.extend(['medium', 'easy'])
-    elif required_difficulty == 'easy':
-        required_order.extend(['medium', 'hard'])
-    else: # medium
-        if random.choice([True, False]):
-            required_order.extend(['hard', 'easy'])
-        else:
-            required_order.extend(['easy', 'hard'])
-
-    # Search through the prioritized order of difficulties
-    for difficulty in required_order:
-        next_question = next((q for q in questions_pool 
-                               if q.get('difficulty', 'medium').lower() == difficulty and q['id'] not in answered_q_ids), None)
-        if next_question:
-            if difficulty != required_difficulty:
-                # Notify the user that throttling occurred
-                flash(f"⚠️ Could not find a **{required_difficulty.capitalize()}** question. Using a **{difficulty.capitalize()}** question instead to keep the quiz flowing.", 'info')
-            break
-            
     if next_question:
+        if notice:
+            flash(notice, 'info')
         return render_template('single_question_quiz.html',
-                             quiz=dict(quiz),
+                             quiz=quiz,
                              questions=[next_question],
                              quiz_length=quiz_length,
                              current_index=answered_count, 
                              show_evaluation=False)
     else:
-        # Final fallback: just get any remaining un-answered question, regardless of difficulty
-        next_question_any = next((q for q in questions_pool if q['id'] not in answered_q_ids), None)
-        
-        if next_question_any:
-            flash(f"⚠️ Question pool exhausted for the adaptive path. Using the next available question.", 'info')
-            return render_template('single_question_quiz.html',
-                                 quiz=dict(quiz),
-                                 questions=[next_question_any],
-                                 quiz_length=quiz_length,
-                                 current_index=answered_count, 
-                                 show_evaluation=False)
-        else:
-            flash("You've exhausted the question pool. Finalizing quiz.", 'info')
-            return redirect(url_for('finalize_quiz', quiz_id=quiz_id))
+        flash("You've exhausted the question pool. Finalizing quiz.", 'info')
+        return redirect(url_for('finalize_quiz', quiz_id=quiz_id))
 
 @app.route('/finalize_quiz/<int:quiz_id>')
 def finalize_quiz(quiz_id):
     """Finalize adaptive quiz and save results."""
-    if not is_logged_in() or session.get('current_quiz_id') != quiz_id:
+    state = get_quiz_state(quiz_id) if is_logged_in() else None
+    if not state:
         return redirect('/dashboard')
 
-    answered_log = session.get('answered_questions', [])
+    answered_log = quiz_sessions.answers(state['sid'])
     total_answered = len(answered_log)
-    total_correct = session.get('score', 0)
+    total_correct = state['score']
     
     final_score = (total_correct / total_answered) * 100 if total_answered > 0 else 0
+    total_time = sum(log['response_time'] for log in answered_log)
+    completed_at = datetime.now()
     
     with get_db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
         quiz = conn.execute('SELECT * FROM quizzes WHERE id = ?', (quiz_id,)).fetchone()
-        
-        # Update Performance Table
         full_pool = json.loads(quiz['questions'])
         final_questions_map = {q['id']: q for q in full_pool}
+        for seq, log in enumerate(answered_log):
+            # Merge user response data
+            if log['q_id'] in final_questions_map:
+                final_questions_map[log['q_id']]['user_answer'] = log.get('user_answer', '') 
+                final_questions_map[log['q_id']]['is_correct'] = log['is_correct']
+                final_questions_map[log['q_id']]['response_time'] = log['response_time']
+                final_questions_map[log['q_id']]['answer_seq'] = seq  # Pool order is not answer order
+
+        # Completing the quiz guards everything below: the rollups are incremental, so a
+        # second finalize (two tabs, a resent request) must not apply them again
+        completed = conn.execute('''UPDATE quizzes 
+                       SET score = ?, status = ?, questions = ?, total_time = ?, completed_at = ?
+                       WHERE id = ? AND status != ?''',
+                    (final_score, 'completed', json.dumps(list(final_questions_map.values())),
+                     total_time, completed_at, quiz_id, 'completed')).rowcount
+        if completed != 1:
+            conn.rollback()
+            session.pop('quiz_sid', None)
+            return redirect(f'/performance/{quiz_id}')
 
+        # Update Performance Table
         for log in answered_log:
             q_detail = final_questions_map.get(log['q_id'], {})
             
@@ -1344,39 +1975,33 @@ def finalize_quiz(quiz_id):
                 topic=quiz['topic'],
                 difficulty=q_detail.get('difficulty', 'medium'),
                 is_correct=log['is_correct'],
-                response_time=log['response_time']
+                response_time=log['response_time'],
+                conn=conn
             )
-            
-            # Merge user response data
-            if log['q_id'] in final_questions_map:
-                final_questions_map[log['q_id']]['user_answer'] = log.get('user_answer', '') 
-                final_questions_map[log['q_id']]['is_correct'] = log['is_correct']
-                final_questions_map[log['q_id']]['response_time'] = log['response_time']
 
         # Update user skill level
         next_difficulty = adaptive_engine.calculate_next_difficulty(
             user_id=session['user_id'],
             topic=quiz['topic'],
-            current_score=final_score
+            current_score=final_score,
+            conn=conn
         )
-        conn.execute('UPDATE users SET skill_level = ? WHERE id = ?', 
-                     (next_difficulty.capitalize(), session['user_id']))
+        adaptive_engine.set_skill_level(session['user_id'], next_difficulty.capitalize(), conn=conn)
         
         session['skill_level'] = next_difficulty.capitalize()
 
-        # Update quiz status
-        conn.execute('''UPDATE quizzes 
-                       SET score = ?, status = ?, questions = ?
-                       WHERE id = ?''',
-                    (final_score, 'completed', json.dumps(list(final_questions_map.values())), quiz_id))
+        record_completed_quiz(conn, session['user_id'], quiz['topic'], final_score, final_questions_map.values())
+        record_quiz_weakness(conn, session['user_id'], quiz['topic'], final_questions_map.values())
+        record_activity(conn, session['user_id'], completed_at)
+        review_scheduler.record_missed(conn, session['user_id'], quiz_id, quiz['topic'], final_questions_map.values())
+        selection_indexes.discard(quiz_id, conn=conn)
+        quiz_sessions.delete(state['sid'], conn=conn)
         conn.commit()
+    leaderboards.record(quiz['topic'], quiz['difficulty'], quiz_id, session['user_id'], final_score, total_time, completed_at)
+    stats_service.adjust(completed_quizzes=1)
     
     # Clear session
-    session.pop('current_quiz_id', None)
-    session.pop('current_question_index', None)
-    session.pop('score', None)
-    session.pop('answered_questions', None)
-    session.pop('current_difficulty_index', None)
+    session.pop('quiz_sid', None)
     session.pop('user_quiz_length', None)
     
     # Update session stats
@@ -1390,6 +2015,184 @@ def finalize_quiz(quiz_id):
     
     return redirect(f'/performance/{quiz_id}')
 
+# =========================================================================
+# === ADAPTIVE QUIZ JSON API
+# =========================================================================
+
+def adaptive_progress(quiz_id, state):
+    return {
+        'answered': state['current_question_index'],
+        'quiz_length': state['quiz_length'],
+        'score': state['score'],
+        'finalize_url': url_for('finalize_quiz', quiz_id=quiz_id)
+    }
+
+def load_adaptive_quiz_for_api(quiz_id):
+    """(state, quiz, error response) for the JSON API; exactly one of state/error is set."""
+    if not is_logged_in():
+        return None, None, (jsonify({'success': False, 'error': 'Not logged in'}), 401)
+    state = get_quiz_state(quiz_id)
+    if not state:
+        return None, None, (jsonify({'success': False, 'error': 'No adaptive quiz in progress'}), 404)
+    with get_db_connection() as conn:
+        quiz = conn.execute('SELECT id, title, topic, questions FROM quizzes WHERE id = ? AND user_id = ?',
+                            (quiz_id, session['user_id'])).fetchone()
+    if not quiz:
+        return None, None, (jsonify({'success': False, 'error': 'Quiz not found'}), 404)
+    return state, quiz, None
+
+def parse_api_answer(entry):
+    """(question_id, answer string, time_taken) from an API answer object; raises ValueError/TypeError."""
+    user_answer = entry.get('answer', '')
+    if isinstance(user_answer, list):  # checkbox questions
+        user_answer = ','.join(str(a) for a in user_answer)
+    return int(entry.get('question_id', 0)), str(user_answer).strip(), int(entry.get('time_taken', 1))
+
+@app.route('/api/quiz/<int:quiz_id>/answer', methods=['POST'])
+def api_quiz_answer(quiz_id):
+    """
+    Submits one adaptive answer. Returns the evaluation and the next question
+    in one response, so the quiz page updates in place with one request per
+    question. Body: {question_id, answer (string or list), time_taken, seq?,
+    feedback_type?, feedback_comment?, flag_question?}
+
+    Only the question currently served at this position is accepted (`seq`,
+    when sent, must be that position). Resending an answer that was already
+    recorded returns its evaluation again without applying it twice.
+    """
+    state, quiz, error = load_adaptive_quiz_for_api(quiz_id)
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    try:
+        question_id, user_answer, time_taken = parse_api_answer(data)
+        seq = int(data['seq']) if data.get('seq') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid question_id, seq or time_taken'}), 400
+
+    question = next((q for q in json.loads(quiz['questions']) if q.get('id') == question_id), None)
+    if not question:
+        return jsonify({'success': False, 'error': 'Question not found in this quiz'}), 404
+
+    position = state['current_question_index']
+    served, _ = prepare_next_question(quiz, state)
+    if (seq is not None and seq != position) or not served or served['id'] != question_id:
+        answer_log = quiz_sessions.answers(state['sid'])
+        recorded_seq = len(answer_log) - 1 if seq is None else seq
+        if 0 <= recorded_seq < len(answer_log) and answer_log[recorded_seq]['q_id'] == question_id:
+            # A retried submission: report what was recorded instead of applying it again
+            next_question, notice = prepare_next_question(quiz, state)
+            return jsonify({
+                'success': True,
+                'duplicate': True,
+                'evaluation': answer_evaluation(question, answer_log[recorded_seq]),
+                'progress': adaptive_progress(quiz_id, state),
+                'next': public_question(next_question) if next_question else None,
+                'notice': notice
+            })
+        if position >= state['quiz_length']:
+            return jsonify({'success': False, 'error': 'Quiz already complete', **adaptive_progress(quiz_id, state)}), 409
+        return jsonify({'success': False, 'error': 'Not the current question; reload it',
+                        'progress': adaptive_progress(quiz_id, state)}), 409
+
+    answer_log = record_adaptive_answer(quiz_id, state, question, user_answer, time_taken, data.get('feedback_type'),
+                                        data.get('feedback_comment'), data.get('flag_question'))
+    if not answer_log:
+        return jsonify({'success': False, 'error': 'Answer already recorded; reload the current question'}), 409
+
+    next_question, notice = prepare_next_question(quiz, state)
+    return jsonify({
+        'success': True,
+        'evaluation': answer_evaluation(question, answer_log),
+        'progress': adaptive_progress(quiz_id, state),
+        'next': public_question(next_question) if next_question else None,
+        'notice': notice
+    })
+
+@app.route('/api/quiz/<int:quiz_id>/answers/batch', methods=['POST'])
+def api_quiz_answer_batch(quiz_id):
+    """
+    Records the answer to the question on screen, resend-safe.
+
+    Body: {answers: [{seq, question_id, answer, time_taken, feedback_type?,
+    feedback_comment?, flag_question?}]}, where seq is the 0-based position
+    the answer was given at. Entries already recorded (seq below the current
+    position) are skipped if they match the recorded question, so a client
+    may resend until it gets a response. Only the current position can hold a
+    new answer, and only for the question served there: later questions are
+    picked by the server once this one is answered, so a client never holds
+    more than one unanswered question. Returns evaluations for every entry,
+    the resulting progress and the next question.
+    """
+    state, quiz, error = load_adaptive_quiz_for_api(quiz_id)
+    if error:
+        return error
+
+    entries = (request.get_json(silent=True) or {}).get('answers')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'success': False, 'error': 'answers must be a non-empty list'}), 400
+    try:
+        entries = sorted(({**entry, 'seq': int(entry['seq'])} for entry in entries), key=lambda e: e['seq'])
+        parsed = [parse_api_answer(entry) for entry in entries]
+    except (TypeError, ValueError, KeyError):
+        return jsonify({'success': False, 'error': 'Each answer needs an integer seq, question_id and time_taken'}), 400
+
+    pool = {q.get('id'): q for q in json.loads(quiz['questions'])}
+    start = state['current_question_index']
+    answer_log = quiz_sessions.answers(state['sid'])
+    pending = [(entry, answer) for entry, answer in zip(entries, parsed) if entry['seq'] >= start]
+    for entry, (question_id, _, _) in zip(entries, parsed):
+        if question_id not in pool:
+            return jsonify({'success': False, 'error': f'Question {question_id} is not in this quiz'}), 400
+        if entry['seq'] < start and (entry['seq'] >= len(answer_log) or answer_log[entry['seq']]['q_id'] != question_id):
+            return jsonify({'success': False, 'error': f'Position {entry["seq"]} was answered for another question',
+                            'progress': adaptive_progress(quiz_id, state)}), 409
+    if len(pending) > 1 or (pending and pending[0][0]['seq'] != start):
+        return jsonify({'success': False, 'error': f'Only position {start} has been served',
+                        'progress': adaptive_progress(quiz_id, state)}), 409
+
+    if pending:
+        entry, (question_id, user_answer, time_taken) = pending[0]
+        served, _ = prepare_next_question(quiz, state)
+        if not served or served['id'] != question_id or any(log['q_id'] == question_id for log in answer_log):
+            return jsonify({'success': False, 'error': 'Not the question served at this position; reload it',
+                            'progress': adaptive_progress(quiz_id, state)}), 409
+        if not record_adaptive_answer(quiz_id, state, pool[question_id], user_answer, time_taken,
+                                      entry.get('feedback_type'), entry.get('feedback_comment'),
+                                      entry.get('flag_question')):
+            # Another request advanced the quiz meanwhile; the client resends and its duplicate is skipped
+            return jsonify({'success': False, 'error': 'Quiz progressed concurrently; resend the batch'}), 409
+        answer_log = quiz_sessions.answers(state['sid'])
+
+    evaluations = [answer_evaluation(pool.get(answer_log[entry['seq']]['q_id'], {}), answer_log[entry['seq']])
+                   for entry in entries if entry['seq'] < len(answer_log)]
+    next_question, notice = prepare_next_question(quiz, state)
+    return jsonify({
+        'success': True,
+        'applied': len(pending),
+        'duplicates': len(entries) - len(pending),
+        'evaluations': evaluations,
+        'progress': adaptive_progress(quiz_id, state),
+        'next': public_question(next_question) if next_question else None,
+        'notice': notice
+    })
+
+@app.route('/api/quiz/<int:quiz_id>/next')
+def api_quiz_next(quiz_id):
+    """The question to answer now (null once the quiz is over and should be finalized)."""
+    state, quiz, error = load_adaptive_quiz_for_api(quiz_id)
+    if error:
+        return error
+
+    next_question, notice = prepare_next_question(quiz, state)
+    return jsonify({
+        'success': True,
+        'progress': adaptive_progress(quiz_id, state),
+        'next': public_question(next_question) if next_question else None,
+        'notice': notice
+    })
+
 # =========================================================================
 # === SIMPLE QUIZ FLOW
 # =========================================================================
@@ -1401,8 +2204,8 @@ def take_simple_quiz(quiz_id):
         return redirect('/login')
     
     with get_db_connection() as conn:
-        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ? AND quiz_type = ?', 
-                           (quiz_id, session['user_id'], 'simple')).fetchone()
+        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ? AND quiz_type IN (?, ?)', 
+                           (quiz_id, session['user_id'], 'simple', REVIEW_QUIZ_TYPE)).fetchone()
     
     if not quiz:
         flash('Simple Quiz not found or is an adaptive quiz.', 'danger')
@@ -1424,8 +2227,8 @@ def submit_quiz(quiz_id):
     user_id = session['user_id']
     
     with get_db_connection() as conn:
-        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ? AND quiz_type = ?', 
-                           (quiz_id, user_id, 'simple')).fetchone()
+        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ? AND quiz_type IN (?, ?)', 
+                           (quiz_id, user_id, 'simple', REVIEW_QUIZ_TYPE)).fetchone()
 
     if not quiz or quiz['status'] == 'completed':
         flash('Quiz not found or already completed.', 'danger')
@@ -1492,53 +2295,89 @@ def submit_quiz(quiz_id):
     
     final_score = (correct_count / total_questions) * 100 if total_questions > 0 else 0
     
+    total_time = sum(log['response_time'] for log in answered_log)
+    completed_at = datetime.now()
+
+    # Completing the quiz guards everything below: the rollups are incremental, so a
+    # double submit (two tabs, a resent POST) must not apply them again
+    conn.execute('BEGIN IMMEDIATE')
+    completed = conn.execute('''UPDATE quizzes 
+                   SET score = ?, status = ?, questions = ?, total_time = ?, completed_at = ?
+                   WHERE id = ? AND status != ?''',
+                (final_score, 'completed', json.dumps(questions), total_time, completed_at, quiz_id, 'completed')).rowcount
+    if completed != 1:
+        conn.rollback()
+        flash('Quiz not found or already completed.', 'danger')
+        return redirect('/dashboard')
+
     # Save feedback
-    if feedback_entries:
-        with get_db_connection(dict_cursor=False) as feedback_conn:
-            for entry in feedback_entries:
-                feedback_conn.execute(
-                    '''
-                    INSERT INTO question_feedback (quiz_id, question_id, user_id, feedback_type, comment, flagged, question_text)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''',
-                    (
-                        entry['quiz_id'],
-                        entry['question_id'],
-                        user_id,
-                        entry['feedback_type'],
-                        entry['feedback_comment'],
-                        entry['flagged'],
-                        entry['question_text']
-                    )
-                )
-            feedback_conn.commit()
+    for entry in feedback_entries:
+        conn.execute(
+            '''
+            INSERT INTO question_feedback (quiz_id, question_id, user_id, feedback_type, comment, flagged, question_text)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (
+                entry['quiz_id'],
+                entry['question_id'],
+                user_id,
+                entry['feedback_type'],
+                entry['feedback_comment'],
+                entry['flagged'],
+                entry['question_text']
+            )
+        )
 
-    # Update performance and skill level
-    for log in answered_log:
-        q_detail = question_map.get(log['q_id'], {})
-        adaptive_engine.update_performance(
+    is_review = quiz['quiz_type'] == REVIEW_QUIZ_TYPE
+    if is_review:
+        # A review only reschedules its items: re-answering questions the learner
+        # already missed says nothing new about their level, so skill, ratings,
+        # performance and topic rollups are left alone
+        for question in questions:
+            if question.get('review_item_id'):
+                review_scheduler.record_review(conn, user_id, question['review_item_id'], question['is_correct'])
+    else:
+        # Update performance and skill level
+        for log in answered_log:
+            q_detail = question_map.get(log['q_id'], {})
+            adaptive_engine.update_performance(
+                user_id=user_id,
+                topic=quiz['topic'],
+                difficulty=q_detail.get('difficulty', 'medium'),
+                is_correct=log['is_correct'],
+                response_time=log['response_time'],
+                conn=conn
+            )
+
+        next_difficulty = adaptive_engine.calculate_next_difficulty(
             user_id=user_id,
             topic=quiz['topic'],
-            difficulty=q_detail.get('difficulty', 'medium'),
-            is_correct=log['is_correct'],
-            response_time=log['response_time']
+            current_score=final_score,
+            conn=conn
         )
-    
-    next_difficulty = adaptive_engine.calculate_next_difficulty(
-        user_id=user_id,
-        topic=quiz['topic'],
-        current_score=final_score
-    )
-    conn.execute('UPDATE users SET skill_level = ? WHERE id = ?', 
-                 (next_difficulty.capitalize(), user_id))
-    session['skill_level'] = next_difficulty.capitalize()
-
-    # Update quiz
-    conn.execute('''UPDATE quizzes 
-                   SET score = ?, status = ?, questions = ?
-                   WHERE id = ?''',
-                (final_score, 'completed', json.dumps(questions), quiz_id))
+        adaptive_engine.set_skill_level(user_id, next_difficulty.capitalize(), conn=conn)
+
+        for log in answered_log:
+            rating_engine.record_response(user_id, quiz_id, log['q_id'], log['difficulty'], log['is_correct'], conn=conn)
+        session['skill_level'] = next_difficulty.capitalize()
+
+        # Queue newly missed questions for review
+        review_scheduler.record_missed(conn, user_id, quiz_id, quiz['topic'], questions)
+        record_completed_quiz(conn, user_id, quiz['topic'], final_score, questions)
+        record_quiz_weakness(conn, user_id, quiz['topic'], questions)
+
+    record_activity(conn, user_id, completed_at)
     conn.commit()
+    if feedback_entries:
+        stats_service.adjust(
+            total_feedback=len(feedback_entries),
+            flagged_open=sum(entry['flagged'] for entry in feedback_entries),
+            **{f"feedback_{t}": sum(1 for e in feedback_entries if e['feedback_type'] == t)
+               for t in ('positive', 'negative', 'neutral')}
+        )
+    if not is_review:
+        leaderboards.record(quiz['topic'], quiz['difficulty'], quiz_id, user_id, final_score, total_time, completed_at)
+    stats_service.adjust(completed_quizzes=1)
 
     # Update session stats
     with get_db_connection() as conn_stats:
@@ -1558,24 +2397,30 @@ def logout():
     flash('You have been logged out.', 'info')
     return redirect('/')
 
-@app.route('/performance/<int:quiz_id>')
-def performance_analysis(quiz_id):
-    """Enhanced performance analysis with AI suggestions link."""
-    if not is_logged_in():
-        return redirect('/login')
+def get_completed_quiz_header(quiz_id, user_id):
+    """Reads a quiz's metadata (not the questions blob), the cheap part of a completed-quiz page."""
+    with get_db_connection() as conn:
+        return conn.execute('''
+            SELECT id, user_id, title, topic, difficulty, quiz_type, score, status, created_at, completed_at
+            FROM quizzes WHERE id = ? AND user_id = ?
+        ''', (quiz_id, user_id)).fetchone()
 
+def get_answered_questions(quiz_id):
     with get_db_connection() as conn:
-        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ?', 
-                           (quiz_id, session['user_id'])).fetchone()
+        questions = json.loads(conn.execute('SELECT questions FROM quizzes WHERE id = ?', (quiz_id,)).fetchone()[0])
+    return [q for q in questions if 'user_answer' in q]
 
-    if not quiz or quiz['status'] != 'completed':
-        flash('Quiz not found or not completed.', 'danger')
-        return redirect('/dashboard')
-    
-    questions = json.loads(quiz['questions'])
-    
+def completed_quiz_etag(page, quiz):
+    """Completed quizzes never change, so (page, quiz, owner, completion time, templates) pins the output."""
+    return strong_etag(page, quiz['id'], quiz['user_id'], quiz['completed_at'], TEMPLATES_VERSION)
+
+def quiz_quote(quiz_id):
+    """Motivational quote fixed per quiz so completed-quiz pages stay byte-identical across views."""
+    return MOTIVATIONAL_QUOTES[quiz_id % len(MOTIVATIONAL_QUOTES)]
+
+def build_performance_payload(quiz_id):
     # Filter answered questions
-    final_questions = [q for q in questions if 'user_answer' in q]
+    final_questions = get_answered_questions(quiz_id)
 
     total_questions = len(final_questions)
     correct_count = sum(1 for q in final_questions if q.get('is_correct'))
@@ -1621,100 +2466,150 @@ def performance_analysis(quiz_id):
 
     avg_time_per_q = total_time / total_questions if total_questions else 0
 
-    # Select motivational quote for performance page too
-    motivational_quote = random.choice(MOTIVATIONAL_QUOTES)
-
-    return render_template(
-        'performance_analysis.html', 
-        quiz=dict(quiz),
-        score=score, 
-        correct_count=correct_count,
-        incorrect_count=incorrect_count,
-        total_questions=total_questions,
-        difficulty_breakdown=difficulty_breakdown,
-        type_breakdown=type_breakdown,
-        total_time=total_time,
-        avg_time_per_q=avg_time_per_q,
-        questions=final_questions,
-        time_per_q_list=time_per_q_list,
-        motivational_quote=motivational_quote,
-        quiz_id=quiz_id
-    )
+    return {
+        'score': score,
+        'correct_count': correct_count,
+        'incorrect_count': incorrect_count,
+        'total_questions': total_questions,
+        'difficulty_breakdown': difficulty_breakdown,
+        'type_breakdown': type_breakdown,
+        'total_time': total_time,
+        'avg_time_per_q': avg_time_per_q,
+        'questions': final_questions,
+        'time_per_q_list': time_per_q_list
+    }
 
-@app.route('/ai_suggestions/<int:quiz_id>')
-def ai_suggestions(quiz_id):
-    """Generate AI-powered learning suggestions based on quiz performance."""
+@app.route('/performance/<int:quiz_id>')
+def performance_analysis(quiz_id):
+    """Enhanced performance analysis with AI suggestions link."""
     if not is_logged_in():
         return redirect('/login')
 
-    with get_db_connection() as conn:
-        quiz = conn.execute('SELECT * FROM quizzes WHERE id = ? AND user_id = ?', 
-                           (quiz_id, session['user_id'])).fetchone()
+    quiz = get_completed_quiz_header(quiz_id, session['user_id'])
 
     if not quiz or quiz['status'] != 'completed':
         flash('Quiz not found or not completed.', 'danger')
-        return redirect(f'/performance/{quiz_id}')
-    
-    questions = json.loads(quiz['questions'])
-    answered_questions = [q for q in questions if 'user_answer' in q]
-    
+        return redirect('/dashboard')
+
+    # Completed quizzes are immutable: revalidate by ETag, compute the analysis once
+    etag = completed_quiz_etag('performance', quiz)
+    if is_not_modified(etag):
+        return with_etag(make_response('', 304), etag)
+    cacheable = not has_pending_flashes()
+
+    payload = analysis_cache.get(('performance', quiz_id, quiz['completed_at']))
+    if payload is None:
+        payload = build_performance_payload(quiz_id)
+        analysis_cache.set(('performance', quiz_id, quiz['completed_at']), payload)
+
+    response = make_response(render_template(
+        'performance_analysis.html', 
+        quiz=dict(quiz),
+        motivational_quote=quiz_quote(quiz_id),
+        quiz_id=quiz_id,
+        **payload
+    ))
+    return with_etag(response, etag, cacheable)
+
+def profile_performance(profile, dimension):
+    """Per-value totals and recent accuracy (%) from a weakness profile, ignoring values with too few attempts."""
+    return {
+        value: {'correct': stats['correct'], 'total': stats['attempts'], 'accuracy': stats['recent_accuracy'] * 100}
+        for value, stats in profile.get(dimension, {}).items()
+        if stats['attempts'] >= MIN_ATTEMPTS
+    }
+
+def build_suggestions_payload(quiz_id, quiz_topic, profile):
+    answered_questions = get_answered_questions(quiz_id)
     if not answered_questions:
-        flash('No questions found for analysis.', 'danger')
-        return redirect(f'/performance/{quiz_id}')
+        return None
     
     # Analyze performance
     total_questions = len(answered_questions)
     correct_count = sum(1 for q in answered_questions if q.get('is_correct'))
     score = (correct_count / total_questions) * 100
     
-    # Identify weak areas
-    incorrect_questions = [q for q in answered_questions if not q.get('is_correct')]
-    weak_topics = {}
-    
-    for q in incorrect_questions:
-        topic = q.get('topic', 'General')
-        weak_topics[topic] = weak_topics.get(topic, 0) + 1
-    
-    # Difficulty analysis
-    difficulty_performance = {}
-    for q in answered_questions:
-        diff = q.get('difficulty', 'Medium')
-        if diff not in difficulty_performance:
-            difficulty_performance[diff] = {'correct': 0, 'total': 0}
-        difficulty_performance[diff]['total'] += 1
-        if q.get('is_correct'):
-            difficulty_performance[diff]['correct'] += 1
+    if profile['topic']:
+        # Weak areas across the learner's whole history, from the incremental profile
+        weak_topics = {topic: stats['attempts'] - stats['correct'] for topic, stats in weak_values(profile, 'topic')}
+        difficulty_performance = {diff.capitalize(): stats for diff, stats in profile_performance(profile, 'difficulty').items()}
+        type_performance = profile_performance(profile, 'question_type')
+    else:
+        # Profile not backfilled yet: fall back to this quiz alone
+        incorrect_count = total_questions - correct_count
+        weak_topics = {quiz_topic: incorrect_count} if incorrect_count else {}
+        difficulty_performance = {}
+        for q in answered_questions:
+            diff = q.get('difficulty', 'Medium').capitalize()
+            if diff not in difficulty_performance:
+                difficulty_performance[diff] = {'correct': 0, 'total': 0}
+            difficulty_performance[diff]['total'] += 1
+            if q.get('is_correct'):
+                difficulty_performance[diff]['correct'] += 1
+        type_performance = None
     
     # Generate AI suggestions
-    suggestions = generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz['topic'])
-    
-    # Select random motivational quote
-    motivational_quote = random.choice(MOTIVATIONAL_QUOTES)
+    suggestions = generate_ai_suggestions(score, weak_topics, difficulty_performance, quiz_topic, type_performance)
     
     # Voice message based on performance
     if score >= 90:
-        voice_message = f"Outstanding! You scored {score:.1f}%! You're mastering {quiz['topic']}!"
+        voice_message = f"Outstanding! You scored {score:.1f}%! You're mastering {quiz_topic}!"
         performance_level = "excellent"
     elif score >= 75:
-        voice_message = f"Great work! {score:.1f}% shows solid understanding of {quiz['topic']}!"
+        voice_message = f"Great work! {score:.1f}% shows solid understanding of {quiz_topic}!"
         performance_level = "good"
     elif score >= 60:
-        voice_message = f"Good effort! {score:.1f}% - keep practicing to improve your {quiz['topic']} skills!"
+        voice_message = f"Good effort! {score:.1f}% - keep practicing to improve your {quiz_topic} skills!"
         performance_level = "average"
     else:
-        voice_message = f"Don't give up! {score:.1f}% is a starting point. Focus on the basics of {quiz['topic']}!"
+        voice_message = f"Don't give up! {score:.1f}% is a starting point. Focus on the basics of {quiz_topic}!"
         performance_level = "improving"
-    
-    return render_template('ai_suggestions.html',
+
+    return {
+        'score': score,
+        'correct_count': correct_count,
+        'total_questions': total_questions,
+        'suggestions': suggestions,
+        'weak_topics': weak_topics,
+        'voice_message': voice_message,
+        'performance_level': performance_level
+    }
+
+@app.route('/ai_suggestions/<int:quiz_id>')
+def ai_suggestions(quiz_id):
+    """Generate AI-powered learning suggestions based on quiz performance."""
+    if not is_logged_in():
+        return redirect('/login')
+
+    quiz = get_completed_quiz_header(quiz_id, session['user_id'])
+
+    if not quiz or quiz['status'] != 'completed':
+        flash('Quiz not found or not completed.', 'danger')
+        return redirect(f'/performance/{quiz_id}')
+
+    # Suggestions also follow the learner's later quizzes, so the profile version is part of the validator
+    with get_db_connection() as conn:
+        profile, profile_version = load_weakness_profile(conn, session['user_id'])
+
+    etag = strong_etag(completed_quiz_etag('ai_suggestions', quiz), profile_version)
+    if is_not_modified(etag):
+        return with_etag(make_response('', 304), etag)
+    cacheable = not has_pending_flashes()
+
+    cache_key = ('ai_suggestions', quiz_id, quiz['completed_at'], profile_version)
+    payload = analysis_cache.get(cache_key)
+    if payload is None:
+        payload = build_suggestions_payload(quiz_id, quiz['topic'], profile)
+        if payload is None:
+            flash('No questions found for analysis.', 'danger')
+            return redirect(f'/performance/{quiz_id}')
+        analysis_cache.set(cache_key, payload)
+    
+    response = make_response(render_template('ai_suggestions.html',
                          quiz=dict(quiz),
-                         score=score,
-                         correct_count=correct_count,
-                         total_questions=total_questions,
-                         suggestions=suggestions,
-                         weak_topics=weak_topics,
-                         motivational_quote=motivational_quote,
-                         voice_message=voice_message,
-                         performance_level=performance_level)
+                         motivational_quote=quiz_quote(quiz_id),
+                         **payload))
+    return with_etag(response, etag, cacheable)
 
 @app.route('/results/<int:quiz_id>')
 def quiz_results(quiz_id):
@@ -1723,65 +2618,52 @@ def quiz_results(quiz_id):
 
 @app.route('/leaderboard/<int:quiz_id>')
 def leaderboard(quiz_id):
-    """Leaderboard route showing top scores for the quiz topic."""
+    """Leaderboard route showing ranked attempts for the quiz topic and difficulty."""
     if not is_logged_in():
         return redirect('/login')
     
     with get_db_connection() as conn:
         # 1. Get the details of the quiz to identify Topic and Difficulty
-        current_quiz = conn.execute('SELECT * FROM quizzes WHERE id = ?', (quiz_id,)).fetchone()
+        current_quiz = conn.execute('SELECT id, title, topic, difficulty FROM quizzes WHERE id = ?', (quiz_id,)).fetchone()
         
         if not current_quiz:
             flash('Quiz not found.', 'danger')
             return redirect('/dashboard')
 
-        topic = current_quiz['topic']
-        difficulty = current_quiz['difficulty']
+    # 2. Ranked board for this Topic + Difficulty (maintained on completion, keyset-paginated)
+    board = leaderboards.get(current_quiz['topic'], current_quiz['difficulty'])
+    after = decode_cursor(request.args.get('after'))
+    attempts, next_cursor = board.page(after, limit=app.config['LEADERBOARD_PAGE_SIZE'])
+    your_rank = board.user_rank(session['user_id'])
 
-        # 2. Get top 50 attempts for this Topic + Difficulty
-        # We join with the users table to get usernames
-        leaderboard_data = conn.execute('''
-            SELECT u.username, u.id as user_id, q.score, q.created_at, q.questions
-            FROM quizzes q
-            JOIN users u ON q.user_id = u.id
-            WHERE q.topic = ? 
-              AND q.difficulty = ? 
-              AND q.status = 'completed'
-            ORDER BY q.score DESC
-            LIMIT 50
-        ''', (topic, difficulty)).fetchall()
-
-    # 3. Process data (Calculate total time from JSON data since it's not a column)
-    attempts = []
-    for row in leaderboard_data:
-        total_time = 0
-        try:
-            # Parse questions JSON to sum up response times
-            questions_data = json.loads(row['questions'])
-            total_time = sum(q.get('response_time', 0) for q in questions_data if 'user_answer' in q)
-        except:
-            total_time = 0
+    # 3. Resolve usernames for the visible rows only
+    user_ids = {a['user_id'] for a in attempts}
+    if your_rank:
+        user_ids.add(your_rank['user_id'])
+    with get_db_connection() as conn:
+        placeholders = ','.join('?' for _ in user_ids)
+        usernames = dict(conn.execute(f'SELECT id, username FROM users WHERE id IN ({placeholders})',
+                                      tuple(user_ids)).fetchall()) if user_ids else {}
+
+    for attempt in attempts + ([your_rank] if your_rank else []):
+        attempt['username'] = usernames.get(attempt['user_id'], 'Unknown')
 
         # Handle date parsing safely
-        completed_at = row['created_at']
+        completed_at = attempt['completed_at']
         if isinstance(completed_at, str):
             try:
                 completed_at = datetime.strptime(completed_at.split('.')[0], '%Y-%m-%d %H:%M:%S')
             except ValueError:
                 completed_at = datetime.now() # Fallback
+        attempt['completed_at'] = completed_at or datetime.now()
 
-        attempts.append({
-            'username': row['username'],
-            'user_id': row['user_id'],
-            'score': row['score'],
-            'total_time': total_time,
-            'completed_at': completed_at
-        })
-
-    # 4. Sort: Primary = Score (High to Low), Secondary = Time (Low to High)
-    attempts.sort(key=lambda x: (-x['score'], x['total_time']))
-
-    return render_template('leaderboard.html', quiz=dict(current_quiz), attempts=attempts)
+    return render_template('leaderboard.html',
+                           quiz=dict(current_quiz),
+                           attempts=attempts,
+                           your_rank=your_rank,
+                           total_attempts=len(board),
+                           next_cursor=next_cursor,
+                           is_first_page=after is None)
 
 @app.route('/feedback', methods=['GET', 'POST'])
 def feedback():
@@ -1821,6 +2703,7 @@ if __name__ == '__main__':
     
     with app.app_context():
         init_db()
+    analytics_replica.start_background_refresh()
     
     # Run on a common port for web applications
     app.run(debug=True, port=5000)
@@ -0,0 +1,130 @@
+"""
+Render-time and bytes-on-wire benchmark for the heaviest pages.
+
+Builds a throwaway database in a temp directory, creates a learner with an
+open full-pool simple quiz and a completed one, then requests each page
+through the Flask test client and reports per route:
+
+  * first-request time (cold fragment cache) and median warm time
+  * response size uncompressed, gzip and (if installed) brotli
+
+Example:
+    python bench_render.py --requests 50 --pool-size 30
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+
+def _setup(smart_app, pool_size):
+    client = smart_app.app.test_client()
+    client.post('/register', data={'username': 'bench', 'email': 'bench@bench.local', 'password': 'bench',
+                                   'security_q': 'q', 'security_a': 'a'})
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    def create_simple_quiz():
+        response = client.post('/create_quiz', data={
+            'topic': 'Benchmarking', 'difficulty': 'medium', 'num_questions': pool_size,
+            'quiz_type': 'simple', 'content': 'Render caching and response compression.'
+        })
+        return int(re.search(r'/quiz_simple/(\d+)', response.headers['Location']).group(1))
+
+    open_quiz = create_simple_quiz()
+    done_quiz = create_simple_quiz()
+    html = client.get(f'/quiz_simple/{done_quiz}').get_data(as_text=True)
+    answers = {}
+    for question_id in set(re.findall(r'name="answer_(\d+)"', html)):
+        answers[f'answer_{question_id}'] = 'True'
+        answers[f'time_{question_id}'] = 5
+    client.post(f'/submit_quiz/{done_quiz}', data=answers)
+
+    admin = smart_app.app.test_client()
+    admin.post('/admin/login', data={'username': 'admin', 'password': 'Admin@123'})
+
+    return [
+        ('dashboard', client, '/dashboard'),
+        ('simple_quiz', client, f'/quiz_simple/{open_quiz}'),
+        ('performance_analysis', client, f'/performance/{done_quiz}'),
+        ('ai_suggestions', client, f'/ai_suggestions/{done_quiz}'),
+        ('leaderboard', client, f'/leaderboard/{done_quiz}'),
+        ('profile', client, '/profile'),
+        ('admin_dashboard', admin, '/admin/dashboard'),
+    ]
+
+
+def _timed_get(client, path, encoding):
+    started = time.perf_counter()
+    response = client.get(path, headers={'Accept-Encoding': encoding})
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return response, elapsed_ms
+
+
+def run_benchmark(requests=30, pool_size=30):
+    workdir = tempfile.mkdtemp(prefix='smart_quizzer_render_')
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(workdir)
+    sys.path.insert(0, app_dir)
+
+    import app as smart_app
+    from render_cache import brotli
+
+    smart_app.quiz_engine.demo_mode = True
+    smart_app.init_db()
+    pages = _setup(smart_app, pool_size)
+    smart_app.app.jinja_env.fragment_cache.clear()
+
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+    results = []
+    for name, client, path in pages:
+        response, first_ms = _timed_get(client, path, 'identity')
+        warm = [_timed_get(client, path, 'identity')[1] for _ in range(requests)]
+        sizes = {}
+        for encoding in encodings:
+            encoded, _ = _timed_get(client, path, encoding)
+            sizes[encoding] = len(encoded.get_data())
+        results.append({
+            'route': name,
+            'status': response.status_code,
+            'first_ms': round(first_ms, 2),
+            'median_ms': round(statistics.median(warm), 2),
+            'bytes': sizes
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure render time and response size per page.')
+    parser.add_argument('--requests', type=int, default=30, help='Warm requests per route')
+    parser.add_argument('--pool-size', type=int, default=30, help='Questions in the simple quizzes')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's own log output")
+    args = parser.parse_args()
+
+    stdout = sys.stdout
+    if not args.verbose:
+        # The app logs every generation with print(); keep the report readable
+        sys.stdout = open(os.devnull, 'w')
+    try:
+        results = run_benchmark(args.requests, args.pool_size)
+    finally:
+        sys.stdout = stdout
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'route':<22}{'first ms':>10}{'median ms':>11}{'identity':>11}{'gzip':>9}{'br':>9}")
+    for row in results:
+        sizes = row['bytes']
+        br = sizes.get('br')
+        print(f"{row['route']:<22}{row['first_ms']:>10}{row['median_ms']:>11}"
+              f"{sizes['identity']:>11}{sizes['gzip']:>9}{br if br is not None else '-':>9}")
+
+
+if __name__ == '__main__':
+    main()
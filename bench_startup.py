@@ -0,0 +1,101 @@
+"""
+Startup-time benchmark for `import app` (what every new worker pays).
+
+Runs `python -X importtime -c "import app"` in fresh interpreters, reports the
+median cumulative import time and the slowest top-level imports, and fails
+(exit code 1) when the median exceeds the budget or when a module that should
+only load on first use (file parsers, scraping, the Gemini SDK, NumPy) is imported
+at startup.
+
+Example:
+    python bench_startup.py --runs 5 --budget-ms 600
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = 600
+# Loaded on first use only; importing any of these at startup is a regression
+LAZY_MODULES = ('PyPDF2', 'pptx', 'bs4', 'requests', 'google.generativeai', 'numpy')
+
+_PROBE = (
+    "import sys, json, app; "
+    f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+)
+
+
+def measure_once(app_dir):
+    """(total import time in ms, {module imported by app: cumulative ms}, eagerly loaded lazy modules)."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=app_dir, capture_output=True, text=True, check=True
+    )
+
+    # Children are listed before their parent, nesting shown by two spaces per level
+    total, children, pending = None, {}, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or line.count('|') != 2:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not cumulative_us.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 1:
+            pending[name.strip()] = int(cumulative_us) / 1000
+        elif depth == 0:
+            if name.strip() == 'app':
+                total, children = int(cumulative_us) / 1000, pending
+            pending = {}
+
+    eager = json.loads(result.stdout.strip().splitlines()[-1])
+    return total, children, eager
+
+
+def run_benchmark(app_dir, runs=5):
+    totals, slowest, eager = [], {}, []
+    for _ in range(runs):
+        total, children, eager = measure_once(app_dir)
+        totals.append(total)
+        for name, ms in children.items():
+            slowest[name] = min(slowest.get(name, ms), ms)
+    return {
+        'runs': runs,
+        'median_ms': round(statistics.median(totals), 1),
+        'min_ms': round(min(totals), 1),
+        'max_ms': round(max(totals), 1),
+        'slowest': sorted(slowest.items(), key=lambda item: item[1], reverse=True)[:10],
+        'eager_lazy_modules': eager
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure `import app` startup time against a budget.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    args = parser.parse_args()
+
+    summary = run_benchmark(os.path.dirname(os.path.abspath(__file__)), runs=args.runs)
+    summary['budget_ms'] = args.budget_ms
+    failed = summary['median_ms'] > args.budget_ms or bool(summary['eager_lazy_modules'])
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"⏱️ import app: median {summary['median_ms']} ms "
+              f"(min {summary['min_ms']}, max {summary['max_ms']}) over {summary['runs']} runs, "
+              f"budget {args.budget_ms:.0f} ms")
+        print("Slowest imports made by app (cumulative, best run):")
+        for name, ms in summary['slowest']:
+            print(f"  {ms:8.1f} ms  {name}")
+        if summary['eager_lazy_modules']:
+            print(f"❌ Loaded at startup but should be lazy: {', '.join(summary['eager_lazy_modules'])}")
+        elif failed:
+            print("❌ Startup time is over budget")
+        else:
+            print("✅ Within budget")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+from flask import request, session
+
+# Completed-quiz pages are per user and must be revalidated, but never change once computed
+PRIVATE_REVALIDATE = 'private, max-age=0, must-revalidate'
+# Compressed responses carry a per-encoding variant of the ETag (see render_cache)
+ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gzip'}
+
+
+def templates_version(template_dir):
+    """Changes whenever a template is edited or deployed, so ETags do not outlive the markup."""
+    mtimes = [os.path.getmtime(os.path.join(root, name))
+              for root, _dirs, names in os.walk(template_dir) for name in names]
+    return str(int(max(mtimes))) if mtimes else '0'
+
+
+def strong_etag(*parts):
+    return hashlib.sha1(':'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+def encoded_etag(etag, encoding):
+    return etag + ETAG_SUFFIXES[encoding]
+
+
+def has_pending_flashes():
+    return bool(session.get('_flashes'))
+
+
+def is_not_modified(etag):
+    """True if the client already holds this exact representation and nothing one-off is queued for it."""
+    if has_pending_flashes():
+        return False
+    return etag in request.if_none_match or \
+        any(encoded_etag(etag, encoding) in request.if_none_match for encoding in ETAG_SUFFIXES)
+
+
+def with_etag(response, etag, cacheable=True):
+    """
+    Marks a response revalidatable. Pass cacheable=False (checked before
+    rendering) when one-off flash messages were pending for this response.
+    """
+    if not cacheable:
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = PRIVATE_REVALIDATE
+    return response
@@ -0,0 +1,195 @@
+"""
+Classical item analysis over every answered question.
+
+Questions are identified across quizzes by a hash of their normalized text,
+so a question served in many quizzes (regenerated pools, review quizzes)
+accumulates one set of statistics. Per item this computes, in one vectorized
+NumPy pass over the response matrix:
+
+  * p-value: share of responses that were correct
+  * point-biserial discrimination: correlation between answering the item
+    correctly and the learner's rest-score on the same quiz attempt
+  * median response time
+  * empirical difficulty (from the p-value) versus the generated label
+
+Results replace the `item_statistics` table. Example:
+    python item_analysis.py --db quizzes.db
+"""
+import argparse
+import hashlib
+import sqlite3
+import time
+from array import array
+from datetime import datetime
+
+from response_history import iter_answered_questions
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+EASY_P_VALUE = 0.75   # at least this share correct -> empirically easy
+HARD_P_VALUE = 0.45   # below this share correct -> empirically hard
+LOW_DISCRIMINATION = 0.1
+
+
+def item_key(question_text):
+    """Stable identity of a question across quizzes."""
+    normalized = ' '.join((question_text or '').lower().split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def empirical_difficulty(p_value):
+    if p_value >= EASY_P_VALUE:
+        return 'easy'
+    if p_value < HARD_P_VALUE:
+        return 'hard'
+    return 'medium'
+
+
+def compute_item_statistics(items, attempts, correct, times, labels):
+    """
+    Vectorized statistics for parallel response arrays.
+
+    items/attempts are dense integer ids, correct is 0/1, labels index into
+    DIFFICULTIES. Returns a dict of per-item arrays.
+    """
+    import numpy as np
+
+    n_items = int(items.max()) + 1 if len(items) else 0
+    n = np.bincount(items, minlength=n_items)
+    p_value = np.bincount(items, correct, n_items) / np.maximum(n, 1)
+
+    # Rest-score: proportion correct on the attempt's other questions
+    attempt_n = np.bincount(attempts)
+    attempt_correct = np.bincount(attempts, correct)
+    others = attempt_n[attempts] - 1
+    valid = others > 0
+    rest = np.where(valid, (attempt_correct[attempts] - correct) / np.maximum(others, 1), 0.0)
+
+    # Point-biserial = Pearson correlation of (correct, rest) within each item
+    x = correct * valid
+    m = np.bincount(items, valid.astype(np.float64), n_items)
+    sx = np.bincount(items, x, n_items)
+    sy = np.bincount(items, rest, n_items)
+    sxy = np.bincount(items, x * rest, n_items)
+    syy = np.bincount(items, rest * rest, n_items)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x, mean_y = sx / m, sy / m
+        cov = sxy / m - mean_x * mean_y
+        var_x = mean_x * (1 - mean_x)   # x is binary
+        var_y = syy / m - mean_y ** 2
+        discrimination = cov / np.sqrt(var_x * var_y)
+    discrimination[~np.isfinite(discrimination)] = np.nan
+
+    # Median response time: sort by (item, time), then pick the middle of each item's run
+    order = np.lexsort((times, items))
+    sorted_times = times[order]
+    starts = np.concatenate([[0], np.cumsum(n)[:-1]])
+    median_time = (sorted_times[starts + (n - 1) // 2] + sorted_times[starts + n // 2]) / 2
+
+    # Labeled difficulty: most common generated label for the item
+    label_counts = np.bincount(items * len(DIFFICULTIES) + labels,
+                               minlength=n_items * len(DIFFICULTIES)).reshape(n_items, len(DIFFICULTIES))
+    labeled = label_counts.argmax(axis=1)
+
+    return {
+        'responses': n,
+        'p_value': p_value,
+        'discrimination': discrimination,
+        'median_time': median_time,
+        'labeled': labeled
+    }
+
+
+def analyze_items(db_path='quizzes.db', batch_size=500):
+    """Recomputes `item_statistics` from all completed quizzes. Returns run stats."""
+    import numpy as np
+
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+
+    item_ids, attempt_ids = {}, {}
+    item_info = []  # item id -> (key, question_text, topic)
+    items, attempts, labels = array('q'), array('q'), array('b')
+    correct, times = array('d'), array('d')
+
+    for response in iter_answered_questions(conn, batch_size=batch_size, include_reviews=False):
+        key = item_key(response['question_text'])
+        item = item_ids.get(key)
+        if item is None:
+            item = item_ids[key] = len(item_ids)
+            item_info.append((key, response['question_text'], response['topic']))
+        items.append(item)
+        attempts.append(attempt_ids.setdefault(response['quiz_id'], len(attempt_ids)))
+        labels.append(DIFFICULTIES.index(response['difficulty']) if response['difficulty'] in DIFFICULTIES else 1)
+        correct.append(1.0 if response['is_correct'] else 0.0)
+        times.append(float(response['response_time']))
+
+    stats = compute_item_statistics(
+        np.frombuffer(items, dtype=np.int64),
+        np.frombuffer(attempts, dtype=np.int64),
+        np.frombuffer(correct, dtype=np.float64),
+        np.frombuffer(times, dtype=np.float64),
+        np.frombuffer(labels, dtype=np.int8).astype(np.int64)
+    ) if len(items) else None
+
+    now = datetime.now()
+    rows = []
+    for item, (key, question_text, topic) in enumerate(item_info):
+        p_value = float(stats['p_value'][item])
+        discrimination = stats['discrimination'][item]
+        rows.append((
+            key, question_text, topic,
+            DIFFICULTIES[stats['labeled'][item]], empirical_difficulty(p_value),
+            int(stats['responses'][item]), p_value,
+            None if np.isnan(discrimination) else float(discrimination),
+            float(stats['median_time'][item]), now
+        ))
+
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM item_statistics')
+        conn.executemany('''
+            INSERT INTO item_statistics
+            (item_key, question_text, topic, labeled_difficulty, empirical_difficulty,
+             responses, p_value, discrimination, median_time, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {'responses': len(items), 'items': len(rows), 'seconds': round(time.perf_counter() - started, 2)}
+
+
+def difficulty_overrides(conn, questions, min_responses=20):
+    """
+    Maps question id -> empirical difficulty for pool questions whose observed
+    difficulty (with enough responses) disagrees with the generated label.
+    """
+    keys = {item_key(q.get('question_text')): q for q in questions}
+    if not keys:
+        return {}
+    placeholders = ','.join('?' for _ in keys)
+    rows = conn.execute(f'''
+        SELECT item_key, empirical_difficulty FROM item_statistics
+        WHERE item_key IN ({placeholders}) AND responses >= ?
+    ''', (*keys, min_responses)).fetchall()
+
+    overrides = {}
+    for key, empirical in rows:
+        question = keys[key]
+        if empirical != (question.get('difficulty') or 'medium').lower():
+            overrides[question['id']] = empirical
+    return overrides
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compute per-question item statistics.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--batch-size', type=int, default=500, help='Quizzes fetched per database round trip')
+    args = parser.parse_args()
+
+    result = analyze_items(args.db, batch_size=args.batch_size)
+    print(f"✅ Analyzed {result['items']} items from {result['responses']} responses in {result['seconds']}s")
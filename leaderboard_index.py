@@ -0,0 +1,158 @@
+import json
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+from review_scheduler import REVIEW_QUIZ_TYPE
+
+
+def rank_key(score, total_time, quiz_id):
+    """Sort key of an attempt: higher score first, then faster, then older attempt."""
+    return (-(score or 0), total_time or 0, quiz_id)
+
+
+def encode_cursor(key):
+    return f"{-key[0]!r}:{key[1]}:{key[2]}"
+
+
+def decode_cursor(cursor):
+    """Parses a keyset cursor produced by encode_cursor; returns None if malformed."""
+    try:
+        score, total_time, quiz_id = cursor.split(':')
+        return rank_key(float(score), int(total_time), int(quiz_id))
+    except (AttributeError, ValueError):
+        return None
+
+
+def backfill_quiz_totals(conn, batch_size=500):
+    """Fills `total_time`/`completed_at` for completed quizzes saved before those columns existed."""
+    updated = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, questions, created_at FROM quizzes
+            WHERE status = 'completed' AND total_time IS NULL
+            LIMIT ?
+        ''', (batch_size,)).fetchall()
+        if not rows:
+            return updated
+
+        updates = []
+        for quiz_id, questions_json, created_at in rows:
+            try:
+                questions = json.loads(questions_json)
+                total_time = sum(q.get('response_time') or 0 for q in questions if 'user_answer' in q)
+            except (TypeError, json.JSONDecodeError):
+                total_time = 0
+            updates.append((total_time, created_at, quiz_id))
+        conn.executemany('''
+            UPDATE quizzes SET total_time = ?, completed_at = COALESCE(completed_at, ?) WHERE id = ?
+        ''', updates)
+        updated += len(updates)
+
+
+class Leaderboard:
+    """
+    Ranking of completed attempts for one (topic, difficulty), kept as a sorted
+    list of rank keys. Rank lookups and cursor seeks are binary searches.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.attempts = {}   # quiz_id -> attempt dict
+        self.best = {}       # user_id -> best rank key
+
+    def add(self, quiz_id, user_id, score, total_time, completed_at):
+        if quiz_id in self.attempts:
+            return
+        key = rank_key(score, total_time, quiz_id)
+        insort(self.keys, key)
+        self.attempts[quiz_id] = {
+            'quiz_id': quiz_id,
+            'user_id': user_id,
+            'score': score or 0,
+            'total_time': total_time or 0,
+            'completed_at': completed_at
+        }
+        if user_id not in self.best or key < self.best[user_id]:
+            self.best[user_id] = key
+
+    def rank(self, key):
+        return bisect_left(self.keys, key) + 1
+
+    def user_rank(self, user_id):
+        """Rank of the user's best attempt, or None if they have no attempt on this board."""
+        key = self.best.get(user_id)
+        if key is None:
+            return None
+        return dict(self.attempts[key[2]], rank=self.rank(key))
+
+    def page(self, after=None, limit=50):
+        """
+        Keyset page: up to `limit` attempts ranked after the `after` key.
+        Returns (attempts with ranks, cursor for the next page or None).
+        """
+        start = bisect_right(self.keys, after) if after else 0
+        keys = self.keys[start:start + limit]
+        attempts = [dict(self.attempts[key[2]], rank=start + n + 1) for n, key in enumerate(keys)]
+        next_cursor = encode_cursor(keys[-1]) if keys and start + limit < len(self.keys) else None
+        return attempts, next_cursor
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class LeaderboardStore:
+    """
+    Per-process cache of leaderboards, built from the `quizzes` table on first
+    use and updated in place as attempts complete. Boards are reloaded after
+    `ttl` seconds so completions recorded by other workers show up.
+    """
+
+    def __init__(self, db_path='quizzes.db', ttl=60, max_boards=500):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_boards = max_boards
+        self._boards = OrderedDict()  # (topic, difficulty) -> (loaded_at, Leaderboard)
+        self._lock = threading.Lock()
+
+    def _load(self, topic, difficulty):
+        board = Leaderboard()
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute('''
+            SELECT id, user_id, score, total_time, completed_at FROM quizzes
+            WHERE topic = ? AND difficulty = ? AND status = 'completed' AND quiz_type != ?
+            ORDER BY score DESC, total_time, id
+        ''', (topic, difficulty, REVIEW_QUIZ_TYPE)).fetchall()
+        conn.close()
+        for quiz_id, user_id, score, total_time, completed_at in rows:
+            board.add(quiz_id, user_id, score, total_time, completed_at)
+        return board
+
+    def get(self, topic, difficulty):
+        key = (topic, difficulty)
+        with self._lock:
+            entry = self._boards.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._boards.move_to_end(key)
+                return entry[1]
+
+        board = self._load(topic, difficulty)
+        with self._lock:
+            self._boards[key] = (time.monotonic(), board)
+            self._boards.move_to_end(key)
+            while len(self._boards) > self.max_boards:
+                self._boards.popitem(last=False)
+        return board
+
+    def record(self, topic, difficulty, quiz_id, user_id, score, total_time, completed_at):
+        """Adds a just-completed attempt to the board if it is loaded; otherwise the next load picks it up."""
+        with self._lock:
+            entry = self._boards.get((topic, difficulty))
+            if entry:
+                entry[1].add(quiz_id, user_id, score, total_time, completed_at)
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LearnerState:
+    """Cached state for one learner: their users row."""
+
+    __slots__ = ('user', 'expires_at')
+
+    def __init__(self, expires_at):
+        self.user = _MISSING
+        self.expires_at = expires_at
+
+
+class LearnerStateCache:
+    """In-process LRU cache of learner state with a per-entry TTL.
+
+    Entries are keyed by user id. The adaptive engine reads through it and
+    drops entries when a learner changes; writes always go to SQLite first.
+    Invalidations made by other worker processes are picked up through the
+    engine's learner_invalidations poll, and the TTL bounds everything else.
+    """
+
+    def __init__(self, max_users=10000, ttl=300):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _state(self, user_id, create=False):
+        """Return the live state for user_id (caller holds the lock)."""
+        now = time.monotonic()
+        state = self._states.get(user_id)
+        if state is not None and state.expires_at <= now:
+            del self._states[user_id]
+            state = None
+
+        if state is None:
+            if not create:
+                return None
+            state = LearnerState(now + self.ttl)
+            self._states[user_id] = state
+            while len(self._states) > self.max_users:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(user_id)
+        return state
+
+    def get_user(self, user_id):
+        """Return the cached users row, or _MISSING."""
+        with self._lock:
+            state = self._state(user_id)
+            if state is None or state.user is _MISSING:
+                self.misses += 1
+                return _MISSING
+            self.hits += 1
+            return state.user
+
+    def set_user(self, user_id, user):
+        with self._lock:
+            self._state(user_id, create=True).user = user
+
+    def invalidate_user(self, user_id):
+        """Drop everything cached for a learner (profile edits, admin updates, deletes)."""
+        with self._lock:
+            self._states.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
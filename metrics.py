@@ -0,0 +1,256 @@
+"""
+Process metrics in the Prometheus text exposition format.
+
+`MetricsRegistry` holds labelled counters and histograms, plus collectors
+that read counters kept elsewhere (cache hit/miss counts) at scrape time.
+Per-request SQLite work is measured by opening connections with
+`factory=TimedConnection`: every statement and commit made between
+`begin_request()` and `end_request()` on the same thread is counted and
+timed.
+
+Under gunicorn every worker has its own registry. When a snapshot directory
+is configured, each worker writes its snapshot there (every few seconds
+from a background thread, and on every scrape) and `/metrics` sums all workers' files, so a
+scrape that lands on any worker sees the whole server.
+"""
+import bisect
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+_request_db = threading.local()
+
+
+def begin_request():
+    """Starts DB accounting for the current thread's request."""
+    _request_db.stats = [0, 0.0]
+
+
+def end_request():
+    """(statements, seconds) spent in SQLite since begin_request(); (0, 0.0) if it was never called."""
+    stats = getattr(_request_db, 'stats', None)
+    _request_db.stats = None
+    return tuple(stats) if stats else (0, 0.0)
+
+
+def _record_db_time(started, statements=1):
+    stats = getattr(_request_db, 'stats', None)
+    if stats is not None:
+        stats[0] += statements
+        stats[1] += time.perf_counter() - started
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_db_time(started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_db_time(started)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record_db_time(started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements and commits count towards the current request."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C implementations of these bypass cursor(), so route them through it
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _record_db_time(started, statements=0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by label values."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._meta = {}  # name -> (type, help, label names, buckets)
+        self._values = {}  # name -> {label values tuple: number, or bucket counts + [sum, count]}
+        self._ratios = {}  # name -> (help, hits counter, misses counter)
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        self._meta[name] = ('counter', help_text, tuple(labelnames), None)
+        self._values[name] = {}
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help_text, tuple(labelnames), tuple(buckets))
+        self._values[name] = {}
+
+    def hit_ratio(self, name, help_text, hits, misses):
+        """A gauge computed at render time as hits / (hits + misses), per label set."""
+        self._ratios[name] = (help_text, hits, misses)
+
+    def add_collector(self, collector):
+        """`collector()` returns {counter name: {label values tuple: value}}, read on every snapshot."""
+        self._collectors.append(collector)
+
+    def inc(self, name, labels=(), amount=1):
+        with self._lock:
+            series = self._values[name]
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = self._meta[name][3]
+        with self._lock:
+            series = self._values[name].get(labels)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum and count
+                series = self._values[name][labels] = [0] * (len(buckets) + 1) + [0.0, 0]
+            series[bisect.bisect_left(buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        """JSON-serializable copy of every series: {name: {json label list: value}}."""
+        with self._lock:
+            values = {name: {json.dumps(list(labels)): (list(value) if isinstance(value, list) else value)
+                             for labels, value in series.items()}
+                      for name, series in self._values.items()}
+        for collector in self._collectors:
+            for name, series in collector().items():
+                for labels, value in series.items():
+                    key = json.dumps(list(labels))
+                    values[name][key] = values[name].get(key, 0) + value
+        return values
+
+    # --- Multi-process aggregation ---
+
+    def write_snapshot(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'worker-{os.getpid()}.json')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def start_background_flush(self, directory, interval):
+        """Writes this process's snapshot every `interval` seconds from a daemon thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot(directory)
+                except OSError as e:
+                    print(f"⚠️ Could not write metrics snapshot: {e}")
+
+        threading.Thread(target=loop, name='metrics-flush', daemon=True).start()
+
+    @staticmethod
+    def merge(snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    if isinstance(value, list):
+                        current = target.get(key)
+                        target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+    def collect(self, directory=None):
+        """This process's snapshot, or every worker's snapshots summed when `directory` is set."""
+        if not directory:
+            return self.snapshot()
+        self.write_snapshot(directory)
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, 'worker-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced right now
+        return self.merge(snapshots)
+
+    # --- Exposition ---
+
+    def render(self, snapshot):
+        lines = []
+        for name, (kind, help_text, labelnames, buckets) in self._meta.items():
+            full_name = f'{self.namespace}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for key, value in sorted(snapshot.get(name, {}).items()):
+                pairs = list(zip(labelnames, json.loads(key)))
+                if kind == 'counter':
+                    lines.append(f'{full_name}{_labels(pairs)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), value):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_labels(pairs + [('le', _format_value(float(bound)))])} {cumulative}")
+                lines.append(f'{full_name}_sum{_labels(pairs)} {_format_value(float(value[-2]))}')
+                lines.append(f'{full_name}_count{_labels(pairs)} {value[-1]}')
+
+        for name, (help_text, hits, misses) in self._ratios.items():
+            full_name = f'{self.namespace}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} gauge')
+            labelnames = self._meta[hits][2]
+            hit_series, miss_series = snapshot.get(hits, {}), snapshot.get(misses, {})
+            for key in sorted(set(hit_series) | set(miss_series)):
+                total = hit_series.get(key, 0) + miss_series.get(key, 0)
+                pairs = list(zip(labelnames, json.loads(key)))
+                lines.append(f'{full_name}{_labels(pairs)} {_format_value(hit_series.get(key, 0) / total if total else 0.0)}')
+        return '\n'.join(lines) + '\n'
+
+
+def clear_snapshots(directory):
+    """Removes worker snapshots left by a previous server run."""
+    for path in glob.glob(os.path.join(directory, 'worker-*.json*')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,205 @@
+import json
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+
+class SelectionIndex:
+    """
+    Per-quiz index of question ids bucketed by difficulty.
+
+    Each bucket keeps the pool order and a cursor to the first question that
+    has not been served yet, so picking the next question for a difficulty is
+    amortized O(1) and never rescans the pool.
+    """
+
+    def __init__(self, quiz_id, questions, buckets, cursors=None, served=None, version=None):
+        self.quiz_id = quiz_id
+        self.questions = questions  # question id -> question dict
+        self.buckets = buckets      # difficulty -> [question ids]
+        self.cursors = cursors or {difficulty: 0 for difficulty in buckets}
+        self.served = set(served or ())
+        self.version = version      # token of the persisted state this copy matches
+
+    @classmethod
+    def build(cls, quiz_id, questions_pool, difficulty_overrides=None):
+        """
+        Buckets the pool by labeled difficulty. `difficulty_overrides` maps
+        question id -> difficulty for questions whose observed difficulty
+        (see item_analysis.py) disagrees with the generated label.
+        """
+        overrides = difficulty_overrides or {}
+        buckets = {}
+        for q in questions_pool:
+            difficulty = overrides.get(q['id']) or q.get('difficulty', 'medium').lower()
+            buckets.setdefault(difficulty, []).append(q['id'])
+        return cls(quiz_id, {q['id']: q for q in questions_pool}, buckets)
+
+    def peek(self, difficulty, limit=1):
+        """Returns up to `limit` unserved questions of a difficulty in pool order (empty once exhausted)."""
+        bucket = self.buckets.get(difficulty, [])
+        cursor = self.cursors.get(difficulty, 0)
+        while cursor < len(bucket) and bucket[cursor] in self.served:
+            cursor += 1
+        self.cursors[difficulty] = cursor
+
+        candidates = []
+        for question_id in bucket[cursor:]:
+            if len(candidates) == limit:
+                break
+            if question_id not in self.served:
+                candidates.append(self.questions[question_id])
+        return candidates
+
+    def select(self, difficulty_order, choose=None, candidates=8):
+        """
+        Returns (question, difficulty) for the first difficulty in the order with
+        an unserved question, falling back to any remaining bucket.
+        `choose` picks one of up to `candidates` unserved questions of that
+        difficulty; without it the first in pool order is served.
+        Returns (None, None) once the pool is exhausted.
+        """
+        for difficulty in list(difficulty_order) + [d for d in self.buckets if d not in difficulty_order]:
+            questions = self.peek(difficulty, limit=candidates if choose else 1)
+            if questions:
+                return (choose(questions) if choose else questions[0]), difficulty
+        return None, None
+
+    def mark_served(self, question_id):
+        self.served.add(question_id)
+
+    def reset(self):
+        self.served.clear()
+        self.cursors = {difficulty: 0 for difficulty in self.buckets}
+
+    def state_json(self):
+        return json.dumps({'buckets': self.buckets, 'cursors': self.cursors, 'served': sorted(self.served)})
+
+
+class SelectionIndexStore:
+    """
+    Keeps selection indexes for in-progress adaptive quizzes.
+
+    The bucket layout and cursors are persisted in `quiz_selection_index` so any
+    worker can pick up a quiz; parsed indexes are kept in a small in-process LRU
+    so the question pool is parsed once per worker rather than once per request.
+    Every save stores a fresh random version token, and a cached copy is only
+    reused while its token still matches the persisted one.
+    """
+
+    def __init__(self, db_path='quizzes.db', max_quizzes=2000):
+        self.db_path = db_path
+        self.max_quizzes = max_quizzes
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _cache(self, index):
+        with self._lock:
+            self._indexes[index.quiz_id] = index
+            self._indexes.move_to_end(index.quiz_id)
+            while len(self._indexes) > self.max_quizzes:
+                self._indexes.popitem(last=False)
+
+    def _save(self, index, conn=None):
+        own_conn = conn is None
+        conn = conn or self._connect()
+        # Random rather than incremented, so a copy left behind by a rolled-back save never matches
+        index.version = random.getrandbits(62)
+        conn.execute('''
+            INSERT INTO quiz_selection_index (quiz_id, state, version, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(quiz_id) DO UPDATE SET
+                state = excluded.state, version = excluded.version, updated_at = excluded.updated_at
+        ''', (index.quiz_id, index.state_json(), index.version, datetime.now()))
+        if own_conn:
+            conn.commit()
+            conn.close()
+
+    def create(self, quiz_id, questions_pool, conn=None, difficulty_overrides=None):
+        """Builds and stores the index for a newly generated pool."""
+        index = SelectionIndex.build(quiz_id, questions_pool, difficulty_overrides)
+        self._save(index, conn)
+        self._cache(index)
+        return index
+
+    def get(self, quiz_id, conn=None):
+        """
+        Returns the quiz's index. The cached copy is used while its version
+        matches the persisted one (a primary-key lookup); otherwise another
+        worker has changed it and the persisted state is reloaded.
+        """
+        own_conn = conn is None
+        conn = conn or self._connect()
+        try:
+            with self._lock:
+                index = self._indexes.get(quiz_id)
+            if index is not None:
+                row = conn.execute('SELECT version FROM quiz_selection_index WHERE quiz_id = ?', (quiz_id,)).fetchone()
+                if row is not None and row[0] == index.version:
+                    with self._lock:
+                        self._indexes.move_to_end(quiz_id)
+                        self.hits += 1
+                    return index
+            with self._lock:
+                self.misses += 1
+
+            row = conn.execute('''
+                SELECT q.questions, s.state, s.version
+                FROM quizzes q
+                LEFT JOIN quiz_selection_index s ON s.quiz_id = q.id
+                WHERE q.id = ?
+            ''', (quiz_id,)).fetchone()
+            if not row:
+                return None
+
+            questions_pool = json.loads(row[0])
+            if row[1]:
+                state = json.loads(row[1])
+                index = SelectionIndex(quiz_id, {q['id']: q for q in questions_pool},
+                                       state['buckets'], state['cursors'], state['served'], row[2])
+            else:
+                # Quiz created before the index existed: build it now
+                index = SelectionIndex.build(quiz_id, questions_pool)
+                self._save(index, conn)
+                if own_conn:
+                    conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+        self._cache(index)
+        return index
+
+    def mark_served(self, quiz_id, question_id, conn=None):
+        index = self.get(quiz_id, conn=conn)
+        if index is None:
+            return
+        index.mark_served(question_id)
+        self._save(index, conn)
+
+    def reset(self, quiz_id):
+        """Clears served questions when a learner (re)starts a quiz."""
+        index = self.get(quiz_id)
+        if index is None:
+            return None
+        index.reset()
+        self._save(index)
+        return index
+
+    def discard(self, quiz_id, conn=None):
+        """Drops the index once the quiz is finalized."""
+        with self._lock:
+            self._indexes.pop(quiz_id, None)
+        own_conn = conn is None
+        conn = conn or self._connect()
+        conn.execute('DELETE FROM quiz_selection_index WHERE quiz_id = ?', (quiz_id,))
+        if own_conn:
+            conn.commit()
+            conn.close()
@@ -0,0 +1,222 @@
+import secrets
+import sqlite3
+import threading
+import time
+
+# Scalar fields of an in-progress adaptive quiz, kept alongside the ordered answer log.
+# served_q_id is the question served at position served_seq (see serve())
+STATE_FIELDS = ('user_id', 'quiz_id', 'current_question_index', 'score', 'current_difficulty_index', 'quiz_length',
+                'served_seq', 'served_q_id')
+ANSWER_FIELDS = ('q_id', 'user_answer', 'difficulty', 'is_correct', 'response_time', 'question_type')
+
+
+class SQLiteQuizSessionStore:
+    """
+    Server-side store for in-progress adaptive quiz state.
+
+    The Flask cookie only carries the opaque session id. Scalar progress lives
+    in one `quiz_sessions` row and each answer is appended as its own
+    `quiz_session_answers` row, so recording an answer is a constant-size write
+    no matter how long the quiz is. Being in SQLite, the state is shared by all
+    worker processes, including which question was served at the current
+    position, so every worker checks answers against the same question.
+    """
+
+    def __init__(self, db_path='quizzes.db', ttl=6 * 60 * 60):
+        self.db_path = db_path
+        self.ttl = ttl
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def start(self, user_id, quiz_id, current_difficulty_index, quiz_length):
+        """Creates a fresh quiz session and returns its state."""
+        state = {
+            'sid': secrets.token_urlsafe(24),
+            'user_id': user_id,
+            'quiz_id': quiz_id,
+            'current_question_index': 0,
+            'score': 0,
+            'current_difficulty_index': current_difficulty_index,
+            'quiz_length': quiz_length,
+            'served_seq': None,
+            'served_q_id': None
+        }
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            # Opportunistically purge abandoned sessions
+            conn.execute('DELETE FROM quiz_session_answers WHERE sid IN (SELECT sid FROM quiz_sessions WHERE expires_at < ?)', (now,))
+            conn.execute('DELETE FROM quiz_sessions WHERE expires_at < ?', (now,))
+            conn.execute(f'''
+                INSERT INTO quiz_sessions (sid, {', '.join(STATE_FIELDS)}, expires_at)
+                VALUES (?, {', '.join('?' for _ in STATE_FIELDS)}, ?)
+            ''', (state['sid'], *(state[f] for f in STATE_FIELDS), now + self.ttl))
+        conn.close()
+        return state
+
+    def load(self, sid):
+        """Returns the session's state, or None if it is unknown or expired."""
+        conn = self._connect()
+        row = conn.execute(f'''
+            SELECT sid, {', '.join(STATE_FIELDS)} FROM quiz_sessions
+            WHERE sid = ? AND expires_at >= ?
+        ''', (sid, time.time())).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def record_answers(self, state, answers, conn=None):
+        """
+        Persists the updated scalar state and appends answers in one transaction.
+        `state` must already reflect the answers (index, score, difficulty).
+        Returns False, writing nothing, if the stored session is no longer at
+        the position these answers start from (e.g. a retried submission
+        already landed). When a connection is passed the caller owns the commit.
+        """
+        first_seq = state['current_question_index'] - len(answers)
+        own_conn = conn is None
+        conn = conn or self._connect()
+        try:
+            updated = conn.execute('''
+                UPDATE quiz_sessions
+                SET current_question_index = ?, score = ?, current_difficulty_index = ?, expires_at = ?
+                WHERE sid = ? AND current_question_index = ?
+            ''', (state['current_question_index'], state['score'], state['current_difficulty_index'],
+                  time.time() + self.ttl, state['sid'], first_seq)).rowcount
+            if updated:
+                conn.executemany(f'''
+                    INSERT OR REPLACE INTO quiz_session_answers (sid, seq, {', '.join(ANSWER_FIELDS)})
+                    VALUES (?, ?, {', '.join('?' for _ in ANSWER_FIELDS)})
+                ''', [(state['sid'], first_seq + n, *(a[f] for f in ANSWER_FIELDS)) for n, a in enumerate(answers)])
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        return bool(updated)
+
+    def record_answer(self, state, answer):
+        return self.record_answers(state, [answer])
+
+    def serve(self, state, question_id):
+        """
+        Records `question_id` as the question served at the state's position,
+        unless one was already recorded there (the first one wins). Updates
+        `state` and returns the served id, or None if the stored session has
+        moved past this position.
+        """
+        position = state['current_question_index']
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                UPDATE quiz_sessions SET served_seq = ?, served_q_id = ?
+                WHERE sid = ? AND current_question_index = ? AND (served_seq IS NULL OR served_seq != ?)
+            ''', (position, question_id, state['sid'], position, position))
+            row = conn.execute('SELECT served_seq, served_q_id FROM quiz_sessions WHERE sid = ?',
+                               (state['sid'],)).fetchone()
+        conn.close()
+        if not row or row['served_seq'] != position:
+            return None
+        state['served_seq'], state['served_q_id'] = position, row['served_q_id']
+        return row['served_q_id']
+
+    def answers(self, sid):
+        """Returns the ordered answer log of a session."""
+        conn = self._connect()
+        rows = conn.execute(f'''
+            SELECT {', '.join(ANSWER_FIELDS)} FROM quiz_session_answers
+            WHERE sid = ? ORDER BY seq
+        ''', (sid,)).fetchall()
+        conn.close()
+        return [dict(row, is_correct=bool(row['is_correct'])) for row in rows]
+
+    def delete(self, sid, conn=None):
+        own_conn = conn is None
+        conn = conn or self._connect()
+        conn.execute('DELETE FROM quiz_session_answers WHERE sid = ?', (sid,))
+        conn.execute('DELETE FROM quiz_sessions WHERE sid = ?', (sid,))
+        if own_conn:
+            conn.commit()
+            conn.close()
+
+
+class MemoryQuizSessionStore:
+    """
+    In-process variant of SQLiteQuizSessionStore with the same interface.
+    Only suitable for a single worker process (development, simulations).
+    """
+
+    def __init__(self, ttl=6 * 60 * 60):
+        self.ttl = ttl
+        self._sessions = {}  # sid -> (expires_at, state, answers)
+        self._lock = threading.Lock()
+
+    def start(self, user_id, quiz_id, current_difficulty_index, quiz_length):
+        state = {
+            'sid': secrets.token_urlsafe(24),
+            'user_id': user_id,
+            'quiz_id': quiz_id,
+            'current_question_index': 0,
+            'score': 0,
+            'current_difficulty_index': current_difficulty_index,
+            'quiz_length': quiz_length,
+            'served_seq': None,
+            'served_q_id': None
+        }
+        now = time.monotonic()
+        with self._lock:
+            for sid in [sid for sid, entry in self._sessions.items() if entry[0] < now]:
+                del self._sessions[sid]
+            self._sessions[state['sid']] = (now + self.ttl, dict(state), [])
+        return state
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if not entry or entry[0] < time.monotonic():
+                return None
+            return dict(entry[1])
+
+    def record_answers(self, state, answers, conn=None):
+        with self._lock:
+            entry = self._sessions.get(state['sid'])
+            first_seq = state['current_question_index'] - len(answers)
+            if not entry or entry[1]['current_question_index'] != first_seq:
+                return False
+            log = entry[2]
+            del log[first_seq:]
+            log.extend(dict(a) for a in answers)
+            stored = {**state, 'served_seq': entry[1]['served_seq'], 'served_q_id': entry[1]['served_q_id']}
+            self._sessions[state['sid']] = (time.monotonic() + self.ttl, stored, log)
+            return True
+
+    def record_answer(self, state, answer):
+        return self.record_answers(state, [answer])
+
+    def serve(self, state, question_id):
+        position = state['current_question_index']
+        with self._lock:
+            entry = self._sessions.get(state['sid'])
+            if not entry or entry[1]['current_question_index'] != position:
+                return None
+            if entry[1]['served_seq'] != position:
+                entry[1].update(served_seq=position, served_q_id=question_id)
+            state['served_seq'], state['served_q_id'] = position, entry[1]['served_q_id']
+            return entry[1]['served_q_id']
+
+    def answers(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            return [dict(a) for a in entry[2]] if entry else []
+
+    def delete(self, sid, conn=None):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+
+def create_quiz_session_store(backend, db_path, ttl):
+    if backend == 'memory':
+        return MemoryQuizSessionStore(ttl=ttl)
+    return SQLiteQuizSessionStore(db_path=db_path, ttl=ttl)
@@ -0,0 +1,240 @@
+import math
+import sqlite3
+import time
+from datetime import datetime
+
+from response_history import iter_answered_questions
+
+# Starting difficulty for an item, taken from the label the generator assigned
+DIFFICULTY_PRIORS = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+
+
+class RatingEngine:
+    """
+    Continuous learner ability and per-question difficulty on a shared logit scale.
+
+    The probability that a learner answers an item correctly is modelled as
+    sigmoid(ability - difficulty) (a Rasch model). Every answer nudges both
+    ratings online, Elo style. `recalibrate` refits all ratings from the full
+    response history in a vectorized NumPy pass.
+
+    Items are identified by (quiz_id, question_id) since question ids are only
+    unique inside a quiz's pool.
+    """
+
+    def __init__(self, db_path='quizzes.db', k_learner=0.4, k_item=0.3, k_min=0.05):
+        self.db_path = db_path
+        self.k_learner = k_learner
+        self.k_item = k_item
+        self.k_min = k_min
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    @staticmethod
+    def expected_score(ability, difficulty):
+        """Probability of a correct answer under the Rasch model."""
+        return 1.0 / (1.0 + math.exp(difficulty - ability))
+
+    def _k(self, base, responses):
+        # Large steps while a rating is new, settling as evidence accumulates
+        return max(self.k_min, base / math.sqrt(1 + responses))
+
+    def get_ability(self, user_id, conn=None):
+        """Returns the learner's current ability (0.0 for a learner with no history)."""
+        own_conn = conn is None
+        conn = conn or self._connect()
+        row = conn.execute('SELECT ability FROM learner_ratings WHERE user_id = ?', (user_id,)).fetchone()
+        if own_conn:
+            conn.close()
+        return row[0] if row else 0.0
+
+    def get_item_difficulties(self, quiz_id, questions, conn=None):
+        """
+        Returns {question id: calibrated difficulty} for questions of one quiz,
+        falling back to the label prior for questions nobody has answered yet.
+        """
+        difficulties = {q['id']: DIFFICULTY_PRIORS.get((q.get('difficulty') or 'medium').lower(), 0.0)
+                        for q in questions}
+        if not difficulties:
+            return difficulties
+        own_conn = conn is None
+        conn = conn or self._connect()
+        rows = conn.execute(
+            f'''SELECT question_id, difficulty FROM item_ratings
+                WHERE quiz_id = ? AND question_id IN ({','.join('?' * len(difficulties))})''',
+            (quiz_id, *difficulties)
+        ).fetchall()
+        if own_conn:
+            conn.close()
+        difficulties.update(rows)
+        return difficulties
+
+    def record_response(self, user_id, quiz_id, question_id, label, is_correct, conn=None):
+        """
+        Applies one answer to the learner's ability and the item's difficulty.
+        When a connection is passed the caller owns the commit.
+        Returns the updated (ability, difficulty).
+        """
+        own_conn = conn is None
+        conn = conn or self._connect()
+        label = (label or 'medium').lower()
+
+        learner = conn.execute(
+            'SELECT ability, responses FROM learner_ratings WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        item = conn.execute(
+            'SELECT difficulty, responses FROM item_ratings WHERE quiz_id = ? AND question_id = ?',
+            (quiz_id, question_id)
+        ).fetchone()
+
+        ability, learner_n = learner if learner else (0.0, 0)
+        difficulty, item_n = item if item else (DIFFICULTY_PRIORS.get(label, 0.0), 0)
+
+        surprise = (1.0 if is_correct else 0.0) - self.expected_score(ability, difficulty)
+        ability += self._k(self.k_learner, learner_n) * surprise
+        difficulty -= self._k(self.k_item, item_n) * surprise
+
+        now = datetime.now()
+        conn.execute('''
+            INSERT INTO learner_ratings (user_id, ability, responses, updated_at)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                ability = excluded.ability,
+                responses = responses + 1,
+                updated_at = excluded.updated_at
+        ''', (user_id, ability, now))
+        conn.execute('''
+            INSERT INTO item_ratings (quiz_id, question_id, label, difficulty, responses, updated_at)
+            VALUES (?, ?, ?, ?, 1, ?)
+            ON CONFLICT(quiz_id, question_id) DO UPDATE SET
+                difficulty = excluded.difficulty,
+                responses = responses + 1,
+                updated_at = excluded.updated_at
+        ''', (quiz_id, question_id, label, difficulty, now))
+
+        if own_conn:
+            conn.commit()
+            conn.close()
+        return ability, difficulty
+
+    def recalibrate(self, conn=None, iterations=100, tolerance=1e-4, prior_weight=1.0, chunk_size=1_000_000):
+        """
+        Refits every ability and item difficulty from the response history.
+
+        Runs regularised joint maximum likelihood for the Rasch model. Each
+        iteration is a diagonal Newton step computed with np.bincount over the
+        flat response arrays, so the cost is a few vector passes per iteration
+        regardless of how many learners or items there are. Item difficulties
+        are pulled towards their label prior and abilities towards 0 with
+        weight `prior_weight`, which keeps items with one response finite.
+        """
+        import numpy as np
+
+        own_conn = conn is None
+        conn = conn or self._connect()
+        started = time.perf_counter()
+
+        # 1. Load responses into flat arrays, chunk by chunk
+        user_chunks, key_chunks, prior_chunks, y_chunks = [], [], [], []
+        users, keys, priors, ys = [], [], [], []
+
+        def flush():
+            user_chunks.append(np.asarray(users, dtype=np.int64))
+            key_chunks.append(np.asarray(keys, dtype=np.int64))
+            prior_chunks.append(np.asarray(priors, dtype=np.float64))
+            y_chunks.append(np.asarray(ys, dtype=np.float64))
+            for buffer in (users, keys, priors, ys):
+                buffer.clear()
+
+        for response in iter_answered_questions(conn, include_reviews=False):
+            if response['question_id'] is None:
+                continue
+            users.append(response['user_id'])
+            # Pack (quiz_id, question_id) into one int64 so items can be uniqued vectorially
+            keys.append((response['quiz_id'] << 20) | response['question_id'])
+            priors.append(DIFFICULTY_PRIORS.get(response['difficulty'], 0.0))
+            ys.append(1.0 if response['is_correct'] else 0.0)
+            if len(ys) >= chunk_size:
+                flush()
+        if ys:
+            flush()
+
+        if not y_chunks:
+            if own_conn:
+                conn.close()
+            return {'responses': 0, 'learners': 0, 'items': 0, 'iterations': 0, 'seconds': 0.0}
+
+        user_ids, u = np.unique(np.concatenate(user_chunks), return_inverse=True)
+        item_keys, i = np.unique(np.concatenate(key_chunks), return_inverse=True)
+        y = np.concatenate(y_chunks)
+        response_priors = np.concatenate(prior_chunks)
+        del user_chunks, key_chunks, prior_chunks, y_chunks
+
+        n_users, n_items = len(user_ids), len(item_keys)
+        item_prior = np.zeros(n_items)
+        item_prior[i] = response_priors
+        del response_priors
+
+        # 2. Diagonal Newton steps on abilities and difficulties
+        theta = np.zeros(n_users)
+        b = item_prior.copy()
+        iteration = 0
+        for iteration in range(1, iterations + 1):
+            p = 1.0 / (1.0 + np.exp(b[i] - theta[u]))
+            residual = y - p
+            weight = p * (1.0 - p)
+
+            step_theta = (np.bincount(u, residual, n_users) - prior_weight * theta) / \
+                         (np.bincount(u, weight, n_users) + prior_weight)
+            step_b = (-np.bincount(i, residual, n_items) - prior_weight * (b - item_prior)) / \
+                     (np.bincount(i, weight, n_items) + prior_weight)
+
+            theta += step_theta
+            b += step_b
+            if max(np.abs(step_theta).max(), np.abs(step_b).max()) < tolerance:
+                break
+
+        # 3. Write the refitted ratings back in one transaction
+        user_counts = np.bincount(u, minlength=n_users)
+        item_counts = np.bincount(i, minlength=n_items)
+        labels = {v: k for k, v in DIFFICULTY_PRIORS.items()}
+        now = datetime.now()
+
+        conn.execute('DELETE FROM learner_ratings')
+        conn.executemany(
+            'INSERT INTO learner_ratings (user_id, ability, responses, updated_at) VALUES (?, ?, ?, ?)',
+            zip(user_ids.tolist(), theta.tolist(), user_counts.tolist(), [now] * n_users)
+        )
+        conn.execute('DELETE FROM item_ratings')
+        conn.executemany(
+            '''INSERT INTO item_ratings (quiz_id, question_id, label, difficulty, responses, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            zip((item_keys >> 20).tolist(), (item_keys & ((1 << 20) - 1)).tolist(),
+                [labels.get(prior, 'medium') for prior in item_prior.tolist()],
+                b.tolist(), item_counts.tolist(), [now] * n_items)
+        )
+        conn.commit()
+        if own_conn:
+            conn.close()
+
+        return {
+            'responses': int(len(y)),
+            'learners': int(n_users),
+            'items': int(n_items),
+            'iterations': iteration,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Refit learner abilities and item difficulties from response history.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--iterations', type=int, default=100)
+    args = parser.parse_args()
+
+    result = RatingEngine(db_path=args.db).recalibrate(iterations=args.iterations)
+    print(f"✅ Recalibrated {result['learners']} learners and {result['items']} items "
+          f"from {result['responses']} responses in {result['seconds']}s ({result['iterations']} iterations)")
@@ -0,0 +1,221 @@
+"""
+Rebuilds the `performances` table from the response history.
+
+Streams every answered question out of completed quizzes, aggregates them per
+(user, topic, difficulty) with vectorized NumPy group-bys in fixed-size chunks,
+then updates the live rows in place in one write transaction. Row ids are
+kept, and quizzes completed while the scan ran are folded in before the
+commit.
+
+Example:
+    python rebuild_performances.py --db quizzes.db --chunk-size 500000
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+from response_history import iter_answered_questions
+
+EMA_DECAY = 0.7  # Weight kept by the old average in SimpleAdaptiveEngine.update_performance
+
+
+class PerformanceAggregator:
+    """
+    Running per-group totals and response-time EMA, fed one chunk at a time.
+
+    Memory is bounded by the number of (user, topic, difficulty) groups plus
+    one chunk of responses. The EMA is reproduced in closed form: within a
+    chunk, a group's state advances as
+
+        ema = decay**m * ema + sum_j (1 - decay) * decay**j * t_j
+
+    where j counts from the group's last response in the chunk backwards. A
+    group's very first response seeds the average with weight decay**j instead,
+    mirroring the online update. Responses arrive in quiz id order and, within a
+    quiz, in answer order (`answer_seq`); the online average was updated as each
+    quiz completed, so learners who finished quizzes out of id order may see a
+    slightly different average. The online code also reseeds when an average is
+    exactly 0 (e.g. after zero-second answers); that edge case is not reproduced.
+    """
+
+    def __init__(self, decay=EMA_DECAY):
+        self.decay = decay
+        self.group_ids = {}
+        self.total = np.zeros(0, dtype=np.int64)
+        self.correct = np.zeros(0, dtype=np.int64)
+        self.ema = np.zeros(0, dtype=np.float64)
+
+    def _grow(self, size):
+        if size > len(self.total):
+            extra = size - len(self.total)
+            self.total = np.concatenate([self.total, np.zeros(extra, dtype=np.int64)])
+            self.correct = np.concatenate([self.correct, np.zeros(extra, dtype=np.int64)])
+            self.ema = np.concatenate([self.ema, np.zeros(extra, dtype=np.float64)])
+
+    def group_id(self, key):
+        group = self.group_ids.get(key)
+        if group is None:
+            group = self.group_ids[key] = len(self.group_ids)
+        return group
+
+    def add_chunk(self, groups, correct, times):
+        """Folds one chunk of responses (parallel arrays, in answer order) into the totals."""
+        n_groups = len(self.group_ids)
+        self._grow(n_groups)
+
+        # Stable sort keeps answer order within each group
+        order = np.argsort(groups, kind='stable')
+        g = groups[order]
+        t = times[order]
+
+        chunk_counts = np.bincount(g, minlength=n_groups)
+        starts = np.concatenate([[0], np.cumsum(chunk_counts)[:-1]])
+        rank = np.arange(len(g)) - starts[g]          # position within the group in this chunk
+        from_end = chunk_counts[g] - 1 - rank          # 0 for the group's latest response
+
+        weights = (1 - self.decay) * self.decay ** from_end
+        seeds = (self.total[g] == 0) & (rank == 0)     # first response a group has ever seen
+        weights[seeds] = self.decay ** from_end[seeds]
+
+        self.ema = self.decay ** chunk_counts * self.ema + np.bincount(g, weights * t, n_groups)
+        self.total += chunk_counts
+        self.correct += np.bincount(groups, correct, n_groups).astype(np.int64)
+
+    def rows(self, updated_at):
+        keys = sorted(self.group_ids.items(), key=lambda item: item[1])
+        for (user_id, topic, difficulty), group in keys:
+            total = int(self.total[group])
+            correct = int(self.correct[group])
+            yield (user_id, topic, difficulty, correct / total if total else 0.0,
+                   total, correct, float(self.ema[group]), updated_at)
+
+
+class _ChunkBuffer:
+    """Fixed-size arrays that feed an aggregator one chunk at a time."""
+
+    def __init__(self, aggregator, chunk_size):
+        self.aggregator = aggregator
+        self.groups = np.empty(chunk_size, dtype=np.int64)
+        self.correct = np.empty(chunk_size, dtype=np.int64)
+        self.times = np.empty(chunk_size, dtype=np.float64)
+        self.filled = 0
+        self.responses = 0
+        self.quiz_ids = set()
+
+    def add(self, response):
+        self.groups[self.filled] = self.aggregator.group_id(
+            (response['user_id'], response['topic'], response['difficulty']))
+        self.correct[self.filled] = 1 if response['is_correct'] else 0
+        self.times[self.filled] = response['response_time']
+        self.quiz_ids.add(response['quiz_id'])
+        self.filled += 1
+        if self.filled == len(self.groups):
+            self.flush()
+
+    def flush(self):
+        if self.filled:
+            n = self.filled
+            self.aggregator.add_chunk(self.groups[:n], self.correct[:n], self.times[:n])
+            self.responses += n
+            self.filled = 0
+
+
+def rebuild_performances(db_path='quizzes.db', chunk_size=500_000, batch_size=500):
+    """Recomputes `performances` from completed quizzes and updates it in place. Returns run stats."""
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    aggregator = PerformanceAggregator()
+    buffer = _ChunkBuffer(aggregator, chunk_size)
+
+    # 1. The long scan runs without holding the write lock
+    for response in iter_answered_questions(conn, batch_size=batch_size, include_reviews=False):
+        buffer.add(response)
+    buffer.flush()
+
+    conn.isolation_level = None
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # 2. Quizzes completed since the scan started (nobody can complete one now)
+        completed = {row[0] for row in conn.execute("SELECT id FROM quizzes WHERE status = 'completed'")}
+        late = sorted(completed - buffer.quiz_ids)
+        for response in iter_answered_questions(conn, batch_size=batch_size, quiz_ids=late,
+                                                include_reviews=False):
+            buffer.add(response)
+        buffer.flush()
+
+        # 3. Update rows in place, keyed by (user_id, topic, difficulty), so their ids stay valid
+        conn.execute('''
+            CREATE TEMP TABLE performances_rebuild (
+                user_id INTEGER, topic TEXT, difficulty TEXT, accuracy REAL, total_questions INTEGER,
+                correct_answers INTEGER, average_response_time REAL, updated_at TIMESTAMP,
+                PRIMARY KEY (user_id, topic, difficulty)
+            )
+        ''')
+        conn.executemany('''
+            INSERT INTO performances_rebuild
+            (user_id, topic, difficulty, accuracy, total_questions, correct_answers, average_response_time, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', aggregator.rows(datetime.now()))
+
+        match = 'r.user_id = p.user_id AND r.topic = p.topic AND r.difficulty = p.difficulty'
+        # Duplicate rows for one key (older databases) would double count; keep the first
+        conn.execute('''
+            DELETE FROM performances WHERE id NOT IN (
+                SELECT MIN(id) FROM performances GROUP BY user_id, topic, difficulty
+            )
+        ''')
+        conn.execute(f'''
+            UPDATE performances AS p
+            SET (accuracy, total_questions, correct_answers, average_response_time, updated_at) = (
+                SELECT r.accuracy, r.total_questions, r.correct_answers, r.average_response_time, r.updated_at
+                FROM performances_rebuild r WHERE {match}
+            )
+            WHERE EXISTS (SELECT 1 FROM performances_rebuild r WHERE {match})
+        ''')
+        conn.execute(f'''
+            INSERT INTO performances
+            (user_id, topic, difficulty, accuracy, total_questions, correct_answers, average_response_time, updated_at)
+            SELECT r.user_id, r.topic, r.difficulty, r.accuracy, r.total_questions, r.correct_answers,
+                   r.average_response_time, r.updated_at
+            FROM performances_rebuild r
+            WHERE NOT EXISTS (SELECT 1 FROM performances p WHERE {match})
+        ''')
+        # Rows with no history left behind them (e.g. users deleted during the scan)
+        removed = conn.execute(f'''
+            DELETE FROM performances AS p
+            WHERE NOT EXISTS (SELECT 1 FROM performances_rebuild r WHERE {match})
+               OR p.user_id NOT IN (SELECT id FROM users)
+        ''').rowcount
+
+        # Running workers drop these learners' cached rows on their next poll
+        conn.execute('INSERT INTO learner_invalidations (user_id) SELECT DISTINCT user_id FROM performances_rebuild')
+        conn.execute('DROP TABLE performances_rebuild')
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    return {
+        'responses': buffer.responses,
+        'groups': len(aggregator.group_ids),
+        'late_quizzes': len(late),
+        'removed': removed,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the performances table from response history.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='Responses aggregated per NumPy pass')
+    parser.add_argument('--batch-size', type=int, default=500, help='Quizzes fetched per database round trip')
+    args = parser.parse_args()
+
+    result = rebuild_performances(args.db, chunk_size=args.chunk_size, batch_size=args.batch_size)
+    print(f"✅ Rebuilt performances: {result['groups']} rows from {result['responses']} responses in {result['seconds']}s "
+          f"({result['late_quizzes']} quizzes completed during the scan, {result['removed']} stale rows removed)")
@@ -0,0 +1,110 @@
+"""
+Template render caching and response compression.
+
+  * Bytecode cache: compiled templates are stored on disk, so a fresh worker
+    loads them instead of re-parsing and compiling the Base.html chain.
+  * `{% cache key, vary... %}...{% endcache %}`: caches a rendered fragment
+    per process for `FRAGMENT_CACHE_TTL` seconds, keyed by the template,
+    the block's position, the key and the vary values (e.g. the session user).
+  * Compression: an after_request hook gzip- or brotli-encodes buffered text
+    responses at or above `COMPRESS_MIN_SIZE` bytes. Streamed responses
+    (SSE, exports) pass through untouched. Encoded responses get a suffixed
+    ETag, since strong validators must differ per content encoding.
+"""
+import gzip
+import os
+
+from flask import request
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from http_cache import encoded_etag
+from ttl_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/json', 'application/javascript', 'image/svg+xml'
+}
+
+
+class FragmentCacheExtension(Extension):
+    """Adds `{% cache %}` blocks backed by `environment.fragment_cache`."""
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=TTLCache(max_entries=5000, ttl=300))
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [nodes.Const(f'{parser.name}:{lineno}'), nodes.List([parser.parse_expression()])]
+        while parser.stream.skip_if('comma'):
+            args[1].items.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, location, key, caller):
+        cache_key = (location, *key)
+        fragment = self.environment.fragment_cache.get(cache_key)
+        if fragment is None:
+            fragment = Markup(caller())
+            self.environment.fragment_cache.set(cache_key, fragment)
+        return fragment
+
+
+def init_template_caching(app):
+    """Installs the bytecode cache and the {% cache %} tag. Call before the first render."""
+    cache_dir = app.config['TEMPLATE_BYTECODE_DIR']
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache.ttl = app.config['FRAGMENT_CACHE_TTL']
+
+
+def negotiate_encoding():
+    """'br', 'gzip' or None, by the client's Accept-Encoding and what is installed."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, min_size=1024, level=6):
+    """after_request hook body: compresses eligible responses in place."""
+    if response.status_code == 304:
+        # Echo the encoded validator the client revalidated with
+        etag, weak = response.get_etag()
+        encoding = negotiate_encoding()
+        if etag and not weak and encoding and request.if_none_match.contains(encoded_etag(etag, encoding)):
+            response.set_etag(encoded_etag(etag, encoding))
+        return response
+
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    body = response.get_data()
+    if encoding is None or len(body) < min_size:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=min(level, 11)))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=level, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak=weak)
+    return response
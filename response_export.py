@@ -0,0 +1,132 @@
+"""
+Streaming bulk export of answered questions and quiz results as NDJSON or CSV.
+
+Everything is a generator: rows are read in fetchmany batches, encoded one at
+a time and optionally run through a streaming gzip compressor, so memory use
+does not depend on how many rows are exported.
+
+Example:
+    python response_export.py --kind responses --format csv --since 2026-01-01 --gzip -o responses.csv.gz
+"""
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+import zlib
+from datetime import datetime
+
+from response_history import completed_quiz_filters, iter_answered_questions
+
+RESPONSE_FIELDS = ('user_id', 'quiz_id', 'question_id', 'topic', 'quiz_type', 'difficulty',
+                   'question_type', 'is_correct', 'response_time', 'created_at')
+QUIZ_RESULT_FIELDS = ('quiz_id', 'user_id', 'topic', 'difficulty', 'quiz_type', 'score',
+                      'total_time', 'created_at', 'completed_at')
+EXPORT_KINDS = {'responses': RESPONSE_FIELDS, 'quizzes': QUIZ_RESULT_FIELDS}
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def iter_quiz_results(conn, batch_size=1000, since=None, until=None, topic=None):
+    """Streams one row per completed quiz, oldest first."""
+    where, params = completed_quiz_filters(since, until, topic)
+    cursor = conn.execute(f'''
+        SELECT id, user_id, topic, difficulty, quiz_type, score, total_time, created_at, completed_at
+        FROM quizzes
+        WHERE {where}
+        ORDER BY id
+    ''', params)
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(zip(QUIZ_RESULT_FIELDS, tuple(row)))
+
+
+def iter_ndjson(rows, fields):
+    for row in rows:
+        yield json.dumps({field: row.get(field) for field in fields}, default=str) + '\n'
+
+
+def iter_csv(rows, fields):
+    """CSV lines with a header row, encoded one row at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def iter_gzip(chunks, level=6, flush_bytes=64 * 1024):
+    """Compresses a stream of text chunks into gzip bytes without buffering the whole payload."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        pending += len(data)
+        out = compressor.compress(data)
+        if out:
+            pending = 0
+            yield out
+        elif pending >= flush_bytes:
+            pending = 0
+            yield compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def export_rows(conn, kind='responses', since=None, until=None, topic=None, batch_size=500):
+    if kind == 'quizzes':
+        return iter_quiz_results(conn, batch_size=batch_size, since=since, until=until, topic=topic)
+    return iter_answered_questions(conn, batch_size=batch_size, since=since, until=until, topic=topic)
+
+
+def export_stream(conn, kind='responses', fmt='ndjson', since=None, until=None, topic=None,
+                  compress=False, batch_size=500):
+    """
+    Generator of export output: text chunks, or gzip bytes when `compress` is set.
+    `conn` must stay open until the generator is exhausted.
+    """
+    rows = export_rows(conn, kind, since, until, topic, batch_size)
+    chunks = iter_csv(rows, EXPORT_KINDS[kind]) if fmt == 'csv' else iter_ndjson(rows, EXPORT_KINDS[kind])
+    return iter_gzip(chunks) if compress else chunks
+
+
+def parse_date(value):
+    """Parses an ISO date/datetime filter value; returns None for empty input, raises ValueError if malformed."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export answered questions or quiz results as NDJSON/CSV.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--kind', choices=sorted(EXPORT_KINDS), default='responses')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--since', type=parse_date, help='Only quizzes completed at or after this ISO date')
+    parser.add_argument('--until', type=parse_date, help='Only quizzes completed before this ISO date')
+    parser.add_argument('--topic')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    stream = export_stream(conn, args.kind, args.format, args.since, args.until, args.topic, compress=args.gzip)
+    if args.gzip:
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    else:
+        out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for chunk in stream:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        conn.close()
@@ -0,0 +1,83 @@
+import json
+
+from review_scheduler import REVIEW_QUIZ_TYPE
+
+
+def completed_quiz_filters(since=None, until=None, topic=None, include_reviews=True):
+    """
+    WHERE clause and parameters selecting completed quizzes, optionally by
+    completion date and topic. `include_reviews=False` leaves out spaced-review
+    quizzes, which re-ask already answered questions.
+    """
+    clauses = ["status = 'completed'"]
+    params = []
+    if not include_reviews:
+        clauses.append('quiz_type != ?')
+        params.append(REVIEW_QUIZ_TYPE)
+    if since is not None:
+        clauses.append('COALESCE(completed_at, created_at) >= ?')
+        params.append(since)
+    if until is not None:
+        clauses.append('COALESCE(completed_at, created_at) < ?')
+        params.append(until)
+    if topic:
+        clauses.append('topic = ?')
+        params.append(topic)
+    return ' AND '.join(clauses), params
+
+
+def iter_answered_questions(conn, batch_size=500, since=None, until=None, topic=None, quiz_ids=None,
+                            include_reviews=True):
+    """
+    Streams every answered question from completed quizzes, oldest quiz first
+    and in answer order within a quiz (only the given quizzes when `quiz_ids`
+    is passed). Adaptive quizzes record each answer's position as
+    `answer_seq`; other quizzes (and adaptive ones completed before it was
+    recorded) are streamed in question order.
+
+    Completed quizzes keep their responses inside the `questions` JSON blob, so
+    this reads the table in batches with fetchmany and yields one dict per
+    answered question. Memory stays bounded by batch_size quizzes.
+    """
+    where, params = completed_quiz_filters(since, until, topic, include_reviews)
+    if quiz_ids is not None:
+        quiz_ids = list(quiz_ids)
+        if not quiz_ids:
+            return
+        where += f" AND id IN ({','.join('?' * len(quiz_ids))})"
+        params = params + quiz_ids
+    cursor = conn.execute(f'''
+        SELECT id, user_id, topic, quiz_type, created_at, questions
+        FROM quizzes
+        WHERE {where}
+        ORDER BY id
+    ''', params)
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+
+        for quiz_id, user_id, topic, quiz_type, created_at, questions_json in rows:
+            try:
+                questions = json.loads(questions_json)
+            except (TypeError, json.JSONDecodeError):
+                continue
+
+            answered = [q for q in questions if 'user_answer' in q]
+            answered.sort(key=lambda q: q.get('answer_seq', 0))
+            for seq, q in enumerate(answered):
+                yield {
+                    'user_id': user_id,
+                    'quiz_id': quiz_id,
+                    'question_id': q.get('id'),
+                    'topic': topic,
+                    'quiz_type': quiz_type,
+                    'difficulty': (q.get('difficulty') or 'medium').lower(),
+                    'question_type': q.get('question_type', 'mcq'),
+                    'question_text': q.get('question_text', ''),
+                    'is_correct': bool(q.get('is_correct', False)),
+                    'response_time': q.get('response_time') or 0,
+                    'answer_seq': seq,
+                    'created_at': created_at
+                }
@@ -0,0 +1,172 @@
+import heapq
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+# Fields kept when a missed question is copied into the review queue
+QUESTION_FIELDS = ('question_text', 'question_type', 'options', 'correct_answer', 'explanation', 'difficulty', 'topic')
+
+# quizzes.quiz_type of quizzes built from due review items; they only reschedule items
+# and are left out of skill, rating, performance, rollup and leaderboard updates
+REVIEW_QUIZ_TYPE = 'review'
+
+# SM-2 quality grades for a right / wrong answer (0-5 scale, 3+ counts as recalled)
+GRADE_CORRECT = 4
+GRADE_INCORRECT = 2
+
+
+def sm2_update(easiness, interval_days, repetitions, grade):
+    """
+    One SM-2 scheduling step. Returns (easiness, interval_days, repetitions).
+    The second interval is 3 days rather than SM-2's 6 to match the app's
+    "review in 24 hours, then 3 days" advice.
+    """
+    easiness = max(1.3, easiness + (0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)))
+    if grade < 3:
+        return easiness, 1.0, 0
+
+    repetitions += 1
+    if repetitions == 1:
+        interval_days = 1.0
+    elif repetitions == 2:
+        interval_days = 3.0
+    else:
+        interval_days = round(interval_days * easiness, 1)
+    return easiness, interval_days, repetitions
+
+
+class ReviewScheduler:
+    """
+    Spaced-repetition queue of questions each learner has missed.
+
+    `review_items` is indexed on (user_id, due_at), so the index acts as a
+    per-learner priority queue: the earliest-due items for a learner are an
+    O(log n) seek followed by an ordered range read.
+    """
+
+    def __init__(self, db_path='quizzes.db'):
+        self.db_path = db_path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record_missed(self, conn, user_id, quiz_id, topic, questions, now=None):
+        """Queues every incorrectly answered question of a finished quiz for review tomorrow."""
+        now = now or datetime.now()
+        rows = []
+        for q in questions:
+            if 'user_answer' not in q or q.get('is_correct') or q.get('review_item_id'):
+                continue
+            payload = {field: q.get(field) for field in QUESTION_FIELDS}
+            rows.append((user_id, quiz_id, q['id'], topic, json.dumps(payload), now + timedelta(days=1), now))
+
+        conn.executemany('''
+            INSERT INTO review_items (user_id, source_quiz_id, question_id, topic, question, due_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, source_quiz_id, question_id) DO UPDATE SET
+                repetitions = 0, interval_days = 1.0, due_at = excluded.due_at
+        ''', rows)
+        return len(rows)
+
+    def record_review(self, conn, user_id, item_id, is_correct, now=None):
+        """Applies the result of reviewing an item and schedules its next due date."""
+        now = now or datetime.now()
+        item = conn.execute(
+            'SELECT easiness, interval_days, repetitions FROM review_items WHERE id = ? AND user_id = ?',
+            (item_id, user_id)
+        ).fetchone()
+        if not item:
+            return None
+
+        easiness, interval_days, repetitions = sm2_update(
+            item[0], item[1], item[2], GRADE_CORRECT if is_correct else GRADE_INCORRECT
+        )
+        due_at = now + timedelta(days=interval_days)
+        conn.execute('''
+            UPDATE review_items
+            SET easiness = ?, interval_days = ?, repetitions = ?, due_at = ?, last_reviewed_at = ?
+            WHERE id = ?
+        ''', (easiness, interval_days, repetitions, due_at, now, item_id))
+        return due_at
+
+    def due_items(self, user_id, limit=10, now=None):
+        """Returns the learner's most overdue items, earliest first."""
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT id, topic, question, due_at FROM review_items
+            WHERE user_id = ? AND due_at <= ?
+            ORDER BY due_at
+            LIMIT ?
+        ''', (user_id, now or datetime.now(), limit)).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def due_count(self, user_id, now=None):
+        conn = self._connect()
+        count = conn.execute(
+            'SELECT COUNT(*) FROM review_items WHERE user_id = ? AND due_at <= ?',
+            (user_id, now or datetime.now())
+        ).fetchone()[0]
+        conn.close()
+        return count
+
+    def build_review_quiz(self, user_id, limit=10, now=None):
+        """
+        Turns the learner's due items into a question pool for a simple quiz.
+        Each question carries its `review_item_id` so submission can reschedule it.
+        """
+        questions = []
+        for n, item in enumerate(self.due_items(user_id, limit, now), start=1):
+            question = json.loads(item['question'])
+            question['id'] = n
+            question['review_item_id'] = item['id']
+            questions.append(question)
+        return questions
+
+    def due_queues(self, per_user_limit=10, now=None, batch_size=5000):
+        """
+        Batch mode: due queues for every learner in one ordered pass over the index.
+        Returns {user_id: [item, ...]} with each queue earliest-due first.
+        """
+        conn = self._connect()
+        cursor = conn.execute('''
+            SELECT id, user_id, topic, due_at FROM review_items
+            WHERE due_at <= ?
+            ORDER BY user_id, due_at
+        ''', (now or datetime.now(),))
+
+        queues = {}
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                queue = queues.setdefault(row['user_id'], [])
+                if len(queue) < per_user_limit:
+                    queue.append(dict(row))
+        conn.close()
+        return queues
+
+    @staticmethod
+    def most_overdue(queues, n=100):
+        """Picks the n learners whose oldest due item has waited longest (e.g. for reminders)."""
+        return heapq.nsmallest(n, ((queue[0]['due_at'], user_id, len(queue))
+                                   for user_id, queue in queues.items() if queue))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compute due review queues for all learners.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--limit', type=int, default=10, help='Max items per learner')
+    parser.add_argument('--top', type=int, default=20, help='How many most-overdue learners to list')
+    args = parser.parse_args()
+
+    scheduler = ReviewScheduler(args.db)
+    queues = scheduler.due_queues(per_user_limit=args.limit)
+    print(f"📚 {sum(len(q) for q in queues.values())} due items across {len(queues)} learners")
+    for oldest_due, user_id, count in scheduler.most_overdue(queues, args.top):
+        print(f"   user {user_id}: {count} due, oldest since {oldest_due}")
@@ -0,0 +1,102 @@
+"""
+Production entry point: gunicorn with several worker processes.
+
+    python serve.py
+    QUIZ_WORKERS=8 QUIZ_THREADS=4 QUIZ_BIND=0.0.0.0:8000 python serve.py
+
+This file is also a gunicorn config module:
+
+    gunicorn -c serve.py "app:create_app()"
+
+`init_db` runs once in the master before any worker is forked; every worker
+then rebuilds its own engines, caches and generation client (post_fork).
+Threaded workers are used because live-stats streams and quiz generation hold
+a thread while they wait. QUIZ_THREADS also sizes the app's per-worker caps:
+a quarter of the threads for live-stats streams (STATS_STREAM_MAX_CLIENTS),
+and the rest, minus one thread always kept free, shared by the admitted and
+queued requests of every rate-limited route. Without gunicorn (e.g. on
+Windows) this falls back to a single threaded werkzeug server.
+
+Environment:
+    QUIZ_BIND      address to listen on (default 0.0.0.0:8000)
+    QUIZ_WORKERS   worker processes (default 2 x CPU cores + 1)
+    QUIZ_THREADS   threads per worker (default 4; the app refuses to start with fewer
+                   than one per rate-limited route + one stream + one free, i.e. 4)
+    QUIZ_TIMEOUT   seconds before a silent worker is restarted (default 120)
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('QUIZ_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('QUIZ_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('QUIZ_THREADS', 4))
+timeout = int(os.environ.get('QUIZ_TIMEOUT', 120))  # generation requests can take a while
+worker_class = 'gthread'
+preload_app = True  # import once in the master, fork copy-on-write
+
+
+def on_starting(server):
+    """Runs once in the master, before any worker exists."""
+    import app as smart_app
+    from metrics import clear_snapshots
+
+    if workers > 1 and smart_app.app.config['QUIZ_SESSION_BACKEND'] == 'memory':
+        raise SystemExit("❌ QUIZ_SESSION_BACKEND='memory' only works with one worker; use 'sqlite'.")
+    with smart_app.app.app_context():
+        smart_app.init_db()
+    # Workers write metric snapshots here so /metrics reports totals for the whole server
+    metrics_dir = os.path.join(smart_app.app.instance_path, 'metrics')
+    clear_snapshots(metrics_dir)
+    smart_app.app.config['METRICS_DIR'] = metrics_dir
+    print(f"🚀 SMART QUIZZER serving on {bind} with {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    """Runs in each worker right after fork: nothing process-local is inherited from the master."""
+    import app as smart_app
+
+    smart_app.init_worker_resources()
+    smart_app.analytics_replica.start_background_refresh()
+    smart_app.metrics.start_background_flush(smart_app.app.config['METRICS_DIR'],
+                                             smart_app.app.config['METRICS_FLUSH_SECONDS'])
+
+
+def _serve_werkzeug():
+    from werkzeug.serving import run_simple
+    import app as smart_app
+
+    host, _, port = bind.rpartition(':')
+    with smart_app.app.app_context():
+        smart_app.init_db()
+    smart_app.analytics_replica.start_background_refresh()
+    print(f"⚠️ gunicorn is not installed; serving on {bind} with a single threaded werkzeug process")
+    run_simple(host or '0.0.0.0', int(port), smart_app.create_app(), threaded=True)
+
+
+def main():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        _serve_werkzeug()
+        return
+
+    settings = {
+        'bind': bind, 'workers': workers, 'threads': threads, 'timeout': timeout,
+        'worker_class': worker_class, 'preload_app': preload_app,
+        'on_starting': on_starting, 'post_fork': post_fork
+    }
+
+    class SmartQuizzerApplication(BaseApplication):
+        def load_config(self):
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import create_app
+            return create_app()
+
+    SmartQuizzerApplication().run()
+
+
+if __name__ == '__main__':
+    main()
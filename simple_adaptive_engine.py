@@ -1,33 +1,141 @@
 import sqlite3
+import threading
+import time
 from datetime import datetime
 
+from learner_cache import LearnerStateCache, _MISSING
+
+# Seconds between checks for learners invalidated by other worker processes
+INVALIDATION_POLL_SECONDS = 2
+
 class SimpleAdaptiveEngine:
-    def __init__(self):
+    def __init__(self, db_path='quizzes.db', cache=None):
         self.difficulty_levels = ['easy', 'medium', 'hard']
-    
+        self.db_path = db_path
+        self.cache = cache if cache is not None else LearnerStateCache()
+        self._last_invalidation_id = None
+        self._next_poll = 0.0
+        self._poll_lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
     def get_difficulty_index(self, difficulty):
         """Returns the index of a difficulty level (0=easy, 1=medium, 2=hard)."""
         return self.difficulty_levels.index(difficulty.lower()) if difficulty.lower() in self.difficulty_levels else 1
-    
+
     def get_difficulty_by_index(self, index):
         """Returns the difficulty string from its index, clamped between 0 and 2."""
         clamped_index = max(0, min(index, len(self.difficulty_levels) - 1))
         return self.difficulty_levels[clamped_index]
 
-    def calculate_next_difficulty(self, user_id, topic, current_score):
+    def _sync_invalidations(self):
         """
-        Calculates the new overall skill level based on final quiz score (for analytics update).
+        Drops learners that any process invalidated since the last check.
+        Runs at most every INVALIDATION_POLL_SECONDS, so that bounds how long
+        another worker can serve a learner's old state.
         """
-        conn = sqlite3.connect('quizzes.db')
-        cursor = conn.cursor()
-        
-        # Fetch user's current skill level from the 'users' table
-        result = cursor.execute('SELECT skill_level FROM users WHERE id = ?', (user_id,)).fetchone()
+        now = time.monotonic()
+        if now < self._next_poll or not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = now + INVALIDATION_POLL_SECONDS
+            conn = self._connect()
+            try:
+                if self._last_invalidation_id is None:
+                    # First check in this process: whatever was cached before is suspect
+                    row = conn.execute('SELECT COALESCE(MAX(id), 0) FROM learner_invalidations').fetchone()
+                    self.cache.clear()
+                    self._last_invalidation_id = row[0]
+                    return
+                rows = conn.execute(
+                    'SELECT id, user_id FROM learner_invalidations WHERE id > ? ORDER BY id',
+                    (self._last_invalidation_id,)
+                ).fetchall()
+            finally:
+                conn.close()
+            for row in rows:
+                self.cache.invalidate_user(row['user_id'])
+                self._last_invalidation_id = row['id']
+        except sqlite3.OperationalError:
+            pass  # table not created yet (before init_db)
+        finally:
+            self._poll_lock.release()
+
+    def get_user(self, user_id):
+        """Returns the user's row as a dict (read through the learner cache), or None."""
+        self._sync_invalidations()
+        user = self.cache.get_user(user_id)
+        if user is not _MISSING:
+            return user
+
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
         conn.close()
-        
-        current_difficulty = result[0].lower() if result else 'medium'
+
+        user = dict(row) if row else None
+        self.cache.set_user(user_id, user)
+        return user
+
+    def set_skill_level(self, user_id, skill_level, conn=None):
+        """
+        Writes the user's skill level and invalidates the learner everywhere.
+        When a connection is passed the caller owns the transaction and the commit.
+        """
+        if conn is not None:
+            conn.execute('UPDATE users SET skill_level = ? WHERE id = ?', (skill_level, user_id))
+            self.invalidate_user(user_id, conn=conn)
+            return
+        own_conn = self._connect()
+        try:
+            own_conn.execute('UPDATE users SET skill_level = ? WHERE id = ?', (skill_level, user_id))
+            self.invalidate_user(user_id, conn=own_conn)
+            own_conn.commit()
+        finally:
+            own_conn.close()
+        self.cache.invalidate_user(user_id)
+
+    def invalidate_user(self, user_id, conn=None):
+        """
+        Drops cached learner state after a change to the user, in this process
+        and (through learner_invalidations) in every other worker. With a
+        connection the record commits with the caller's change; a read that
+        re-caches the old row before that commit is dropped again on the next
+        poll.
+        """
+        if conn is not None:
+            conn.execute('INSERT INTO learner_invalidations (user_id) VALUES (?)', (user_id,))
+        else:
+            own_conn = self._connect()
+            try:
+                own_conn.execute('INSERT INTO learner_invalidations (user_id) VALUES (?)', (user_id,))
+                # Records older than the cache TTL can no longer match a live entry
+                own_conn.execute(
+                    "DELETE FROM learner_invalidations WHERE created_at < datetime('now', ?)",
+                    (f'-{int(self.cache.ttl) + 60} seconds',)
+                )
+                own_conn.commit()
+            finally:
+                own_conn.close()
+        self.cache.invalidate_user(user_id)
+
+    def calculate_next_difficulty(self, user_id, topic, current_score, conn=None):
+        """
+        Calculates the new overall skill level based on final quiz score (for analytics update).
+        Pass the connection of the transaction that will store it to read the current level there.
+        """
+        if conn is not None:
+            row = conn.execute('SELECT skill_level FROM users WHERE id = ?', (user_id,)).fetchone()
+            skill_level = row[0] if row else None
+        else:
+            user = self.get_user(user_id)
+            skill_level = user['skill_level'] if user else None
+
+        current_difficulty = skill_level.lower() if skill_level else 'medium'
         current_index = self.get_difficulty_index(current_difficulty)
-        
+
         # Calculate next difficulty based on score thresholds (50% and 80%)
         if current_score >= 80:
             next_index = min(current_index + 1, len(self.difficulty_levels) - 1)
@@ -35,54 +143,46 @@ class SimpleAdaptiveEngine:
             next_index = max(current_index - 1, 0)
         else:
             next_index = current_index
-        
+
         return self.difficulty_levels[next_index]
-    
-    def update_performance(self, user_id, topic, difficulty, is_correct, response_time):
-        """Update performance tracking in the dedicated 'performances' database table."""
-        conn = sqlite3.connect('quizzes.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM performances 
-            WHERE user_id = ? AND topic = ? AND difficulty = ?
-        ''', (user_id, topic, difficulty.lower()))
-        
-        performance = cursor.fetchone()
-        
-        if performance:
-            # Update existing performance
-            perf_id, _, _, _, accuracy, total_questions, correct_answers, avg_time, _ = performance
-            
-            total_questions += 1
-            if is_correct:
-                correct_answers += 1
-            
-            new_accuracy = correct_answers / total_questions
-            
-            # Update average response time using exponential moving average (0.7 old, 0.3 new)
-            if avg_time == 0:
-                new_avg_time = response_time
-            else:
-                new_avg_time = (0.7 * avg_time) + (0.3 * response_time)
-            
-            cursor.execute('''
-                UPDATE performances 
-                SET accuracy = ?, total_questions = ?, correct_answers = ?, 
-                    average_response_time = ?, updated_at = ?
-                WHERE id = ?
-            ''', (new_accuracy, total_questions, correct_answers, new_avg_time, datetime.now(), perf_id))
-        else:
-            # Create new performance record
-            total_questions = 1
-            correct_answers = 1 if is_correct else 0
-            accuracy = 1.0 if is_correct else 0.0
-            
-            cursor.execute('''
-                INSERT INTO performances 
-                (user_id, topic, difficulty, accuracy, total_questions, correct_answers, average_response_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, topic, difficulty.lower(), accuracy, total_questions, correct_answers, response_time))
-        
-        conn.commit()
-        conn.close()
\ No newline at end of file
+
+    def update_performance(self, user_id, topic, difficulty, is_correct, response_time, conn=None):
+        """
+        Update performance tracking in the dedicated 'performances' database table.
+
+        The counters and the response-time moving average (0.7 old, 0.3 new) are
+        computed in SQL from the stored row, so concurrent updates from several
+        workers never overwrite each other. When a connection is passed the
+        caller owns the transaction and the commit.
+        """
+        difficulty = difficulty.lower()
+        correct = 1 if is_correct else 0
+        own_conn = conn is None
+        if own_conn:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+
+        try:
+            updated = conn.execute('''
+                UPDATE performances
+                SET total_questions = total_questions + 1,
+                    correct_answers = correct_answers + ?,
+                    accuracy = CAST(correct_answers + ? AS REAL) / (total_questions + 1),
+                    average_response_time = CASE WHEN average_response_time = 0 THEN ?
+                                                 ELSE 0.7 * average_response_time + 0.3 * ? END,
+                    updated_at = ?
+                WHERE user_id = ? AND topic = ? AND difficulty = ?
+            ''', (correct, correct, response_time, response_time, datetime.now(), user_id, topic, difficulty)).rowcount
+
+            if not updated:
+                conn.execute('''
+                    INSERT INTO performances
+                    (user_id, topic, difficulty, accuracy, total_questions, correct_answers, average_response_time)
+                    VALUES (?, ?, ?, ?, 1, ?, ?)
+                ''', (user_id, topic, difficulty, float(correct), correct, response_time))
+
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
@@ -0,0 +1,229 @@
+"""
+Synthetic learner simulator and throughput benchmark for the adaptive quiz loop.
+
+Drives synthetic learners with a latent ability through the real Flask routes
+(create_quiz -> take_quiz -> submit_answer / next_question_adaptive ->
+finalize_quiz) against a throwaway database per worker process, and reports:
+
+  * questions per second (per worker and aggregate)
+  * SQLite statements executed per answered question
+  * convergence: how many questions until the served difficulty settles
+
+Example:
+    python simulate_learners.py --learners 2000 --workers 4 --quiz-length 10
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+DIFFICULTY_INDEX = {'easy': 0, 'medium': 1, 'hard': 2}
+DIFFICULTY_LOGIT = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+
+_real_connect = sqlite3.connect
+_statement_count = 0
+
+
+def _counting_connect(*args, **kwargs):
+    """sqlite3.connect replacement that counts every statement the app executes."""
+    conn = _real_connect(*args, **kwargs)
+
+    def trace(_statement):
+        global _statement_count
+        _statement_count += 1
+
+    conn.set_trace_callback(trace)
+    return conn
+
+
+def convergence_point(difficulties):
+    """
+    Number of questions served before the difficulty settles, i.e. the first
+    position from which every later served difficulty stays within a band one
+    level wide. A ladder that oscillates between two adjacent levels counts as
+    settled.
+    """
+    for start in range(len(difficulties)):
+        tail = difficulties[start:]
+        if max(tail) - min(tail) <= 1:
+            return start
+    return len(difficulties)
+
+
+def _simulate_chunk(job):
+    worker_id, abilities, quiz_length, seed, verbose = job
+    global _statement_count
+
+    if not verbose:
+        # The app logs every generation with print(); keep the report readable
+        sys.stdout = open(os.devnull, 'w')
+
+    workdir = tempfile.mkdtemp(prefix=f'smart_quizzer_sim_{worker_id}_')
+    os.chdir(workdir)
+    sqlite3.connect = _counting_connect
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import app as smart_app
+    from werkzeug.security import generate_password_hash
+
+    # Learners create quizzes back to back; the per-user generation limits would reject them
+    smart_app.app.config['ADMISSION_LIMITS'] = {}
+    smart_app.init_worker_resources()
+    smart_app.quiz_engine.demo_mode = True
+    smart_app.init_db()
+    rng = random.Random(seed)
+
+    # Password hashing would dominate the run, so learners get a single-iteration hash
+    cheap_hash = generate_password_hash('sim', method='pbkdf2:sha256:1')
+    plain = _real_connect('quizzes.db')
+    plain.executemany(
+        'INSERT INTO users (username, email, password) VALUES (?, ?, ?)',
+        [(f'sim_{worker_id}_{n}', f'sim_{worker_id}_{n}@sim.local', cheap_hash) for n in range(len(abilities))]
+    )
+    plain.commit()
+    plain.close()
+
+    results = []
+    answer_seconds = 0.0
+    answer_statements = 0
+
+    try:
+        for n, ability in enumerate(abilities):
+            client = smart_app.app.test_client()
+            client.post('/login', data={'username': f'sim_{worker_id}_{n}', 'password': 'sim'})
+
+            response = client.post('/create_quiz', data={
+                'topic': 'Simulation', 'difficulty': 'medium', 'num_questions': quiz_length,
+                'quiz_type': 'adaptive', 'content': 'Synthetic learner content.'
+            })
+            if response.status_code != 302:
+                raise RuntimeError(f"create_quiz returned {response.status_code} for learner {n}, expected a redirect "
+                                   f"to the new quiz: {response.get_data(as_text=True)[:200]}")
+            quiz_id = int(response.headers['Location'].rstrip('/').split('/')[-1])
+
+            # Read the pool outside the counted connection; the learner "knows" the right answers
+            plain = _real_connect('quizzes.db')
+            pool = {q['id']: q for q in json.loads(
+                plain.execute('SELECT questions FROM quizzes WHERE id = ?', (quiz_id,)).fetchone()[0])}
+            plain.close()
+
+            served = []
+            html = client.get(f'/quiz/{quiz_id}').get_data(as_text=True)
+            started, statements_before = time.perf_counter(), _statement_count
+
+            while True:
+                match = re.search(r'name="question_id" value="(\d+)"', html)
+                if not match:
+                    break
+                question = pool[int(match.group(1))]
+                difficulty = question.get('difficulty', 'medium').lower()
+                served.append(DIFFICULTY_INDEX.get(difficulty, 1))
+
+                p_correct = 1.0 / (1.0 + math.exp(DIFFICULTY_LOGIT.get(difficulty, 0.0) - ability))
+                if rng.random() < p_correct:
+                    answer = question['correct_answer']
+                else:
+                    wrong = [o for o in question.get('options', []) if o != question['correct_answer']]
+                    answer = rng.choice(wrong) if wrong else ''
+
+                client.post(f'/submit_answer/{quiz_id}', data={
+                    'question_id': question['id'], 'answer': answer, 'time_taken': rng.randint(2, 30)
+                })
+                response = client.get(f'/next_question_adaptive/{quiz_id}')
+                if response.status_code == 302:
+                    # Pool exhausted or quiz length reached: follow into finalize_quiz
+                    client.get(response.headers['Location'])
+                    break
+                html = response.get_data(as_text=True)
+
+            answer_seconds += time.perf_counter() - started
+            answer_statements += _statement_count - statements_before
+            results.append({'ability': ability, 'served': served})
+    finally:
+        os.chdir(tempfile.gettempdir())
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'worker_id': worker_id,
+        'learners': results,
+        'answer_seconds': answer_seconds,
+        'answer_statements': answer_statements
+    }
+
+
+def summarize(worker_results, wall_seconds):
+    learners = [learner for result in worker_results for learner in result['learners']]
+    answered = sum(len(learner['served']) for learner in learners)
+    busy_seconds = sum(result['answer_seconds'] for result in worker_results)
+    statements = sum(result['answer_statements'] for result in worker_results)
+    convergence = [convergence_point(learner['served']) for learner in learners if learner['served']]
+
+    bands = {'low (< -1)': [], 'mid (-1..1)': [], 'high (> 1)': []}
+    for learner in learners:
+        if not learner['served']:
+            continue
+        band = 'low (< -1)' if learner['ability'] < -1 else 'high (> 1)' if learner['ability'] > 1 else 'mid (-1..1)'
+        bands[band].append(statistics.mean(learner['served']))
+
+    return {
+        'learners': len(learners),
+        'questions_answered': answered,
+        'wall_seconds': round(wall_seconds, 2),
+        'questions_per_second': round(answered / wall_seconds, 1) if wall_seconds else 0,
+        'questions_per_second_per_worker': round(answered / busy_seconds, 1) if busy_seconds else 0,
+        'db_statements_per_answer': round(statements / answered, 2) if answered else 0,
+        'convergence_mean': round(statistics.mean(convergence), 2) if convergence else 0,
+        'convergence_median': statistics.median(convergence) if convergence else 0,
+        'mean_served_difficulty_by_ability': {
+            band: round(statistics.mean(values), 2) if values else None for band, values in bands.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate synthetic learners against the adaptive engine.')
+    parser.add_argument('--learners', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--quiz-length', type=int, default=10)
+    parser.add_argument('--ability-mean', type=float, default=0.0)
+    parser.add_argument('--ability-sd', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's own log output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    abilities = [rng.gauss(args.ability_mean, args.ability_sd) for _ in range(args.learners)]
+    workers = max(1, min(args.workers, args.learners))
+    jobs = [(w, abilities[w::workers], args.quiz_length, args.seed + w, args.verbose) for w in range(workers)]
+
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        worker_results = pool.map(_simulate_chunk, jobs)
+    summary = summarize(worker_results, time.perf_counter() - started)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"📊 Simulated {summary['learners']} learners / {summary['questions_answered']} answers "
+          f"on {workers} workers in {summary['wall_seconds']}s")
+    print(f"   Throughput:       {summary['questions_per_second']} questions/s "
+          f"({summary['questions_per_second_per_worker']} per worker)")
+    print(f"   DB statements:    {summary['db_statements_per_answer']} per answer")
+    print(f"   Convergence:      mean {summary['convergence_mean']}, median {summary['convergence_median']} questions")
+    for band, value in summary['mean_served_difficulty_by_ability'].items():
+        print(f"   Ability {band:<12} mean served difficulty index: {value}")
+
+
+if __name__ == '__main__':
+    main()
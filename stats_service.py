@@ -0,0 +1,104 @@
+import threading
+import time
+
+from activity_rollups import active_users
+
+# Platform counters adjusted in place by the write paths between recomputes
+COUNTERS = (
+    'total_users', 'total_quizzes', 'completed_quizzes', 'total_feedback', 'flagged_open',
+    'feedback_positive', 'feedback_negative', 'feedback_neutral'
+)
+
+
+class StatsService:
+    """
+    Aggregate platform statistics for the admin dashboard and live-stats API.
+
+    The full set of COUNT queries runs at most once per `ttl` seconds; in
+    between, write paths call `adjust()` so simple counters stay current
+    without touching the database. Aggregates that cannot be maintained
+    incrementally (7/30/90-day active users, estimated from the daily
+    activity sketches) are only refreshed by the recompute.
+    Counters are per process, so other workers' writes appear after their
+    next recompute. `connect` opens the connection a recompute reads; the app
+    passes the analytics replica's, so a recompute sees its snapshot.
+    """
+
+    def __init__(self, connect, ttl=30):
+        self.connect = connect
+        self.ttl = ttl
+        self._stats = None
+        self._computed_at = None
+        self._lock = threading.Lock()
+        self.recomputes = 0
+
+    def _recompute(self):
+        conn = self.connect()
+        try:
+            stats = {
+                'total_users': conn.execute(
+                    'SELECT COUNT(*) FROM users WHERE username != ?', ('admin',)
+                ).fetchone()[0],
+                'total_quizzes': conn.execute('SELECT COUNT(*) FROM quizzes').fetchone()[0],
+                'completed_quizzes': conn.execute(
+                    "SELECT COUNT(*) FROM quizzes WHERE status = 'completed'"
+                ).fetchone()[0],
+                'total_feedback': conn.execute('SELECT COUNT(*) FROM question_feedback').fetchone()[0],
+                'flagged_open': conn.execute(
+                    'SELECT COUNT(*) FROM question_feedback WHERE flagged = 1 AND resolved = 0'
+                ).fetchone()[0],
+                'active_users_7d': active_users(conn, 7),
+                'active_users': active_users(conn, 30),
+                'active_users_90d': active_users(conn, 90),
+                'feedback_positive': 0,
+                'feedback_negative': 0,
+                'feedback_neutral': 0
+            }
+            for feedback_type, count in conn.execute(
+                'SELECT feedback_type, COUNT(*) FROM question_feedback GROUP BY feedback_type'
+            ).fetchall():
+                key = f"feedback_{(feedback_type or '').lower()}"
+                if key in stats:
+                    stats[key] += count
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._stats = stats
+            self._computed_at = time.monotonic()
+            self.recomputes += 1
+
+    def cache_age(self):
+        """Seconds since the last full recompute, or None if never computed."""
+        if self._computed_at is None:
+            return None
+        return time.monotonic() - self._computed_at
+
+    def snapshot(self):
+        """Current statistics, recomputing first if the cached aggregates are older than the TTL."""
+        age = self.cache_age()
+        if age is None or age >= self.ttl:
+            self._recompute()
+
+        with self._lock:
+            stats = dict(self._stats)
+
+        sentiment_total = stats['feedback_positive'] + stats['feedback_negative']
+        stats['positive_pct'] = round(stats['feedback_positive'] / sentiment_total * 100, 1) if sentiment_total else 0
+        stats['negative_pct'] = round(stats['feedback_negative'] / sentiment_total * 100, 1) if sentiment_total else 0
+        stats['cache_age'] = round(self.cache_age(), 1)
+        return stats
+
+    def adjust(self, **deltas):
+        """Applies counter deltas from a write path, e.g. adjust(total_quizzes=1)."""
+        with self._lock:
+            if self._stats is None:
+                return
+            for name, delta in deltas.items():
+                if name in COUNTERS:
+                    self._stats[name] += delta
+
+    def invalidate(self):
+        """Forces a full recompute on the next read (for writes too broad to track, e.g. deleting a user)."""
+        with self._lock:
+            self._computed_at = None
@@ -0,0 +1,153 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+# Fields that change on every read and would make every tick look like a change
+VOLATILE_FIELDS = ('timestamp', 'cache_age', 'snapshot_age')
+
+
+def format_event(data, event=None, event_id=None):
+    """Encodes one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class TooManySubscribers(Exception):
+    """Raised by `subscribe()` when `max_subscribers` streams are already open."""
+
+
+class StatsBroadcaster:
+    """
+    Pushes admin statistics to any number of Server-Sent Events subscribers.
+
+    A single producer thread reads `snapshot_fn()` every `interval` seconds and
+    publishes only the fields that changed, so the query load is the same
+    whether one dashboard is open or fifty. Each subscriber gets a bounded
+    queue; recent events are kept in a short replay buffer so a client that
+    reconnects with Last-Event-ID receives what it missed, or a full snapshot
+    if it fell too far behind.
+
+    Every open stream holds a server thread for as long as the client stays
+    connected, so at most `max_subscribers` (None: unlimited) are accepted.
+    """
+
+    def __init__(self, snapshot_fn, interval=5, heartbeat=15, retry_ms=5000, replay_size=100, queue_size=100,
+                 max_subscribers=None):
+        self.snapshot_fn = snapshot_fn
+        self.max_subscribers = max_subscribers
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.retry_ms = retry_ms
+        self.queue_size = queue_size
+        self._replay = deque(maxlen=replay_size)  # (event_id, payload)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._producer = None
+        self._last = None
+        self._last_id = 0
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _publish(self, payload):
+        with self._lock:
+            self._last_id += 1
+            self._replay.append((self._last_id, payload))
+            event = (self._last_id, payload)
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # Too slow to keep up: drop it, the client reconnects and resyncs
+                    self._subscribers.discard(subscriber)
+                    with subscriber.mutex:
+                        subscriber.queue.clear()
+                    subscriber.put_nowait(None)
+
+    def _tick(self):
+        stats = self.snapshot_fn()
+        stable = {k: v for k, v in stats.items() if k not in VOLATILE_FIELDS}
+        delta = {k: v for k, v in stable.items() if self._last is None or self._last.get(k) != v}
+        self._last = stable
+        if delta:
+            delta.update({k: stats[k] for k in VOLATILE_FIELDS if k in stats})
+            self._publish(delta)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._producer = None
+                    return
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"⚠️ Stats stream producer error: {e}")
+            time.sleep(self.interval)
+
+    def _ensure_producer(self):
+        with self._lock:
+            if self._producer is None:
+                self._producer = threading.Thread(target=self._run, daemon=True, name='stats-stream')
+                self._producer.start()
+
+    def subscribe(self, last_event_id=None):
+        """
+        Registers a subscriber and returns (queue, backlog). The backlog holds
+        missed events for a reconnecting client, or None if it needs a full snapshot.
+        Raises TooManySubscribers when the stream limit is reached.
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            backlog = None
+            if (last_event_id is not None and self._replay
+                    and self._replay[0][0] <= last_event_id + 1 and last_event_id <= self._last_id):
+                backlog = [event for event in self._replay if event[0] > last_event_id]
+            self._subscribers.add(subscriber)
+        self._ensure_producer()
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def open_stream(self, last_event_id=None):
+        """
+        Subscribes right away (raising TooManySubscribers if full) and returns
+        (subscriber, generator of SSE messages for one client connection). The
+        generator unsubscribes when it finishes; a response that is closed
+        before it started must call `unsubscribe(subscriber)` itself.
+        """
+        subscriber, backlog = self.subscribe(last_event_id)
+        return subscriber, self._stream(subscriber, backlog)
+
+    def _stream(self, subscriber, backlog):
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            if backlog is None:
+                yield format_event(self.snapshot_fn(), event='snapshot', event_id=self._last_id)
+            else:
+                for event_id, payload in backlog:
+                    yield format_event(payload, event='stats', event_id=event_id)
+
+            while True:
+                try:
+                    event = subscriber.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                if event is None:
+                    return
+                yield format_event(event[1], event='stats', event_id=event[0])
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,117 @@
+"""
+Per-user, per-topic rollups of completed quizzes (`user_topic_stats`).
+
+The app folds each quiz in at completion, inside the same transaction that
+marks it completed, so /profile reads a handful of rows instead of parsing
+every past quiz. Run this module to backfill the table from existing history:
+
+    python topic_rollups.py --db quizzes.db
+"""
+import argparse
+import json
+import sqlite3
+from datetime import datetime
+
+from review_scheduler import REVIEW_QUIZ_TYPE
+
+ROLLUP_FIELDS = ('quiz_count', 'total_score', 'total_questions', 'correct_answers', 'total_response_time')
+
+
+def quiz_totals(score, questions):
+    """Rollup increments contributed by one completed quiz."""
+    answered = [q for q in questions if 'user_answer' in q]
+    return (
+        1,
+        score or 0,
+        len(answered),
+        sum(1 for q in answered if q.get('is_correct', False)),
+        sum(q.get('response_time') or 0 for q in answered)
+    )
+
+
+def record_completed_quiz(conn, user_id, topic, score, questions):
+    """Adds a just-completed quiz to the user's topic rollup. Caller commits."""
+    conn.execute(f'''
+        INSERT INTO user_topic_stats (user_id, topic, {', '.join(ROLLUP_FIELDS)}, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, topic) DO UPDATE SET
+            {', '.join(f'{f} = {f} + excluded.{f}' for f in ROLLUP_FIELDS)},
+            updated_at = excluded.updated_at
+    ''', (user_id, topic, *quiz_totals(score, questions), datetime.now()))
+
+
+def load_user_topic_stats(conn, user_id):
+    """Returns the user's rollup rows as dicts, one per topic."""
+    rows = conn.execute(f'''
+        SELECT topic, {', '.join(ROLLUP_FIELDS)} FROM user_topic_stats
+        WHERE user_id = ? ORDER BY topic
+    ''', (user_id,)).fetchall()
+    return [dict(zip(('topic',) + ROLLUP_FIELDS, row)) for row in rows]
+
+
+def _sum_quizzes(cursor, totals, batch_size):
+    """Adds (id, user_id, topic, score, questions) rows into `totals`; returns the quiz ids seen."""
+    seen = set()
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for quiz_id, user_id, topic, score, questions_json in rows:
+            seen.add(quiz_id)
+            try:
+                questions = json.loads(questions_json)
+            except (TypeError, json.JSONDecodeError):
+                continue
+            current = totals.get((user_id, topic), (0,) * len(ROLLUP_FIELDS))
+            totals[(user_id, topic)] = tuple(a + b for a, b in zip(current, quiz_totals(score, questions)))
+    return seen
+
+
+def backfill_user_topic_stats(db_path='quizzes.db', batch_size=500):
+    """
+    Recomputes `user_topic_stats` from all completed quizzes and replaces it in
+    one transaction. The long scan runs without the write lock; quizzes
+    completed meanwhile are added under it, before the old rows are replaced.
+    """
+    conn = sqlite3.connect(db_path)
+    query = '''
+        SELECT id, user_id, topic, score, questions FROM quizzes
+        WHERE status = 'completed' AND quiz_type != ?
+    '''
+    totals = {}
+    scanned = _sum_quizzes(conn.execute(query, (REVIEW_QUIZ_TYPE,)), totals, batch_size)
+
+    now = datetime.now()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Quizzes completed since the scan started (nobody can complete one now)
+        completed = {row[0] for row in conn.execute(
+            "SELECT id FROM quizzes WHERE status = 'completed' AND quiz_type != ?", (REVIEW_QUIZ_TYPE,))}
+        late = sorted(completed - scanned)
+        if late:
+            late_query = query + f" AND id IN ({','.join('?' * len(late))})"
+            _sum_quizzes(conn.execute(late_query, (REVIEW_QUIZ_TYPE, *late)), totals, batch_size)
+
+        conn.execute('DELETE FROM user_topic_stats')
+        conn.executemany(f'''
+            INSERT INTO user_topic_stats (user_id, topic, {', '.join(ROLLUP_FIELDS)}, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(user_id, topic, *values, now) for (user_id, topic), values in totals.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {'quizzes': len(scanned) + len(late), 'late_quizzes': len(late), 'rows': len(totals)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill user_topic_stats from completed quizzes.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--batch-size', type=int, default=500, help='Quizzes fetched per database round trip')
+    args = parser.parse_args()
+
+    result = backfill_user_topic_stats(args.db, batch_size=args.batch_size)
+    print(f"✅ Backfilled user_topic_stats: {result['rows']} rows from {result['quizzes']} completed quizzes "
+          f"({result['late_quizzes']} completed during the scan)")
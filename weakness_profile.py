@@ -0,0 +1,158 @@
+"""
+Cross-quiz weakness profile per learner (`user_weakness`).
+
+One row per (learner, dimension, value) for the topic, difficulty and question
+type of every answered question: lifetime attempts and correct answers plus
+`recent_accuracy`, an exponential moving average of per-quiz accuracy so the
+latest quizzes weigh most. The app folds each quiz in at completion, inside
+the same transaction that marks it completed, so suggestions read a handful of
+rows instead of parsing every past quiz. Backfill from existing history:
+
+    python weakness_profile.py --db quizzes.db
+"""
+import argparse
+import json
+import sqlite3
+from datetime import datetime
+
+from review_scheduler import REVIEW_QUIZ_TYPE
+
+DIMENSIONS = ('topic', 'difficulty', 'question_type')
+RECENT_WEIGHT = 0.3   # share of recent_accuracy taken from the latest quiz
+WEAK_ACCURACY = 0.7   # recent accuracy below this marks a weakness
+MIN_ATTEMPTS = 3
+
+
+def quiz_weakness_totals(topic, questions):
+    """{(dimension, value): [attempts, correct]} contributed by one completed quiz."""
+    totals = {}
+    for q in questions:
+        if 'user_answer' not in q:
+            continue
+        values = (
+            topic,
+            (q.get('difficulty') or 'medium').lower(),
+            (q.get('question_type') or 'mcq').lower()
+        )
+        for dimension, value in zip(DIMENSIONS, values):
+            entry = totals.setdefault((dimension, value), [0, 0])
+            entry[0] += 1
+            entry[1] += 1 if q.get('is_correct', False) else 0
+    return totals
+
+
+def record_quiz_weakness(conn, user_id, topic, questions):
+    """Folds a just-completed quiz into the user's weakness profile. Caller commits."""
+    now = datetime.now()
+    conn.executemany(f'''
+        INSERT INTO user_weakness (user_id, dimension, value, attempts, correct, recent_accuracy, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, dimension, value) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            correct = correct + excluded.correct,
+            recent_accuracy = recent_accuracy * {1 - RECENT_WEIGHT} + excluded.recent_accuracy * {RECENT_WEIGHT},
+            updated_at = excluded.updated_at
+    ''', [(user_id, dimension, value, attempts, correct, correct / attempts, now)
+          for (dimension, value), (attempts, correct) in quiz_weakness_totals(topic, questions).items()])
+
+
+def load_weakness_profile(conn, user_id):
+    """
+    Returns ({dimension: {value: stats}}, version) for the user, where
+    `version` is the last update time (None for an empty profile).
+    """
+    profile = {dimension: {} for dimension in DIMENSIONS}
+    version = None
+    for dimension, value, attempts, correct, recent_accuracy, updated_at in conn.execute('''
+        SELECT dimension, value, attempts, correct, recent_accuracy, updated_at
+        FROM user_weakness WHERE user_id = ?
+    ''', (user_id,)).fetchall():
+        profile.setdefault(dimension, {})[value] = {
+            'attempts': attempts,
+            'correct': correct,
+            'recent_accuracy': recent_accuracy
+        }
+        version = max(version, str(updated_at)) if version else str(updated_at)
+    return profile, version
+
+
+def weak_values(profile, dimension, min_attempts=MIN_ATTEMPTS, threshold=WEAK_ACCURACY):
+    """Values the learner currently struggles with, weakest first: [(value, stats)]."""
+    weak = [(value, stats) for value, stats in profile.get(dimension, {}).items()
+            if stats['attempts'] >= min_attempts and stats['recent_accuracy'] < threshold]
+    return sorted(weak, key=lambda item: item[1]['recent_accuracy'])
+
+
+def _replay_quizzes(cursor, profiles, batch_size):
+    """Folds (id, user_id, topic, questions, completed_at) rows into `profiles`; returns the quiz ids seen."""
+    seen = set()
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for quiz_id, user_id, topic, questions_json, completed_at in rows:
+            seen.add(quiz_id)
+            try:
+                questions = json.loads(questions_json)
+            except (TypeError, json.JSONDecodeError):
+                continue
+            for (dimension, value), (attempts, correct) in quiz_weakness_totals(topic, questions).items():
+                accuracy = correct / attempts
+                entry = profiles.get((user_id, dimension, value))
+                if entry is None:
+                    profiles[(user_id, dimension, value)] = [attempts, correct, accuracy, completed_at]
+                else:
+                    entry[0] += attempts
+                    entry[1] += correct
+                    entry[2] = entry[2] * (1 - RECENT_WEIGHT) + accuracy * RECENT_WEIGHT
+                    entry[3] = completed_at
+    return seen
+
+
+def backfill_weakness_profiles(db_path='quizzes.db', batch_size=500):
+    """
+    Replays all completed quizzes in order and replaces `user_weakness` in one
+    transaction. The long scan runs without the write lock; quizzes completed
+    meanwhile are folded in under it, before the old rows are replaced.
+    """
+    conn = sqlite3.connect(db_path)
+    query = '''
+        SELECT id, user_id, topic, questions, COALESCE(completed_at, created_at) FROM quizzes
+        WHERE status = 'completed' AND quiz_type != ?
+    '''
+    profiles = {}  # (user_id, dimension, value) -> [attempts, correct, recent_accuracy, updated_at]
+    scanned = _replay_quizzes(conn.execute(query + ' ORDER BY id', (REVIEW_QUIZ_TYPE,)), profiles, batch_size)
+
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Quizzes completed since the scan started (nobody can complete one now)
+        completed = {row[0] for row in conn.execute(
+            "SELECT id FROM quizzes WHERE status = 'completed' AND quiz_type != ?", (REVIEW_QUIZ_TYPE,))}
+        late = sorted(completed - scanned)
+        if late:
+            late_query = query + f" AND id IN ({','.join('?' * len(late))}) ORDER BY id"
+            _replay_quizzes(conn.execute(late_query, (REVIEW_QUIZ_TYPE, *late)), profiles, batch_size)
+
+        conn.execute('DELETE FROM user_weakness')
+        conn.executemany('''
+            INSERT INTO user_weakness (user_id, dimension, value, attempts, correct, recent_accuracy, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(*key, *values) for key, values in profiles.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {'quizzes': len(scanned) + len(late), 'late_quizzes': len(late), 'rows': len(profiles)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill user_weakness from completed quizzes.')
+    parser.add_argument('--db', default='quizzes.db')
+    parser.add_argument('--batch-size', type=int, default=500, help='Quizzes fetched per database round trip')
+    args = parser.parse_args()
+
+    result = backfill_weakness_profiles(args.db, batch_size=args.batch_size)
+    print(f"✅ Backfilled user_weakness: {result['rows']} rows from {result['quizzes']} completed quizzes "
+          f"({result['late_quizzes']} completed during the scan)")